@@ -3,6 +3,7 @@ import { motion } from 'framer-motion';
 import React, { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 import { useTranslation } from 'react-i18next';
 import { List } from 'react-window';
+import io from 'socket.io-client';
 import { API_BASE_URL } from '../config';
 import { usePredictivePrefetch } from '../hooks/usePredictivePrefetch';
 import { useUserBehaviorPredictor } from '../hooks/useUserBehaviorPredictor';
@@ -370,7 +371,7 @@ const AgentRankings = () => {
     { id: 'alltime', label: t('rankings.timeframes.alltime') },
   ];
 
-  const { handleMouseEnter, handleMouseLeave, getCachedResult } = usePredictivePrefetch(API_BASE_URL);
+  const { handleMouseEnter, handleMouseLeave, getCachedEntry } = usePredictivePrefetch(API_BASE_URL);
   
   // 使用 UserBehaviorPredictor 进行 hover intent 预加载
   const { 
@@ -385,11 +386,29 @@ const AgentRankings = () => {
   });
 
   // Use worker hook for scoring and sorting
-  const { isReady: workerReady, isProcessing: workerProcessing, processData: processWithWorker } = useWorker({
+  const { isReady: workerReady, isProcessing: workerProcessing, loadRankings, applyDiff } = useWorker({
     scenario: activeScenario,
     autoInitialize: true
   });
 
+  // Real-time updates: the held list's data version, the live socket, and a
+  // reload counter bumped when a diff cannot be applied
+  const versionRef = useRef(null);
+  const scenarioRef = useRef(activeScenario);
+  const socketRef = useRef(null);
+  const diffQueueRef = useRef(Promise.resolve());
+  const forceReloadRef = useRef(false);
+  const [reloadToken, setReloadToken] = useState(0);
+
+  useEffect(() => {
+    scenarioRef.current = activeScenario;
+  }, [activeScenario]);
+
+  const requestReload = useCallback(() => {
+    forceReloadRef.current = true;
+    setReloadToken(token => token + 1);
+  }, []);
+
   // Memoized filtered data - only recalculate when dependencies change
   const finalData = useMemo(() => {
     // Ensure data is always an array
@@ -455,10 +474,14 @@ const AgentRankings = () => {
 
   useEffect(() => {
     const fetchData = async () => {
-      setProcessing(true);
+      // Reloads after an unusable diff run in the background and bypass caches
+      const forceReload = forceReloadRef.current;
+      forceReloadRef.current = false;
+      if (!forceReload) setProcessing(true);
       try {
         // Zero-Latency UX: Check if we have pre-calculated data from hover prefetch
-        const cachedResult = getCachedResult(activeScenario);
+        const cached = forceReload ? null : getCachedEntry(activeScenario);
+        const cachedResult = cached && cached.data;
         
         if (cachedResult && Array.isArray(cachedResult) && cachedResult.length > 0) {
           setData(cachedResult);
@@ -466,21 +489,34 @@ const AgentRankings = () => {
           setMaxPerf(max);
           setProcessing(false);
           setLoading(false);
+
+          // Seed the worker-held list with the prefetched raw data and its
+          // version, so diffs apply incrementally instead of forcing a reload
+          await loadRankings(cached.raw, cached.version);
+          versionRef.current = cached.version;
+          socketRef.current?.emit('subscribe:rankings', { scenario: activeScenario, version: cached.version });
           return; // Instant update from cache
         }
 
         // Fallback: Normal fetch and process
-        const response = await axios.get(`${API_BASE_URL}/api/agents?scenario=${activeScenario}`);
+        const cacheBuster = forceReload ? `&_=${Date.now()}` : '';
+        const response = await axios.get(`${API_BASE_URL}/api/agents?scenario=${activeScenario}${cacheBuster}`);
         if (response && response.data && response.data.success) {
           const rawData = response.data.data || [];
+          const version = response.data.version ?? null;
           
-          // Offload sorting, weighting and rank update to Web Worker via hook
-          const processedData = await processWithWorker(rawData);
+          // Offload sorting, weighting and rank update to Web Worker via hook;
+          // the worker keeps the sorted list so later diffs apply incrementally
+          const processedData = await loadRankings(rawData, version);
 
           setData(processedData || []);
           const max = processedData && processedData.length > 0 ? 
             Math.max(...processedData.map(item => item.peakPerf), 1) : 1;
           setMaxPerf(max);
+
+          // Subscribe from this version on; the server replays missed diffs
+          versionRef.current = version;
+          socketRef.current?.emit('subscribe:rankings', { scenario: activeScenario, version });
         } else {
           // Ensure data is always an array even if API returns failure
           setData([]);
@@ -496,7 +532,46 @@ const AgentRankings = () => {
     };
 
     fetchData();
-  }, [activeScenario, activeTimeframe, getCachedResult, processWithWorker]);
+  }, [activeScenario, activeTimeframe, getCachedEntry, loadRankings, reloadToken]);
+
+  // Ranking diffs over Socket.IO: applied in order to the worker-held list
+  // instead of refetching and re-sorting everything
+  useEffect(() => {
+    const socket = io(API_BASE_URL, { transports: ['websocket'] });
+    socketRef.current = socket;
+
+    socket.on('connect', () => {
+      // (Re)subscribe with the version we hold so reconnects catch up
+      socket.emit('subscribe:rankings', { scenario: scenarioRef.current, version: versionRef.current });
+    });
+
+    const handleDiff = async (diff) => {
+      // Stale message from the previous scenario's room, or a replayed duplicate
+      if (diff.scenario !== scenarioRef.current || diff.version === versionRef.current) return;
+      // A full reload is already scheduled
+      if (forceReloadRef.current) return;
+
+      const result = await applyDiff(diff);
+      if (!result) {
+        requestReload();
+        return;
+      }
+      versionRef.current = diff.version;
+      setData(result);
+      setMaxPerf(result.length > 0 ? Math.max(...result.map(item => item.peakPerf), 1) : 1);
+    };
+
+    socket.on('rankings:diff', (diff) => {
+      diffQueueRef.current = diffQueueRef.current.then(() => handleDiff(diff)).catch((error) => {
+        console.error('Error applying ranking diff:', error);
+      });
+    });
+
+    return () => {
+      socket.disconnect();
+      socketRef.current = null;
+    };
+  }, [applyDiff, requestReload]);
 
   const orderedTiers = ['S', 'A', 'B', 'C', 'D'];
 
@@ -22,14 +22,25 @@ vi.mock('../hooks/useWorker', () => ({
     isReady: true,
     isProcessing: false,
     processData: vi.fn((data) => Promise.resolve(data)),
+    loadRankings: vi.fn((data) => Promise.resolve(data)),
+    applyDiff: vi.fn(() => Promise.resolve(null)),
   }),
 }));
 
+vi.mock('socket.io-client', () => ({
+  default: vi.fn(() => ({
+    on: vi.fn(),
+    emit: vi.fn(),
+    disconnect: vi.fn(),
+  })),
+}));
+
 vi.mock('../hooks/usePredictivePrefetch', () => ({
   usePredictivePrefetch: () => ({
     handleMouseEnter: vi.fn(),
     handleMouseLeave: vi.fn(),
     getCachedResult: vi.fn(() => null),
+    getCachedEntry: vi.fn(() => null),
   }),
 }));
 
@@ -17,8 +17,8 @@ const EntropyDashboard = () => {
   const [entropyHistory, setEntropyHistory] = useState([]);
 
   useEffect(() => {
-    // 连接 WebSocket
-    const socket = io('http://localhost:14514');
+    // 连接 WebSocket - 直接使用 websocket 传输，Cluster 模式下无需粘性会话
+    const socket = io('http://localhost:14514', { transports: ['websocket'] });
     
     socket.on('connect', () => {
       console.log('🔌 Connected to WebSocket server');
@@ -2,7 +2,7 @@ import { useState, useCallback, useRef } from 'react';
 import axios from 'axios';
 import ChartWorkerManager from '../utils/ChartWorkerManager';
 
-// Simple cache for processed results (Map<Scenario, Data>)
+// Simple cache for processed results (Map<Scenario, { data, raw, version, timestamp }>)
 const RESULT_CACHE = new Map();
 
 /**
@@ -37,9 +37,12 @@ export const usePredictivePrefetch = (baseUrl) => {
         // Mission: Connect prefetch logic to ChartWorkerManager.processData()
         const processedData = await ChartWorkerManager.processData(rawData, scenario);
         
-        // Step 3: Store result in a simple cache
+        // Step 3: Store result in a simple cache, with the raw list and data
+        // version so the view can seed incremental ranking updates from it
         RESULT_CACHE.set(scenario, {
           data: processedData,
+          raw: rawData,
+          version: response.data.version ?? null,
           timestamp: Date.now()
         });
         
@@ -84,19 +87,25 @@ export const usePredictivePrefetch = (baseUrl) => {
     }
   }, []);
 
-  const getCachedResult = useCallback((scenario) => {
+  const getCachedEntry = useCallback((scenario) => {
     const cached = RESULT_CACHE.get(scenario);
     // Cache valid for 5 minutes
     if (cached && (Date.now() - cached.timestamp < 300000)) {
-      return cached.data;
+      return cached;
     }
     return null;
   }, []);
 
+  const getCachedResult = useCallback((scenario) => {
+    const cached = getCachedEntry(scenario);
+    return cached ? cached.data : null;
+  }, [getCachedEntry]);
+
   return {
     handleMouseEnter,
     handleMouseLeave,
     getCachedResult,
+    getCachedEntry,
     prefetching
   };
 };
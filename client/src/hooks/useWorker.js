@@ -88,6 +88,32 @@ export function useWorker({ scenario = 'all', autoInitialize = true } = {}) {
     }
   }, []);
 
+  // Load a full ranking list into the worker-held state (diffs apply to it)
+  const loadRankings = useCallback(async (agents, version = null) => {
+    setIsProcessing(true);
+    setError(null);
+
+    try {
+      return await ChartWorkerManager.loadRankings(agents || [], scenarioRef.current, version);
+    } catch (err) {
+      console.error('[useWorker] Load rankings error:', err);
+      setError(err.message);
+      return ChartWorkerManager.processDataOnMainThread(agents, scenarioRef.current);
+    } finally {
+      setIsProcessing(false);
+    }
+  }, []);
+
+  // Apply a `rankings:diff`; resolves to null when a full reload is needed
+  const applyDiff = useCallback(async (diff) => {
+    try {
+      return await ChartWorkerManager.applyRankingDiff(diff);
+    } catch (err) {
+      console.error('[useWorker] Apply diff error:', err);
+      return null;
+    }
+  }, []);
+
   const checkHealth = useCallback(async () => {
     try {
       const health = await ChartWorkerManager.checkHealth();
@@ -110,6 +136,8 @@ export function useWorker({ scenario = 'all', autoInitialize = true } = {}) {
     metrics,
     initializeWorker,
     processData,
+    loadRankings,
+    applyDiff,
     checkHealth,
     terminate
   };
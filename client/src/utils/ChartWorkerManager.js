@@ -3,6 +3,7 @@
 // Uses shared scoringUtils for consistent logic with worker
 
 import { sortAgents } from './scoringUtils';
+import { RankingState } from './rankingState';
 
 export class ChartWorkerManager {
   constructor() {
@@ -11,6 +12,9 @@ export class ChartWorkerManager {
     this.isInitialized = false;
     this.workerReady = false;
     this.fallbackToMainThread = false;
+    // Ranking state for diffs lives in the worker, or here when it is unavailable
+    this.rankingState = new RankingState();
+    this.rankingStateOnWorker = false;
     
     this.metrics = {
       totalRequests: 0,
@@ -162,6 +166,48 @@ export class ChartWorkerManager {
     }
   }
 
+  // Load a full ranking list; later diffs (applyRankingDiff) apply to this state
+  async loadRankings(agents, scenario, version) {
+    const startTime = performance.now();
+    try {
+      if (this.fallbackToMainThread) throw new Error('Fallback active');
+
+      const response = await this.sendRequest({
+        type: 'load_rankings',
+        data: agents,
+        scenario,
+        version
+      });
+      this.updateLatencyMetrics(performance.now() - startTime);
+      this.rankingStateOnWorker = true;
+      return response.result;
+    } catch (error) {
+      console.warn('[ChartWorkerManager] Falling back to main thread ranking state', error);
+      this.rankingStateOnWorker = false;
+      return this.rankingState.load(agents, scenario, version);
+    }
+  }
+
+  // Apply a server ranking diff; null means the list has to be reloaded
+  async applyRankingDiff(diff) {
+    if (!this.rankingStateOnWorker) {
+      return this.rankingState.apply(diff);
+    }
+
+    const startTime = performance.now();
+    try {
+      const response = await this.sendRequest({ type: 'apply_diff', diff });
+      this.updateLatencyMetrics(performance.now() - startTime);
+      return response.result;
+    } catch (error) {
+      // The worker-held state is gone; the reload goes to the main thread
+      console.warn('[ChartWorkerManager] Ranking diff failed, reload required', error);
+      this.rankingStateOnWorker = false;
+      this.rankingState = new RankingState();
+      return null;
+    }
+  }
+
   // Main thread fallback - uses shared sortAgents for consistency
   processDataOnMainThread(agents, scenario) {
     return sortAgents(agents, scenario);
@@ -221,6 +267,7 @@ export class ChartWorkerManager {
       this.worker = null;
       this.workerReady = false;
       this.isInitialized = false;
+      this.rankingStateOnWorker = false;
       this.metrics.workerReady = false;
     }
   }
@@ -0,0 +1,98 @@
+// rankingState.js - Incrementally maintained ranking list
+// Mission: Apply server ranking diffs (shared/rankingDiff.mjs) without re-sorting the whole list
+// Used by the scoring worker and by ChartWorkerManager's main-thread fallback
+
+import { agentKey, applyDiff } from '../../../shared/rankingDiff.mjs';
+import { scoreAgent, sortAgents } from './scoringUtils';
+
+// Above this share of touched agents one full sort is cheaper than per-agent inserts
+const FULL_SORT_RATIO = 0.25;
+
+/**
+ * Position after every agent scoring >= score (list sorted descending)
+ * @param {Array} sorted - Scored agents
+ * @param {number} score - Weighted score to insert
+ * @returns {number} Insertion index
+ */
+function insertionIndex(sorted, score) {
+  let low = 0;
+  let high = sorted.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (sorted[mid].weightedScore >= score) low = mid + 1;
+    else high = mid;
+  }
+  return low;
+}
+
+/**
+ * Assign positional ranks; agents whose rank did not move keep their object
+ * identity so memoized rows do not re-render
+ * @param {Array} sorted - Scored agents in order
+ * @returns {Array} Ranked agents
+ */
+function rerank(sorted) {
+  return sorted.map((agent, index) => (
+    agent.rank === index + 1 && agent.avgPerf === agent.weightedScore
+      ? agent
+      : { ...agent, rank: index + 1, avgPerf: agent.weightedScore }
+  ));
+}
+
+export class RankingState {
+  constructor() {
+    this.scenario = null;
+    this.version = null;
+    this.agents = new Map();
+    this.sorted = [];
+  }
+
+  /**
+   * Replace the held list (full load from /api/agents)
+   * @param {Array} agents - Raw agents
+   * @param {string} scenario - Scenario the list was loaded for
+   * @param {string|null} version - Data version of the list
+   * @returns {Array} Sorted and ranked agents
+   */
+  load(agents, scenario = 'all', version = null) {
+    this.scenario = scenario;
+    this.version = version;
+    this.agents = new Map(agents.map(agent => [agentKey(agent), agent]));
+    this.sorted = sortAgents(agents, scenario);
+    return this.sorted;
+  }
+
+  /**
+   * Apply a `rankings:diff` message
+   * @param {Object} diff - Diff from the server (scopeDiff wire format)
+   * @returns {Array|null} Sorted and ranked agents, or null when the diff does
+   *   not follow the held version and the full list has to be reloaded
+   */
+  apply(diff) {
+    if (this.version !== null && diff.version === this.version) return this.sorted;
+    if (diff.reset || this.version === null || diff.previousVersion !== this.version || diff.scenario !== this.scenario) {
+      return null;
+    }
+
+    const touched = applyDiff(this.agents, diff);
+    this.version = diff.version;
+    if (touched.size === 0) return this.sorted;
+
+    if (touched.size > this.sorted.length * FULL_SORT_RATIO) {
+      this.sorted = sortAgents([...this.agents.values()], this.scenario);
+      return this.sorted;
+    }
+
+    // Remove touched agents, then binary-insert their re-scored versions
+    const next = this.sorted.filter(agent => !touched.has(agentKey(agent)));
+    for (const key of touched) {
+      const agent = this.agents.get(key);
+      if (!agent) continue;
+      const scored = scoreAgent(agent, this.scenario);
+      next.splice(insertionIndex(next, scored.weightedScore), 0, scored);
+    }
+
+    this.sorted = rerank(next);
+    return this.sorted;
+  }
+}
@@ -0,0 +1,55 @@
+/**
+ * @vitest-environment jsdom
+ */
+import { describe, it, expect, beforeEach } from 'vitest';
+import { diffRankings, scopeDiff } from '../../../shared/rankingDiff.mjs';
+import { RankingState } from './rankingState';
+import { sortAgents } from './scoringUtils';
+
+const agent = (model, avgPerf, scenarios = ['coding']) => ({ id: model, model, provider: 'Test', avgPerf, scenarios });
+
+describe('RankingState', () => {
+  let state;
+  const v1 = [agent('A', 90), agent('B', 80), agent('C', 70), agent('D', 60, ['reasoning'])];
+
+  beforeEach(() => {
+    state = new RankingState();
+    state.load(v1, 'all', '1');
+  });
+
+  it('should match a full sort after applying a diff', () => {
+    const base = Array.from({ length: 40 }, (_, i) => agent(`M${i}`, 100 - i));
+    state.load(base, 'all', '1');
+    // One agent climbs, one leaves, one joins
+    const next = base.filter(a => a.model !== 'M5').map(a => (a.model === 'M30' ? { ...a, avgPerf: 97.5 } : a));
+    next.push(agent('NEW', 80.5));
+
+    const result = state.apply(scopeDiff(diffRankings(base, next, { version: '2', previousVersion: '1' }), 'all'));
+
+    expect(result.map(a => [a.model, a.rank])).toEqual(sortAgents(next, 'all').map(a => [a.model, a.rank]));
+    expect(state.version).toBe('2');
+  });
+
+  it('should keep untouched rows that did not move', () => {
+    const before = state.sorted;
+    const v2 = [agent('A', 90), agent('B', 80), agent('C', 70), agent('D', 65, ['reasoning'])];
+    const result = state.apply(scopeDiff(diffRankings(v1, v2, { version: '2', previousVersion: '1' }), 'all'));
+
+    expect(result[0]).toBe(before[0]);
+    expect(result[3].avgPerf).toBe(65);
+  });
+
+  it('should ask for a reload when the diff does not follow the held version', () => {
+    const diff = scopeDiff(diffRankings(v1, v1, { version: '3', previousVersion: '2' }), 'all');
+    expect(state.apply(diff)).toBeNull();
+    expect(state.apply({ ...diff, previousVersion: '1', reset: true })).toBeNull();
+  });
+
+  it('should follow scenario membership changes', () => {
+    state.load(v1.filter(a => a.scenarios.includes('coding')), 'coding', '1');
+    const v2 = [agent('A', 90), agent('B', 80, ['reasoning']), agent('C', 70), agent('D', 60, ['reasoning', 'coding'])];
+    const result = state.apply(scopeDiff(diffRankings(v1, v2, { version: '2', previousVersion: '1' }), 'coding'));
+
+    expect(result.map(a => a.model).sort()).toEqual(['A', 'C', 'D']);
+  });
+});
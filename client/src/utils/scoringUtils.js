@@ -1,6 +1,11 @@
 // scoringUtils.js - Shared scoring and sorting utilities
 // Mission: Provide consistent scoring logic for both Web Worker and main thread
 
+import { compileScenarioRules, SCENARIO_WEIGHT_RULES } from '../../../shared/modelMatcher.mjs';
+
+// Scenario bonus/penalty rules compiled once
+const scenarioWeights = compileScenarioRules(SCENARIO_WEIGHT_RULES);
+
 /**
  * Calculate weighted performance score based on scenario
  * @param {Object} agent - Agent data object
@@ -8,57 +13,9 @@
  * @returns {number} Weighted performance score
  */
 export function calculateWeightedScore(agent, scenario = 'all') {
-  const modelName = (agent.model || '').toLowerCase();
-  const modelId = (agent.id || '').toLowerCase();
-  const searchStr = `${modelName} ${modelId}`;
-  
-  let multiplier = 1.0;
-  
-  // 1. Scenario: Coding
-  if (scenario === 'coding') {
-    const isBonus = searchStr.includes('coder') || 
-                    searchStr.includes('sonnet 3.5') || 
-                    searchStr.includes('sonnet-3-5') || 
-                    searchStr.includes('deepseek-coder');
-    const isWeak = searchStr.includes('flash') || 
-                   searchStr.includes('mini') || 
-                   searchStr.includes('turbo') || 
-                   searchStr.includes('small') ||
-                   searchStr.includes('haiku');
-
-    if (isBonus) multiplier = 1.0;
-    else if (isWeak) multiplier = 0.85;
-    else multiplier = 0.95;
-  } 
-  // 2. Scenario: Reasoning
-  else if (scenario === 'reasoning') {
-    const isBonus = searchStr.includes('qwq') || 
-                    searchStr.includes('o1') || 
-                    searchStr.includes('r1') || 
-                    searchStr.includes('opus');
-    const isPenalty = searchStr.includes('turbo') || 
-                      searchStr.includes('flash') || 
-                      searchStr.includes('mini');
-    
-    if (isBonus) multiplier = 1.0;
-    else if (isPenalty) multiplier = 0.90;
-  } 
-  // 3. Scenario: Creative
-  else if (scenario === 'creative') {
-    const isBonus = searchStr.includes('opus') || 
-                    searchStr.includes('gpt-4o') || 
-                    searchStr.includes('gemini pro') || 
-                    searchStr.includes('gemini-pro');
-    const isPenalty = searchStr.includes('coder') || 
-                      searchStr.includes('math');
-    
-    if (isBonus) multiplier = 1.0;
-    else if (isPenalty) multiplier = 0.85;
-  }
-  // Default (all scenarios): no additional weighting
-  else {
-    multiplier = 1.0;
-  }
+  // Unknown scenarios (including inherited keys such as 'constructor'): no additional weighting
+  const match = Object.hasOwn(scenarioWeights, scenario) ? scenarioWeights[scenario] : scenarioWeights.all;
+  const multiplier = match(`${agent.model || ''} ${agent.id ?? ''}`);
 
   const baseScore = agent.avgPerf || agent.overall_score || agent.score || 0;
   return parseFloat(baseScore) * multiplier;
@@ -77,6 +34,23 @@ export function calculateTier(score) {
   return 'D';
 }
 
+/**
+ * Score one agent for a scenario (weighted score + tier)
+ * @param {Object} agent - Agent data object
+ * @param {string} scenario - Scenario type
+ * @returns {Object} Copy of the agent with weightedScore and tier
+ */
+export function scoreAgent(agent, scenario = 'all') {
+  const weightedScore = calculateWeightedScore(agent, scenario);
+  const tier = scenario !== 'all' ? calculateTier(weightedScore) : (agent.tier || 'D');
+
+  return {
+    ...agent,
+    weightedScore,
+    tier
+  };
+}
+
 /**
  * Sort agents by performance score (descending)
  * @param {Array} agents - Array of agent objects
@@ -90,16 +64,7 @@ export function sortAgents(agents, scenario = 'all') {
   const workingCopy = [...agents];
   
   // Calculate weighted scores and assign tiers
-  const scored = workingCopy.map(agent => {
-    const weightedScore = calculateWeightedScore(agent, scenario);
-    const tier = scenario !== 'all' ? calculateTier(weightedScore) : (agent.tier || 'D');
-    
-    return {
-      ...agent,
-      weightedScore,
-      tier
-    };
-  });
+  const scored = workingCopy.map(agent => scoreAgent(agent, scenario));
   
   // Sort by weighted score descending
   scored.sort((a, b) => b.weightedScore - a.weightedScore);
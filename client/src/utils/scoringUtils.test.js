@@ -53,6 +53,12 @@ describe('scoringUtils', () => {
       expect(score).toBe(68); // 80 * 0.85 = 68
     });
 
+    it('should not weight unknown scenarios, including Object.prototype keys', () => {
+      const agent = { model: 'GPT-3.5-Turbo', avgPerf: 100 };
+      expect(calculateWeightedScore(agent, 'constructor')).toBe(100);
+      expect(calculateWeightedScore(agent, 'unknown')).toBe(100);
+    });
+
     it('should handle missing avgPerf gracefully', () => {
       const agent = { model: 'GPT-4' };
       expect(calculateWeightedScore(agent, 'all')).toBe(0);
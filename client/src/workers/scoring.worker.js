@@ -3,6 +3,10 @@
 // Uses shared scoringUtils for consistent logic with main thread
 
 import { calculateWeightedScore, calculateTier, sortAgents } from '../utils/scoringUtils';
+import { RankingState } from '../utils/rankingState';
+
+// Sorted ranking list held between messages; server diffs are applied to it
+const rankings = new RankingState();
 
 self.onmessage = (event) => {
   const { id, type, data, scenario } = event.data;
@@ -32,6 +36,25 @@ self.onmessage = (event) => {
     return;
   }
 
+  if (type === 'load_rankings') {
+    self.postMessage({
+      id,
+      type: 'process_result',
+      result: rankings.load(data, scenario, event.data.version)
+    });
+    return;
+  }
+
+  if (type === 'apply_diff') {
+    // null result: diff does not follow the held version, caller reloads
+    self.postMessage({
+      id,
+      type: 'diff_result',
+      result: rankings.apply(event.data.diff)
+    });
+    return;
+  }
+
   // Note: Benchmark functionality removed - can be added via separate endpoint if needed
   // The worker focuses on core process_data for scoring performance
 
@@ -26,6 +26,10 @@ export default defineConfig({
     }
   },
   server: {
+    // shared/ (repo root) holds code used by both server and client
+    fs: {
+      allow: ['.', '../shared'],
+    },
     proxy: {
       '/api': {
         target: 'http://localhost:14514',
@@ -0,0 +1,193 @@
+/**
+ * Load benchmark: POST /api/auth/refresh (token rotation) against the auth store
+ *
+ * Usage: node scripts/bench_auth_refresh.js [users=1000] [backgroundTokens=100000] [concurrency=50]
+ *        REDIS_URL=redis://localhost:6379 node scripts/bench_auth_refresh.js ... --redis
+ *
+ * Every virtual user rotates its own refresh-token chain through the real
+ * auth router over HTTP. The same load runs twice: on an empty store and after
+ * seeding `backgroundTokens` tokens for other users - with indexed revocation
+ * the two latency distributions should match (cost is O(tokens of the user),
+ * not O(all tokens)).
+ *
+ * Each user gets its own X-Forwarded-For address so refreshLimiter
+ * (10/min per IP) does not throttle the run; ROUNDS stays below that limit.
+ */
+const fs = require('fs');
+const http = require('http');
+const os = require('os');
+const path = require('path');
+const { performance } = require('perf_hooks');
+
+// 审计日志写到临时目录，不污染 logs/
+if (!process.env.AUDIT_LOG_FILE) {
+    process.env.AUDIT_LOG_FILE = path.join(fs.mkdtempSync(path.join(os.tmpdir(), 'bench-auth-')), 'audit.log');
+}
+
+const express = require('express');
+const authStore = require('../server/utils/authStore');
+const { generateTokens, REFRESH_TOKEN_TTL_MS } = require('../server/utils/jwt');
+const authRoutes = require('../server/routes/auth');
+
+const args = process.argv.slice(2).filter(arg => !arg.startsWith('--'));
+const USERS = parseInt(args[0] || '1000', 10);
+const BACKGROUND_TOKENS = parseInt(args[1] || '100000', 10);
+const CONCURRENCY = parseInt(args[2] || '50', 10);
+const USE_REDIS = process.argv.includes('--redis');
+const ROUNDS = 5;
+
+// 审计 console 输出会主导耗时，压测时静默
+console.log = ((log) => (...items) => {
+    if (typeof items[0] === 'string' && items[0].startsWith('[AUDIT]')) return;
+    log(...items);
+})(console.log);
+
+function percentile(sorted, p) {
+    return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+function post(port, body, ip, agent) {
+    return new Promise((resolve, reject) => {
+        const payload = JSON.stringify(body);
+        const req = http.request({
+            host: '127.0.0.1',
+            port,
+            path: '/api/auth/refresh',
+            method: 'POST',
+            agent,
+            headers: {
+                'Content-Type': 'application/json',
+                'Content-Length': Buffer.byteLength(payload),
+                'X-Forwarded-For': ip
+            }
+        }, (res) => {
+            let data = '';
+            res.on('data', chunk => data += chunk);
+            res.on('end', () => resolve({ status: res.statusCode, body: data ? JSON.parse(data) : null }));
+        });
+        req.on('error', reject);
+        req.end(payload);
+    });
+}
+
+async function seedBackground(store, count) {
+    const now = Date.now();
+    const batch = [];
+    for (let i = 0; i < count; i++) {
+        const userId = `bg-${i % Math.max(1, Math.floor(count / 5))}`;
+        batch.push(store.saveToken({
+            tokenId: `bg-token-${i}`,
+            userId,
+            email: `${userId}@bench.local`,
+            familyId: `bg-family-${i}`,
+            deviceInfo: 'bench',
+            createdAt: now
+        }, REFRESH_TOKEN_TTL_MS));
+        if (batch.length >= 1000) await Promise.all(batch.splice(0));
+    }
+    await Promise.all(batch);
+}
+
+async function createUsers(store, phase) {
+    const users = [];
+    for (let i = 0; i < USERS; i++) {
+        const user = await store.createUser({
+            email: `bench-${phase}-${i}@bench.local`,
+            password: 'x',
+            role: 'user',
+            createdAt: new Date().toISOString()
+        });
+        const tokens = await generateTokens(user, { deviceInfo: 'bench' });
+        users.push({ refreshToken: tokens.refreshToken, ip: `10.${phase}.${i >> 8}.${i & 255}` });
+    }
+    return users;
+}
+
+async function runPhase(port, users) {
+    const agent = new http.Agent({ keepAlive: true, maxSockets: CONCURRENCY });
+    const latencies = [];
+    let failed = 0;
+    let next = 0;
+
+    const start = performance.now();
+    await Promise.all(Array.from({ length: CONCURRENCY }, async () => {
+        while (next < users.length) {
+            const user = users[next++];
+            for (let round = 0; round < ROUNDS; round++) {
+                const t0 = performance.now();
+                const res = await post(port, { refreshToken: user.refreshToken }, user.ip, agent);
+                latencies.push(performance.now() - t0);
+                if (res.status !== 200) {
+                    failed++;
+                    break;
+                }
+                user.refreshToken = res.body.data.refreshToken;
+            }
+        }
+    }));
+    const seconds = (performance.now() - start) / 1000;
+    agent.destroy();
+
+    latencies.sort((a, b) => a - b);
+    return {
+        requests: latencies.length,
+        failed,
+        rps: latencies.length / seconds,
+        p50: percentile(latencies, 0.50),
+        p95: percentile(latencies, 0.95),
+        p99: percentile(latencies, 0.99)
+    };
+}
+
+function report(label, result) {
+    console.log(
+        `${label.padEnd(28)} ${String(result.requests).padStart(6)} req   ${result.rps.toFixed(0).padStart(6)} req/s   ` +
+        `p50 ${result.p50.toFixed(2).padStart(6)}ms   p95 ${result.p95.toFixed(2).padStart(6)}ms   ` +
+        `p99 ${result.p99.toFixed(2).padStart(6)}ms${result.failed ? `   ❌ ${result.failed} failed` : ''}`
+    );
+}
+
+async function main() {
+    let redisClient = null;
+    if (USE_REDIS) {
+        const redis = require('redis');
+        redisClient = redis.createClient({ url: process.env.REDIS_URL || 'redis://localhost:6379' });
+        await redisClient.connect();
+        authStore.setAuthStore(new authStore.RedisAuthStore(redisClient, { prefix: `bench:auth:${Date.now()}:` }));
+    }
+    const store = authStore.getAuthStore();
+
+    const app = express();
+    app.set('trust proxy', true);
+    app.use(express.json());
+    app.use('/api/auth', authRoutes);
+    const server = await new Promise(resolve => {
+        const s = app.listen(0, '127.0.0.1', () => resolve(s));
+    });
+    const { port } = server.address();
+
+    console.log(`🏁 /api/auth/refresh benchmark: ${USERS} users x ${ROUNDS} rotations, concurrency ${CONCURRENCY}, ` +
+        `${USE_REDIS ? 'Redis' : 'memory'} store\n`);
+
+    const empty = await runPhase(port, await createUsers(store, 1));
+    report('empty store', empty);
+
+    await seedBackground(store, BACKGROUND_TOKENS);
+    const loaded = await runPhase(port, await createUsers(store, 2));
+    report(`+${BACKGROUND_TOKENS} background tokens`, loaded);
+
+    server.close();
+    if (redisClient) await redisClient.quit();
+
+    if (empty.failed || loaded.failed) {
+        console.error('\n❌ Some refreshes failed');
+        process.exit(1);
+    }
+    console.log(`\np99 ratio (loaded / empty): x${(loaded.p99 / empty.p99).toFixed(2)}`);
+    process.exit(0);
+}
+
+main().catch(error => {
+    console.error('Benchmark failed:', error);
+    process.exit(1);
+});
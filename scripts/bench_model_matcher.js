@@ -0,0 +1,255 @@
+/**
+ * Benchmark: compiled model matcher (shared/modelMatcher.mjs) vs the previous
+ * includes()/replace()/per-call RegExp implementations
+ *
+ * Usage: node scripts/bench_model_matcher.js [count=100000]
+ *
+ * The sync_data rows run over `count` synthetic HF names (mostly distinct,
+ * one pass per sync). The scoring rows run `count` lookups over a catalogue
+ * of CATALOGUE_SIZE names - rescoring the rankings repeats the same names -
+ * with the matchers' default memo. "cold" is a first pass through a freshly
+ * compiled matcher (empty memo cache); "warm" repeats the pass on the same
+ * matcher. Speedups are reported for both. Outputs are compared so a
+ * rule-table mistake shows up here.
+ */
+const fs = require('fs');
+const path = require('path');
+const { performance } = require('perf_hooks');
+
+const {
+    compileRules,
+    compileScenarioRules,
+    compileAgentCoefficients,
+    literals,
+    memoize,
+    MODEL_MULTIPLIER_RULES,
+    SCENARIO_WEIGHT_RULES
+} = require('../shared/modelMatcher.mjs');
+
+const COUNT = parseInt(process.argv[2] || '100000', 10);
+const SCENARIOS = ['all', 'coding', 'reasoning', 'creative'];
+// Models on the leaderboard that /api/agents rescoring walks through
+const CATALOGUE_SIZE = 1000;
+// Runs per measurement; the median is reported
+const RUNS = [1, 2, 3, 4, 5];
+const AGENT_COEFFICIENTS = JSON.parse(fs.readFileSync(path.join(__dirname, '../server/data/agent_coefficients.json'), 'utf8'));
+
+// ============================================
+// Synthetic names (deterministic)
+// ============================================
+
+function generateNames(count) {
+    const orgs = ['meta-llama', 'Qwen', 'mistralai', 'deepseek-ai', 'google', 'anthropic', 'openai', 'someuser', '01-ai', 'NousResearch'];
+    const bases = ['Meta-Llama-3.1', 'Llama-3', 'Qwen2.5', 'QwQ', 'Mixtral-8x7B', 'deepseek-coder', 'gemma-2', 'claude-3.5-sonnet', 'gpt-4o', 'Yi', 'Hermes', 'o1', 'gemini-pro'];
+    const sizes = ['7B', '8B', '14B', '32B', '70B', '72B', '1.5B', ''];
+    const suffixes = ['-Instruct', '-Chat', '-hf', '-v0.2', '-GGUF', '-AWQ', '-merge', '-mini', '-turbo', '-flash', '-Coder', ''];
+
+    let seed = 42;
+    const rand = (n) => {
+        seed = (seed * 1103515245 + 12345) & 0x7fffffff;
+        return seed % n;
+    };
+
+    // 约 1/4 重名 - 与真实排行榜相近 (同一模型的多个量化/微调版本)
+    const unique = Math.ceil(count * 0.75);
+    const names = [];
+    for (let i = 0; i < count; i++) {
+        const n = i < unique ? i : rand(unique);
+        const size = sizes[n % sizes.length];
+        names.push(`${orgs[rand(orgs.length)]}/${bases[n % bases.length]}${size ? '-' + size : ''}${suffixes[(n >> 3) % suffixes.length]}-${n}`);
+    }
+    return names;
+}
+
+// ============================================
+// Previous implementations
+// ============================================
+
+function legacyGetAgenticMultiplier(modelName) {
+    const name = modelName.toLowerCase();
+    if (AGENT_COEFFICIENTS.high.patterns.some(p => name.includes(p.toLowerCase()))) {
+        return AGENT_COEFFICIENTS.high.multiplier;
+    }
+    if (AGENT_COEFFICIENTS.mid.patterns.some(p => name.includes(p.toLowerCase()))) {
+        return AGENT_COEFFICIENTS.mid.multiplier;
+    }
+    return AGENT_COEFFICIENTS.low.multiplier || 1.0;
+}
+
+function legacyIsCommunityVariant(fullname) {
+    return /merge|mix|quant|awq|gptq|gguf|exl2|quik/.test(fullname.toLowerCase());
+}
+
+function legacyExtractFamily(fullname) {
+    const name = fullname.split('/').pop();
+    let family = name
+        .replace(/-Instruct/gi, '')
+        .replace(/-Chat/gi, '')
+        .replace(/-hf/gi, '')
+        .replace(/-v[0-9.]+/gi, '')
+        .replace(/_/g, ' ')
+        .replace(/-/g, ' ');
+    const sizeMatch = family.match(/([0-9x.]+[Bb])/);
+    const size = sizeMatch ? sizeMatch[1].toUpperCase() : '';
+    let baseName = family.split(sizeMatch ? sizeMatch[0] : '____')[0].trim();
+    baseName = baseName
+        .replace(/^Meta /i, '')
+        .replace(/^Mistral /i, '')
+        .replace(/^Mixtral /i, '')
+        .replace(/^Qwen /i, '')
+        .replace(/Base$/i, '')
+        .trim();
+    if (baseName.toLowerCase().includes('llama 3.1')) baseName = 'Llama 3.1';
+    else if (baseName.toLowerCase().includes('llama 3')) baseName = 'Llama 3';
+    else if (baseName.toLowerCase().includes('qwen') || baseName.toLowerCase().includes('qwq')) return 'Qwen';
+    return `${baseName} ${size}`.trim();
+}
+
+// server/utils/scoring.ts - table rebuilt on every call
+function legacyGetModelMultiplier(searchStr, scenario) {
+    const multipliers = {
+        all: { bonus: /sonnet/i, penalty: /haiku|mini|turbo/i, bonusVal: 1.05, penaltyVal: 0.90 },
+        coding: { bonus: /coder|sonnet.*3\.5|deepseek.*coder|claude.*3\.5/i, penalty: /flash|mini|turbo|small|haiku/i, bonusVal: 1.10, penaltyVal: 0.85 },
+        reasoning: { bonus: /qwq|o1|r1|opus/i, penalty: /turbo|flash|mini/i, bonusVal: 1.10, penaltyVal: 0.90 },
+        creative: { bonus: /opus|gpt-4o|gemini.*pro|sonnet/i, penalty: /haiku|turbo|flash/i, bonusVal: 1.08, penaltyVal: 0.88 },
+    };
+    const config = multipliers[scenario];
+    if (config.bonus.test(searchStr)) return config.bonusVal;
+    if (config.penalty.test(searchStr)) return config.penaltyVal;
+    return 1.0;
+}
+
+// client/src/utils/scoringUtils.js calculateWeightedScore multiplier
+function legacyScenarioWeight(searchStr, scenario) {
+    const s = searchStr.toLowerCase();
+    if (scenario === 'coding') {
+        if (s.includes('coder') || s.includes('sonnet 3.5') || s.includes('sonnet-3-5') || s.includes('deepseek-coder')) return 1.0;
+        if (s.includes('flash') || s.includes('mini') || s.includes('turbo') || s.includes('small') || s.includes('haiku')) return 0.85;
+        return 0.95;
+    }
+    if (scenario === 'reasoning') {
+        if (s.includes('qwq') || s.includes('o1') || s.includes('r1') || s.includes('opus')) return 1.0;
+        if (s.includes('turbo') || s.includes('flash') || s.includes('mini')) return 0.90;
+        return 1.0;
+    }
+    if (scenario === 'creative') {
+        if (s.includes('opus') || s.includes('gpt-4o') || s.includes('gemini pro') || s.includes('gemini-pro')) return 1.0;
+        if (s.includes('coder') || s.includes('math')) return 0.85;
+        return 1.0;
+    }
+    return 1.0;
+}
+
+// ============================================
+// Compiled implementations
+// ============================================
+
+function compiledExtractFamily() {
+    // 与 server/scripts/sync_data.js 中的实现一致 (该脚本依赖 Redis 客户端，这里不直接 require)
+    const matchDisplayName = compileRules([
+        { value: 'Llama 3.1', patterns: literals(['llama 3.1']) },
+        { value: 'Llama 3', patterns: literals(['llama 3']) },
+        { value: 'Qwen', patterns: literals(['qwen', 'qwq']) }
+    ], { cacheSize: 0 });
+    return memoize((fullname) => {
+        const family = fullname.slice(fullname.lastIndexOf('/') + 1)
+            .replace(/-(?:Instruct|Chat|hf|v[0-9.]+)/gi, '')
+            .replace(/[_-]/g, ' ');
+        const sizeMatch = /[0-9x.]+[Bb]/.exec(family);
+        const size = sizeMatch ? sizeMatch[0].toUpperCase() : '';
+        let baseName = (sizeMatch ? family.slice(0, sizeMatch.index) : family).trim();
+        baseName = baseName
+            .replace(/^(?:Meta )?(?:Mistral )?(?:Mixtral )?(?:Qwen )?/i, '')
+            .replace(/Base$/i, '')
+            .trim();
+        const displayName = matchDisplayName(baseName);
+        if (displayName === 'Qwen') return 'Qwen';
+        if (displayName) baseName = displayName;
+        return `${baseName} ${size}`.trim();
+    });
+}
+
+// ============================================
+// Runner
+// ============================================
+
+function time(fn, names) {
+    const start = performance.now();
+    const out = new Array(names.length);
+    for (let i = 0; i < names.length; i++) out[i] = fn(names[i]);
+    return { ms: performance.now() - start, out };
+}
+
+function median(values) {
+    const sorted = values.slice().sort((a, b) => a - b);
+    return sorted[Math.floor(sorted.length / 2)];
+}
+
+/**
+ * @param {string} label - Row label
+ * @param {Function} legacyFn - Previous implementation
+ * @param {Function} createCompiled - Returns a fresh compiled matcher (empty memo cache)
+ * @param {string[]} names - Inputs
+ */
+function compare(label, legacyFn, createCompiled, names) {
+    // JIT 预热，避免先运行的实现吃亏
+    const warmup = names.slice(0, 5000);
+    time(legacyFn, warmup);
+    time(createCompiled(), warmup);
+
+    const legacyRuns = RUNS.map(() => time(legacyFn, names));
+    // 每次冷启动都用新编译的 matcher (空缓存)
+    const coldRuns = RUNS.map(() => time(createCompiled(), names));
+    const compiled = createCompiled();
+    time(compiled, names);
+    const warmRuns = RUNS.map(() => time(compiled, names));
+
+    let mismatches = 0;
+    for (let i = 0; i < names.length; i++) {
+        if (legacyRuns[0].out[i] !== coldRuns[0].out[i] || coldRuns[0].out[i] !== warmRuns[0].out[i]) mismatches++;
+    }
+
+    const legacyMs = median(legacyRuns.map(r => r.ms));
+    const coldMs = median(coldRuns.map(r => r.ms));
+    const warmMs = median(warmRuns.map(r => r.ms));
+    console.log(
+        `${label.padEnd(40)} legacy ${legacyMs.toFixed(1).padStart(7)}ms   ` +
+        `cold ${coldMs.toFixed(1).padStart(7)}ms x${(legacyMs / coldMs).toFixed(1).padEnd(5)} ` +
+        `warm ${warmMs.toFixed(1).padStart(7)}ms x${(legacyMs / warmMs).toFixed(1)}` +
+        `${mismatches ? `   ❌ ${mismatches} mismatches` : ''}`
+    );
+    return mismatches;
+}
+
+function main() {
+    const names = generateNames(COUNT);
+    const catalogue = names.slice(0, CATALOGUE_SIZE).map((name, i) => `${name} ${i}`);
+    const searchStrs = names.map((name, i) => catalogue[i % catalogue.length]);
+    console.log(`🏁 Model matcher benchmark: ${COUNT} names, scoring over a ${catalogue.length}-name catalogue\n`);
+
+    let mismatches = 0;
+    mismatches += compare('sync_data getAgenticMultiplier', legacyGetAgenticMultiplier,
+        () => compileAgentCoefficients(AGENT_COEFFICIENTS), names);
+    mismatches += compare('sync_data isCommunityVariant', legacyIsCommunityVariant, () => compileRules(
+        [{ value: true, patterns: ['merge', 'mix', 'quant', 'awq', 'gptq', 'gguf', 'exl2', 'quik'] }],
+        { fallback: false, cacheSize: 0 }
+    ), names);
+    mismatches += compare('sync_data extractFamily', legacyExtractFamily, compiledExtractFamily, names);
+
+    for (const scenario of SCENARIOS) {
+        mismatches += compare(`scoring.ts getModelMultiplier/${scenario}`, s => legacyGetModelMultiplier(s, scenario),
+            () => compileScenarioRules(MODEL_MULTIPLIER_RULES)[scenario], searchStrs);
+    }
+    for (const scenario of SCENARIOS) {
+        mismatches += compare(`scoringUtils weight/${scenario}`, s => legacyScenarioWeight(s, scenario),
+            () => compileScenarioRules(SCENARIO_WEIGHT_RULES)[scenario], searchStrs);
+    }
+
+    if (mismatches > 0) {
+        console.error(`\n❌ ${mismatches} results differ from the previous implementation`);
+        process.exit(1);
+    }
+    console.log('\n✅ All results match the previous implementation');
+}
+
+main();
@@ -0,0 +1,463 @@
+/**
+ * Benchmark suite: agents, auth refresh, audit and entropy endpoints against
+ * an in-process server, with a regression gate on a stored baseline
+ *
+ * Usage: node scripts/bench_suite.js [--requests=2000] [--warmup=200] [--concurrency=16]
+ *            [--scenarios=agents,auth-refresh,...] [--latency=0] [--breakdown]
+ *            [--tolerance=0.25] [--update-baseline | --no-gate | --require-baseline]
+ *        REDIS_URL=redis://localhost:6379 node scripts/bench_suite.js --redis
+ *
+ * Backend: by default Redis is the in-memory fake shared with the unit tests
+ * (tests/fixtures/fakeRedis.js); --latency=ms adds a simulated round trip to
+ * every command. --redis uses a real server and only writes into logical
+ * database BENCH_REDIS_DB (default 15).
+ *
+ * Every scenario sends `warmup` unrecorded requests, then `requests` measured
+ * ones with `concurrency` in flight, and reports p50/p95/p99, req/s and the
+ * event-loop delay p99 seen by the server during the run. --breakdown turns on
+ * request tracing (server/metrics/trace.js) and prints the average time per
+ * request spent in each instrumented operation.
+ *
+ * Regression gate: results are compared with scripts/bench_baseline.json
+ * (per backend and scenario). A scenario fails when its p95 or p99 exceeds
+ * baseline * (1 + tolerance) + 1ms, and the run exits with code 1.
+ * --update-baseline records the current results instead. Latencies depend on
+ * the machine, so no baseline is committed: CI (`npm run bench:gate`) records
+ * one on the base commit and compares the change against it on the same
+ * runner. Locally, until the file exists the gate only prints a warning;
+ * --require-baseline makes a missing file fail the run. Once it exists, a
+ * scenario missing from it fails the run, so a stale baseline cannot silently
+ * disable the gate; --no-gate only reports the numbers.
+ */
+const fs = require('fs');
+const http = require('http');
+const os = require('os');
+const path = require('path');
+const { performance, monitorEventLoopDelay } = require('perf_hooks');
+
+const TMP_DIR = fs.mkdtempSync(path.join(os.tmpdir(), 'bench-suite-'));
+
+// 审计日志写到临时目录，不污染 logs/
+if (!process.env.AUDIT_LOG_FILE) {
+    process.env.AUDIT_LOG_FILE = path.join(TMP_DIR, 'audit.log');
+}
+// 审计事件只写日志文件，不逐条输出到 console (与 AUDIT_QUIET=1 部署一致)
+if (!process.env.AUDIT_QUIET) {
+    process.env.AUDIT_QUIET = '1';
+}
+// 桩 worker 立即应答，只测进程往返
+process.env.STUB_DELAY_MS = process.env.STUB_DELAY_MS || '0';
+
+const express = require('express');
+const compression = require('compression');
+const { metricsMiddleware } = require('../server/metrics');
+const { traceMiddleware, summarizeSpans } = require('../server/metrics/trace');
+const { readThroughCache } = require('../server/utils/cache');
+const { AuditLogStore } = require('../server/utils/audit');
+const { EntropyWorker } = require('../server/utils/entropyWorker');
+const authStore = require('../server/utils/authStore');
+const { generateTokens } = require('../server/utils/jwt');
+const agentsRoutes = require('../server/routes/agents');
+const authRoutes = require('../server/routes/auth');
+const auditRoutes = require('../server/routes/audit');
+const entropyRoutes = require('../server/routes/entropy');
+const { createFakeRedis } = require('../tests/fixtures/fakeRedis');
+
+function option(name, fallback) {
+    const arg = process.argv.find(item => item.startsWith(`--${name}=`));
+    return arg ? arg.slice(name.length + 3) : fallback;
+}
+
+const REQUESTS = parseInt(option('requests', '2000'), 10);
+const WARMUP = parseInt(option('warmup', '200'), 10);
+const CONCURRENCY = parseInt(option('concurrency', '16'), 10);
+const LATENCY_MS = parseFloat(option('latency', '0'));
+const TOLERANCE = parseFloat(option('tolerance', '0.25'));
+const SLACK_MS = 1;
+const USE_REDIS = process.argv.includes('--redis');
+const BREAKDOWN = process.argv.includes('--breakdown');
+const UPDATE_BASELINE = process.argv.includes('--update-baseline');
+const NO_GATE = process.argv.includes('--no-gate');
+const REQUIRE_BASELINE = process.argv.includes('--require-baseline');
+const BASELINE_FILE = path.join(__dirname, 'bench_baseline.json');
+const BACKEND = USE_REDIS ? 'redis' : LATENCY_MS > 0 ? `stand-in-${LATENCY_MS}ms` : 'stand-in';
+
+const AGENT_COUNT = 500;
+const AUDIT_ENTRIES = 50000;
+const HISTORY_ENTRIES = 5000;
+// refreshLimiter 每个 IP 每分钟 10 次
+const ROTATIONS_PER_CHAIN = 8;
+
+function percentile(sorted, p) {
+    return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+function send(port, agent, { method = 'GET', path: urlPath, headers = {}, body }) {
+    return new Promise((resolve, reject) => {
+        const payload = body ? JSON.stringify(body) : null;
+        const req = http.request({
+            host: '127.0.0.1',
+            port,
+            path: urlPath,
+            method,
+            agent,
+            headers: payload
+                ? { ...headers, 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(payload) }
+                : headers
+        }, (res) => {
+            const chunks = [];
+            res.on('data', chunk => chunks.push(chunk));
+            res.on('end', () => resolve({ status: res.statusCode, headers: res.headers, body: Buffer.concat(chunks) }));
+        });
+        req.on('error', reject);
+        req.end(payload);
+    });
+}
+
+// ==================== 数据准备 ====================
+
+async function seedLeaderboard(client) {
+    const pipeline = client.multi();
+    for (let i = 0; i < AGENT_COUNT; i++) {
+        const id = `bench-agent-${i}`;
+        pipeline.zAdd('leaderboard:overall', [{ score: 1000 - i, value: id }]);
+        pipeline.hSet(`agent:metadata:${id}`, {
+            id,
+            name: `Bench Agent ${i}`,
+            provider: ['OpenAI', 'Anthropic', 'Google', 'Meta'][i % 4],
+            avgPerf: String(95 - i * 0.1),
+            scenarios: ['coding,reasoning', 'general,creative', 'reasoning,general'][i % 3]
+        });
+    }
+    pipeline.set('leaderboard:version', '1');
+    pipeline.set('leaderboard:updated_at', String(Date.now()));
+    await pipeline.exec();
+}
+
+async function clearLeaderboard(client) {
+    const keys = ['leaderboard:overall', 'leaderboard:version', 'leaderboard:updated_at'];
+    for (let i = 0; i < AGENT_COUNT; i++) keys.push(`agent:metadata:bench-agent-${i}`);
+    await client.del(keys);
+}
+
+async function createAuditStore() {
+    const store = new AuditLogStore({ basePath: path.join(TMP_DIR, 'audit-read.log') });
+    const events = ['LOGIN_SUCCESS', 'LOGIN_FAILED', 'TOKEN_REFRESH', 'RATE_LIMIT_EXCEEDED'];
+    const start = Date.now() - AUDIT_ENTRIES * 1000;
+    for (let i = 0; i < AUDIT_ENTRIES; i += 1000) {
+        const lines = [];
+        for (let j = i; j < Math.min(i + 1000, AUDIT_ENTRIES); j++) {
+            lines.push(JSON.stringify({
+                timestamp: new Date(start + j * 1000).toISOString(),
+                event: events[j % events.length],
+                ip: `10.0.${(j >> 8) & 255}.${j & 255}`,
+                path: '/api/auth/login'
+            }));
+        }
+        store.appendLines(lines);
+        await store.flush();
+    }
+    return store;
+}
+
+function writeEntropyHistory() {
+    const historyPath = path.join(TMP_DIR, 'entropy_history.json');
+    const now = Date.now();
+    const history = Array.from({ length: HISTORY_ENTRIES }, (_, i) => ({
+        timestamp: new Date(now - (HISTORY_ENTRIES - i) * 60000).toISOString(),
+        entropy: 0.3 + (i % 50) / 100
+    }));
+    fs.writeFileSync(historyPath, JSON.stringify(history));
+    return historyPath;
+}
+
+async function createRefreshChains(count) {
+    const chains = [];
+    for (let i = 0; i < count; i++) {
+        const user = await authStore.getAuthStore().createUser({
+            email: `bench-suite-${i}@bench.local`,
+            password: 'x',
+            role: 'user',
+            createdAt: new Date().toISOString()
+        });
+        const tokens = await generateTokens(user, { deviceInfo: 'bench' });
+        chains.push({ refreshToken: tokens.refreshToken, ip: `10.9.${i >> 8}.${i & 255}`, uses: 0 });
+    }
+    return chains;
+}
+
+// ==================== 场景 ====================
+
+const ACCEPT_BR = { 'Accept-Encoding': 'br, gzip' };
+
+const SCENARIOS = {
+    'agents': {
+        request: () => ({ path: '/api/agents', headers: ACCEPT_BR })
+    },
+    'agents-304': {
+        status: 304,
+        async prepare(port, agent) {
+            const res = await send(port, agent, { path: '/api/agents', headers: ACCEPT_BR });
+            this.etag = res.headers.etag;
+        },
+        request() {
+            return { path: '/api/agents', headers: { ...ACCEPT_BR, 'If-None-Match': this.etag } };
+        }
+    },
+    'agents-rebuild': {
+        // 每次请求前丢弃快照: Redis 读取 + 序列化 + 压缩的完整路径
+        request: (i) => {
+            agentsRoutes.invalidateSnapshots();
+            return { path: `/api/agents?scenario=${['all', 'coding', 'reasoning'][i % 3]}`, headers: ACCEPT_BR };
+        }
+    },
+    'auth-refresh': {
+        async prepare() {
+            const needed = Math.ceil((WARMUP + REQUESTS) / ROTATIONS_PER_CHAIN) + CONCURRENCY;
+            this.ready = await createRefreshChains(needed);
+        },
+        request() {
+            const chain = this.ready.shift();
+            return {
+                method: 'POST',
+                path: '/api/auth/refresh',
+                headers: { 'X-Forwarded-For': chain.ip },
+                body: { refreshToken: chain.refreshToken },
+                chain
+            };
+        },
+        onResponse(res, { chain }) {
+            if (res.status !== 200) return;
+            chain.refreshToken = JSON.parse(res.body).data.refreshToken;
+            if (++chain.uses < ROTATIONS_PER_CHAIN) this.ready.push(chain);
+        }
+    },
+    'audit-logs': {
+        request: (i) => ({
+            path: `/api/audit/logs?limit=50&offset=${(i * 37) % 5000}${i % 4 === 0 ? '&event=LOGIN_FAILED' : ''}`
+        })
+    },
+    'entropy': {
+        request: () => ({ path: '/api/entropy' })
+    },
+    'entropy-history': {
+        request: () => ({ path: '/api/entropy/history' })
+    }
+};
+
+// ==================== 执行 ====================
+
+const traces = { recording: false, items: [] };
+const loopDelay = monitorEventLoopDelay({ resolution: 10 });
+
+async function runScenario(port, name) {
+    const scenario = SCENARIOS[name];
+    const agent = new http.Agent({ keepAlive: true, maxSockets: CONCURRENCY });
+    if (scenario.prepare) await scenario.prepare(port, agent);
+
+    const runPhase = async (count, record) => {
+        const latencies = [];
+        let failed = 0;
+        let issued = 0;
+        await Promise.all(Array.from({ length: CONCURRENCY }, async () => {
+            while (issued < count) {
+                const options = scenario.request(issued++);
+                const t0 = performance.now();
+                const res = await send(port, agent, options);
+                const ms = performance.now() - t0;
+                if (res.status !== (scenario.status || 200)) failed++;
+                if (scenario.onResponse) scenario.onResponse(res, options);
+                if (record) latencies.push(ms);
+            }
+        }));
+        return { latencies, failed };
+    };
+
+    await runPhase(WARMUP, false);
+
+    traces.items = [];
+    traces.recording = true;
+    loopDelay.reset();
+    const start = performance.now();
+    const { latencies, failed } = await runPhase(REQUESTS, true);
+    const seconds = (performance.now() - start) / 1000;
+    traces.recording = false;
+    agent.destroy();
+
+    latencies.sort((a, b) => a - b);
+    return {
+        requests: latencies.length,
+        failed,
+        rps: latencies.length / seconds,
+        p50: percentile(latencies, 0.50),
+        p95: percentile(latencies, 0.95),
+        p99: percentile(latencies, 0.99),
+        loopDelayP99: loopDelay.percentile(99) / 1e6,
+        breakdown: summarizeSpans(traces.items.flatMap(trace => trace.spans))
+            .map(span => ({ name: span.name, ms: span.ms / latencies.length }))
+    };
+}
+
+function report(name, result) {
+    console.log(
+        `${name.padEnd(16)} ${result.rps.toFixed(0).padStart(7)} req/s   ` +
+        `p50 ${result.p50.toFixed(2).padStart(7)}ms   p95 ${result.p95.toFixed(2).padStart(7)}ms   ` +
+        `p99 ${result.p99.toFixed(2).padStart(7)}ms   loop p99 ${result.loopDelayP99.toFixed(1).padStart(5)}ms` +
+        `${result.failed ? `   ❌ ${result.failed} failed` : ''}`
+    );
+    if (BREAKDOWN && result.breakdown.length > 0) {
+        const spans = result.breakdown
+            .slice(0, 6)
+            .map(span => `${span.name}=${span.ms.toFixed(3)}ms`)
+            .join('  ');
+        console.log(`${''.padEnd(16)}   └ ${spans}`);
+    }
+}
+
+/**
+ * Compare a result with its baseline
+ * @returns {string[]} Regression descriptions (empty when within tolerance)
+ */
+function findRegressions(result, baseline) {
+    return ['p95', 'p99']
+        .filter(metric => result[metric] > baseline[metric] * (1 + TOLERANCE) + SLACK_MS)
+        .map(metric => `${metric} ${result[metric].toFixed(2)}ms > baseline ${baseline[metric].toFixed(2)}ms`);
+}
+
+async function main() {
+    const names = option('scenarios', Object.keys(SCENARIOS).join(',')).split(',');
+    const unknown = names.filter(name => !SCENARIOS[name]);
+    if (unknown.length > 0) {
+        throw new Error(`Unknown scenario(s): ${unknown.join(', ')} (available: ${Object.keys(SCENARIOS).join(', ')})`);
+    }
+
+    let redisClient;
+    if (USE_REDIS) {
+        const redis = require('redis');
+        redisClient = redis.createClient({
+            url: process.env.REDIS_URL || 'redis://localhost:6379',
+            database: parseInt(process.env.BENCH_REDIS_DB || '15', 10)
+        });
+        await redisClient.connect();
+    } else {
+        redisClient = createFakeRedis({ latencyMs: LATENCY_MS });
+    }
+    await seedLeaderboard(redisClient);
+
+    readThroughCache.setRedisClient(redisClient, true);
+    agentsRoutes.setRedisClient(redisClient, true);
+    authStore.setAuthStore(new authStore.RedisAuthStore(redisClient, { prefix: `bench:auth:${Date.now()}:` }));
+    auditRoutes.setStore(await createAuditStore());
+    entropyRoutes.configure({
+        worker: new EntropyWorker({
+            command: process.execPath,
+            args: [path.join(__dirname, '../tests/fixtures/entropyWorkerStub.js')]
+        }),
+        historyPath: writeEntropyHistory(),
+        // 不缓存: 每次请求都走一次子进程往返
+        ttlMs: 0,
+        staleMs: 0
+    });
+
+    const app = express();
+    app.set('trust proxy', true);
+    app.use(traceMiddleware({
+        enabled: BREAKDOWN,
+        onTrace: (trace) => {
+            if (traces.recording) traces.items.push(trace);
+        }
+    }));
+    app.use(compression());
+    app.use(express.json());
+    app.use(metricsMiddleware());
+    app.use('/api/auth', authRoutes);
+    app.use('/api/audit', auditRoutes);
+    app.use('/api', entropyRoutes);
+    app.use('/api', agentsRoutes);
+
+    const server = await new Promise(resolve => {
+        const s = app.listen(0, '127.0.0.1', () => resolve(s));
+    });
+    const { port } = server.address();
+
+    console.log(`🏁 Benchmark suite: ${REQUESTS} requests (+${WARMUP} warmup) per scenario, ` +
+        `concurrency ${CONCURRENCY}, backend ${BACKEND}\n`);
+
+    loopDelay.enable();
+    const results = {};
+    for (const name of names) {
+        results[name] = await runScenario(port, name);
+        report(name, results[name]);
+    }
+    loopDelay.disable();
+
+    server.close();
+    entropyRoutes.shutdown();
+    if (USE_REDIS) {
+        await clearLeaderboard(redisClient);
+        await redisClient.quit();
+    }
+    fs.rmSync(TMP_DIR, { recursive: true, force: true });
+
+    const failed = names.filter(name => results[name].failed > 0);
+    if (failed.length > 0) {
+        console.error(`\n❌ Requests failed in: ${failed.join(', ')}`);
+        process.exit(1);
+    }
+
+    const baselines = fs.existsSync(BASELINE_FILE) ? JSON.parse(fs.readFileSync(BASELINE_FILE, 'utf8')) : {};
+
+    if (UPDATE_BASELINE) {
+        baselines[BACKEND] = { ...baselines[BACKEND] };
+        for (const name of names) {
+            const { p50, p95, p99, rps } = results[name];
+            baselines[BACKEND][name] = {
+                p50: +p50.toFixed(3),
+                p95: +p95.toFixed(3),
+                p99: +p99.toFixed(3),
+                rps: Math.round(rps)
+            };
+        }
+        fs.writeFileSync(BASELINE_FILE, JSON.stringify(baselines, null, 2) + '\n');
+        console.log(`\n📝 Baseline for ${BACKEND} written to ${path.relative(process.cwd(), BASELINE_FILE)}`);
+        process.exit(0);
+    }
+
+    if (NO_GATE) {
+        console.log('\nℹ️  Regression gate skipped (--no-gate)');
+        process.exit(0);
+    }
+
+    if (!fs.existsSync(BASELINE_FILE)) {
+        if (REQUIRE_BASELINE) {
+            console.error(`\n❌ No baseline file (${path.relative(process.cwd(), BASELINE_FILE)}) - record one with --update-baseline`);
+            process.exit(1);
+        }
+        console.warn(`\n⚠️  No baseline file yet - regression gate skipped (record one with --update-baseline)`);
+        process.exit(0);
+    }
+
+    const baseline = baselines[BACKEND] || {};
+    const missing = names.filter(name => !baseline[name]);
+    if (missing.length > 0) {
+        console.error(`\n❌ No ${BACKEND} baseline for: ${missing.join(', ')} (record one with --update-baseline, or pass --no-gate)`);
+        process.exit(1);
+    }
+
+    const regressions = names
+        .filter(name => baseline[name])
+        .flatMap(name => findRegressions(results[name], baseline[name]).map(text => `${name}: ${text}`));
+    if (regressions.length > 0) {
+        console.error(`\n❌ Regressions (tolerance ${Math.round(TOLERANCE * 100)}% + ${SLACK_MS}ms):`);
+        regressions.forEach(text => console.error(`   ${text}`));
+        process.exit(1);
+    }
+
+    console.log('\n✅ No regressions against baseline');
+    process.exit(0);
+}
+
+main().catch(error => {
+    console.error('Benchmark failed:', error);
+    process.exit(1);
+});
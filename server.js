@@ -8,6 +8,7 @@ const { Server } = require('socket.io');
 const { exec } = require('child_process');
 const fs = require('fs');
 const cors = require('cors');
+const cluster = require('cluster');
 
 // Error handling middleware
 const { 
@@ -20,6 +21,21 @@ const {
 // Winston Logger - Phase 1: Logging System
 const logger = require('./server/utils/logger');
 
+// Cluster 模式 - CLUSTER_WORKERS=auto 时每个 CPU 核心一个 worker
+const { resolveWorkerCount, isLeader, startPrimary } = require('./server/cluster');
+const CLUSTER_WORKERS = resolveWorkerCount();
+
+if (cluster.isPrimary && CLUSTER_WORKERS > 1) {
+    startPrimary({ workers: CLUSTER_WORKERS, logger });
+    return;
+}
+
+// 进程内 LRU 缓存 (Redis pub/sub 失效) 与 Socket.IO Redis 适配器
+const { readThroughCache } = require('./server/utils/cache');
+const { createRedisAdapter } = require('./server/utils/socketRedisAdapter');
+const { UpdateThrottle } = require('./server/utils/updateThrottle');
+const { scopeDiff } = require('./shared/rankingDiff.mjs');
+
 // Prometheus Metrics - Phase 1: Monitoring
 const { 
     metricsMiddleware, 
@@ -70,9 +86,14 @@ const corsOptions = {
 
 app.use(cors(corsOptions));
 
+// 请求级耗时分解 (TRACE_REQUESTS=1 时启用，默认直接放行)
+const { traceMiddleware } = require('./server/metrics/trace');
+app.use(traceMiddleware());
+
 // Redis Client Configuration
 const REDIS_URL = process.env.REDIS_URL || 'redis://localhost:6379';
 let redisClient = null;
+let redisSubscriber = null;
 let isRedisAvailable = false;
 
 // Mock Agent Data
@@ -159,16 +180,39 @@ async function initRedis() {
             await redisClient.setEx('xiaoshazi:agent:rankings:v1', 1800, JSON.stringify(MOCK_AGENTS));
             console.log('✅ Mock data seeded to Redis (30分钟TTL)');
         }
+        
+        // 独立的订阅连接 - 缓存失效消息和 Socket.IO 广播共用
+        redisSubscriber = redisClient.duplicate();
+        redisSubscriber.on('error', (err) => {
+            logger.warn('⚠️ Redis subscriber error:', { error: err.message });
+        });
+        await redisSubscriber.connect();
+        await readThroughCache.subscribe(redisSubscriber);
     } catch (error) {
         logger.warn('❌ Redis connection error, falling back to in-memory store:', { error: error.message });
         isRedisAvailable = false;
+        redisSubscriber = null;
         updateRedisStatus(false);
     }
     
     // 设置 Agents 路由的 Redis 客户端 (Phase 4 重构)
+    readThroughCache.setRedisClient(redisClient, isRedisAvailable);
     agentsRoutes.setRedisClient(redisClient, isRedisAvailable);
+    // 令牌 / 会话 / 用户存储切换到 Redis，所有 worker 共享
+    authRoutes.setRedisClient(redisClient, isRedisAvailable);
+    // 限流计数共享 (Redis 不可用时各 worker 本地计数)
+    setRateLimitRedisClient(redisClient, isRedisAvailable);
 }
 
+// 任意 worker 的数据写入都会经由 pub/sub 让所有 worker 的快照失效
+readThroughCache.onInvalidate(() => {
+    agentsRoutes.invalidateSnapshots();
+    // 排行榜变更 diff 只由 leader 计算一次，一次 sync 内的多次失效合并为一次
+    if (isLeader()) {
+        agentsRoutes.rankingFeed.scheduleRefresh();
+    }
+});
+
 // 缓存预热函数 - 30分钟缓存策略
 async function warmUpCache() {
     if (!isRedisAvailable || !redisClient) {
@@ -191,6 +235,7 @@ async function warmUpCache() {
         const cnModelsPath = path.join(__dirname, 'server/data/cn_models.json');
         if (fs.existsSync(cnModelsPath)) {
             const data = fs.readFileSync(cnModelsPath, 'utf8');
+            // 只预热到 Redis - 服务端不经 readThroughCache 读取该键，无需广播失效
             await redisClient.setEx('xiaoshazi:cn_models:v1', 1800, data);
             logger.info('✅ 缓存预热完成: xiaoshazi:cn_models:v1 (5分钟)');
         }
@@ -200,6 +245,9 @@ async function warmUpCache() {
         await redisClient.setEx('xiaoshazi:system:metrics:v1', 300, JSON.stringify(metrics));
         logger.info('✅ 缓存预热完成: xiaoshazi:system:metrics:v1 (5分钟)');
         
+        // 排行榜数据已重写，通知所有 worker 丢弃本地缓存和预构建快照
+        await readThroughCache.invalidate(['xiaoshazi:agent:rankings:v1']);
+        
     } catch (error) {
         logger.error('❌ 缓存预热失败:', { error: error.message });
     }
@@ -211,7 +259,7 @@ app.use(express.json()); // 解析JSON请求体
 app.use(express.urlencoded({ extended: true })); // 解析URL编码请求体
 
 // Rate Limiting - 通用限流
-const { apiLimiter } = require('./server/middleware/rateLimiter');
+const { apiLimiter, setRedisClient: setRateLimitRedisClient } = require('./server/middleware/rateLimiter');
 app.use('/api/', apiLimiter);
 
 // Phase 1: Prometheus Metrics Middleware
@@ -473,10 +521,15 @@ const server = http.createServer(app);
 // 初始化Redis并启动服务器
 async function startServer() {
     await initRedis();
-    await warmUpCache();
     
-    // 创建 Socket.IO 服务器
+    // Cluster 模式下只由 leader worker 预热
+    if (isLeader()) {
+        await warmUpCache();
+    }
+    
+    // 创建 Socket.IO 服务器 - Redis 可用时通过 pub/sub 在 worker 间转发广播
     const io = new Server(server, {
+        adapter: redisSubscriber ? createRedisAdapter(redisClient, redisSubscriber) : undefined,
         cors: {
             origin: process.env.NODE_ENV === 'production' 
                 ? ALLOWED_ORIGINS 
@@ -493,6 +546,26 @@ async function startServer() {
         return metrics;
     }
 
+    // request:update 合并 + 限流: 每个客户端 2 秒内最多一次回复，只回复请求方
+    const metricsUpdates = new UpdateThrottle({
+        compute: getSystemMetrics,
+        event: 'system:metrics'
+    });
+
+    // 排行榜变更: 每个场景房间收到按场景裁剪的 diff (Redis 适配器转发到所有 worker)
+    const { rankingFeed } = agentsRoutes;
+    rankingFeed.onDiff((diff) => {
+        ['all', ...diff.scenarios].forEach((scenario) => {
+            io.to(`rankings:${scenario}`).emit('rankings:diff', scopeDiff(diff, scenario));
+        });
+    });
+    if (isLeader()) {
+        // 建立基线版本，之后的写入才能计算 diff
+        await rankingFeed.refresh().catch((error) => {
+            logger.warn('⚠️ Ranking feed initialization failed:', { error: error.message });
+        });
+    }
+
     // 监听客户端连接
     io.on('connection', (socket) => {
         logger.info('🔌 Client connected:', { socketId: socket.id });
@@ -501,37 +574,56 @@ async function startServer() {
         // 立即发送当前状态
         socket.emit('system:metrics', getSystemMetrics());
         
-        // 客户端请求更新 - 按需推送
+        // 客户端请求更新 - 合并限流后只回复该客户端
         socket.on('request:update', () => {
-            logger.http(`📡 Client ${socket.id} requested update`);
-            emitMetricsUpdate();
+            metricsUpdates.request(socket);
         });
 
-        // 客户端订阅特定数据
-        socket.on('subscribe:agents', () => {
-            logger.http(`📡 Client ${socket.id} subscribed to agents`);
-            socket.emit('agents:update', { source: 'client-subscribe', timestamp: Date.now() });
+        // 订阅排行榜变更: { scenario, version } - version 为客户端已加载数据的版本
+        socket.on('subscribe:rankings', async (params = {}) => {
+            const scenario = typeof params.scenario === 'string' && /^[\w-]{1,32}$/.test(params.scenario)
+                ? params.scenario
+                : 'all';
+            if (socket.data.rankingsRoom) socket.leave(socket.data.rankingsRoom);
+            socket.data.rankingsRoom = `rankings:${scenario}`;
+            socket.join(socket.data.rankingsRoom);
+            logger.http(`📡 Client ${socket.id} subscribed to rankings:${scenario}`);
+
+            // 补发客户端错过的版本；版本未知时客户端会在下一个 diff 上发现断链并重新拉取
+            try {
+                const diffs = await rankingFeed.since(typeof params.version === 'string' ? params.version : null);
+                (diffs || []).forEach((diff) => {
+                    socket.emit('rankings:diff', scopeDiff(diff, scenario));
+                });
+            } catch (error) {
+                logger.warn('⚠️ Ranking catch-up failed:', { error: error.message });
+            }
         });
         
         socket.on('disconnect', () => {
+            metricsUpdates.release(socket);
             logger.info('🔌 Client disconnected:', { socketId: socket.id });
             updateSocketConnections(io.engine.clientsCount);
         });
     });
     
     // 移除3秒轮询，改为事件驱动 + 5分钟定时同步
-    // 1. 5分钟定时同步
-    setInterval(() => {
-        logger.http('🔄 Periodic 5-minute sync');
-        emitMetricsUpdate();
-    }, 300000); // 5分钟
+    // 1. 5分钟定时同步 (Cluster 模式下只由 leader 推送，适配器转发给所有 worker 的客户端)
+    if (isLeader()) {
+        setInterval(() => {
+            logger.http('🔄 Periodic 5-minute sync');
+            emitMetricsUpdate();
+            // 兜底: 仅 rankings.json 变化 (无 Redis 失效消息) 时也能推送 diff
+            rankingFeed.scheduleRefresh();
+        }, 300000); // 5分钟
+    }
     
-    // 2. 数据变化时推送 (由外部调用emitMetricsUpdate())
+    // 2. 数据变化时推送 (排行榜: rankingFeed → rankings:diff；指标: emitMetricsUpdate())
     
-    // 3. 客户端请求更新 (通过socket事件处理)
+    // 3. 客户端请求更新 (request:update，经 UpdateThrottle 合并限流)
     
     server.listen(PORT, () => {
-        logger.info(`✅ Backend Server started on port ${PORT}`);
+        logger.info(`✅ Backend Server started on port ${PORT}${cluster.isWorker ? ` (worker ${process.pid})` : ''}`);
         logger.info(`🌐 Local address: http://localhost:${PORT}`);
         logger.info(`🔌 WebSocket Server started`);
         logger.info(`📊 API Endpoints:`);
@@ -550,6 +642,7 @@ startServer();
 // 优雅关闭
 process.on('SIGTERM', () => {
     logger.info('正在关闭服务器...');
+    entropyRoutes.shutdown();
     server.close(() => {
         logger.info('服务器已关闭');
         process.exit(0);
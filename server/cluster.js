@@ -0,0 +1,91 @@
+/**
+ * @fileoverview Cluster Primary
+ * @description Forks one HTTP worker per core and restarts crashed workers
+ */
+
+const cluster = require('cluster');
+const os = require('os');
+const { handleAuditMessage } = require('./utils/audit');
+
+// 只有一个 worker 负责缓存预热和定时推送，避免 N 个 worker 重复执行
+const LEADER_ENV = 'XIAOSHAZI_CLUSTER_LEADER';
+
+/**
+ * Resolve the number of workers from CLUSTER_WORKERS
+ * @param {string} [value] - 'auto' (one per core), a number, or empty (single process)
+ * @returns {number} Worker count (<= 1 means no cluster)
+ */
+function resolveWorkerCount(value = process.env.CLUSTER_WORKERS) {
+  if (!value) return 1;
+  if (value === 'auto') {
+    return typeof os.availableParallelism === 'function'
+      ? os.availableParallelism()
+      : os.cpus().length;
+  }
+  const count = parseInt(value, 10);
+  return Number.isFinite(count) && count > 0 ? count : 1;
+}
+
+/**
+ * Whether this process should run singleton jobs (warm-up, periodic pushes)
+ * @returns {boolean} True for the leader worker or a non-clustered process
+ */
+function isLeader() {
+  return !cluster.isWorker || process.env[LEADER_ENV] === '1';
+}
+
+/**
+ * Start the cluster primary
+ * @param {Object} options
+ * @param {number} options.workers - Number of workers to fork
+ * @param {Object} options.logger - Logger instance
+ */
+function startPrimary({ workers, logger }) {
+  let shuttingDown = false;
+  const workerEnv = new Map();
+
+  function fork(env) {
+    const worker = cluster.fork(env);
+    workerEnv.set(worker.id, env);
+    // 审计日志由 primary 统一写入 (单写者，索引和计数器保持一致)
+    worker.on('message', handleAuditMessage);
+    return worker;
+  }
+
+  logger.info(`🧩 Cluster primary ${process.pid} forking ${workers} workers`);
+  for (let i = 0; i < workers; i++) {
+    fork(i === 0 ? { [LEADER_ENV]: '1' } : {});
+  }
+
+  cluster.on('exit', (worker, code, signal) => {
+    const env = workerEnv.get(worker.id) || {};
+    workerEnv.delete(worker.id);
+
+    if (shuttingDown) {
+      if (Object.keys(cluster.workers).length === 0) {
+        logger.info('服务器已关闭');
+        process.exit(0);
+      }
+      return;
+    }
+
+    logger.warn(`⚠️ Worker ${worker.process.pid} exited (${signal || code}), restarting...`);
+    fork(env);
+  });
+
+  // 优雅关闭 - 通知所有 worker
+  process.on('SIGTERM', () => {
+    logger.info('正在关闭服务器...');
+    shuttingDown = true;
+    for (const worker of Object.values(cluster.workers)) {
+      worker.process.kill('SIGTERM');
+    }
+  });
+}
+
+module.exports = {
+  resolveWorkerCount,
+  isLeader,
+  startPrimary,
+  LEADER_ENV,
+};
@@ -3,14 +3,20 @@
  * Exposes /metrics endpoint with core application metrics
  */
 
+const diagnosticsChannel = require('diagnostics_channel');
+const { performance, monitorEventLoopDelay } = require('perf_hooks');
 const client = require('prom-client');
 
 // Create a Registry
 const register = new client.Registry();
 
-// Add default metrics (CPU, memory, etc.)
+// Add default metrics (CPU, memory, event loop lag p50/p90/p99, etc.)
 client.collectDefaultMetrics({ register, prefix: 'xiaoshazi_' });
 
+// Every timed operation is also published here; trace mode (metrics/trace.js)
+// subscribes to build per-request breakdowns
+const timingChannel = diagnosticsChannel.channel('xiaoshazi:timing');
+
 // ============================================
 // Custom Application Metrics
 // ============================================
@@ -69,6 +75,169 @@ const errorsTotal = new client.Counter({
   registers: [register],
 });
 
+// Rate limiter decisions
+const rateLimitDecisionsTotal = new client.Counter({
+  name: 'xiaoshazi_rate_limit_decisions_total',
+  help: 'Rate limiter decisions',
+  labelNames: ['limiter', 'decision', 'store'],
+  registers: [register],
+});
+
+// Rate limiter store latency (one Lua call on Redis, a Map lookup locally)
+const rateLimitDuration = new client.Histogram({
+  name: 'xiaoshazi_rate_limit_duration_seconds',
+  help: 'Rate limiter store increment duration in seconds',
+  labelNames: ['limiter', 'store'],
+  buckets: [0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1],
+  registers: [register],
+});
+
+// Event loop delay between scrapes - sampled by monitorEventLoopDelay and
+// reset on every collect, so each scrape reports the lag since the previous one
+const eventLoopDelay = monitorEventLoopDelay({ resolution: 10 });
+eventLoopDelay.enable();
+
+const eventLoopDelaySeconds = new client.Gauge({
+  name: 'xiaoshazi_event_loop_delay_seconds',
+  help: 'Event loop delay since the last scrape in seconds',
+  labelNames: ['quantile'],
+  registers: [register],
+  collect() {
+    // perf_hooks 直方图单位为纳秒
+    for (const quantile of [0.5, 0.9, 0.99]) {
+      this.set({ quantile: String(quantile) }, eventLoopDelay.percentile(quantile * 100) / 1e9);
+    }
+    this.set({ quantile: 'max' }, eventLoopDelay.max / 1e9);
+    eventLoopDelay.reset();
+  },
+});
+
+// ============================================
+// Operation Timings
+// ============================================
+
+const FAST_BUCKETS = [0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1];
+
+// Redis command latency (as seen by this process, including the round trip)
+const redisCommandDuration = new client.Histogram({
+  name: 'xiaoshazi_redis_command_duration_seconds',
+  help: 'Redis command latency in seconds',
+  labelNames: ['command'],
+  buckets: FAST_BUCKETS,
+  registers: [register],
+});
+
+// JSON serialization of response bodies
+const serializeDuration = new client.Histogram({
+  name: 'xiaoshazi_serialize_duration_seconds',
+  help: 'JSON serialization time in seconds',
+  labelNames: ['operation'],
+  buckets: FAST_BUCKETS,
+  registers: [register],
+});
+
+// gzip / brotli compression of prebuilt bodies
+const compressDuration = new client.Histogram({
+  name: 'xiaoshazi_compress_duration_seconds',
+  help: 'Response compression time in seconds',
+  labelNames: ['encoding'],
+  buckets: FAST_BUCKETS,
+  registers: [register],
+});
+
+// Round trips to child processes (entropy worker)
+const childProcessDuration = new client.Histogram({
+  name: 'xiaoshazi_child_process_duration_seconds',
+  help: 'Child process request time in seconds',
+  labelNames: ['method'],
+  buckets: [0.001, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30],
+  registers: [register],
+});
+
+// File reads on request paths
+const fileReadDuration = new client.Histogram({
+  name: 'xiaoshazi_file_read_duration_seconds',
+  help: 'File read time in seconds',
+  labelNames: ['file'],
+  buckets: FAST_BUCKETS,
+  registers: [register],
+});
+
+/**
+ * Record one operation timing
+ * @param {Object} histogram - prom-client Histogram
+ * @param {Object} labels - Histogram labels
+ * @param {number} ms - Duration in milliseconds
+ */
+function observeTiming(histogram, labels, ms) {
+  histogram.observe(labels, ms / 1000);
+  if (timingChannel.hasSubscribers) {
+    timingChannel.publish({ metric: histogram.name, labels, ms });
+  }
+}
+
+/**
+ * Time an async operation
+ * @param {Object} histogram - prom-client Histogram
+ * @param {Object} labels - Histogram labels
+ * @param {Function} fn - async () => result
+ * @returns {Promise<*>} Result of fn
+ */
+async function timeAsync(histogram, labels, fn) {
+  const start = performance.now();
+  try {
+    return await fn();
+  } finally {
+    observeTiming(histogram, labels, performance.now() - start);
+  }
+}
+
+/**
+ * Time a synchronous operation
+ * @param {Object} histogram - prom-client Histogram
+ * @param {Object} labels - Histogram labels
+ * @param {Function} fn - () => result
+ * @returns {*} Result of fn
+ */
+function timeSync(histogram, labels, fn) {
+  const start = performance.now();
+  try {
+    return fn();
+  } finally {
+    observeTiming(histogram, labels, performance.now() - start);
+  }
+}
+
+// ============================================
+// Route Labels
+// ============================================
+
+// 数字 ID、UUID、长十六进制/随机串统一折叠为 :id
+const ID_SEGMENT = /^(?:\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,}|[A-Za-z0-9_-]{32,})$/i;
+
+/**
+ * Bounded route label for a finished request
+ *
+ * Uses the matched Express route pattern (available once routing ran, i.e.
+ * at 'finish'); otherwise 404s share one label, static files share one label
+ * and id-like path segments are collapsed.
+ * @param {Object} req - Express request
+ * @param {Object} res - Express response
+ * @returns {string} Route label
+ */
+function normalizeRoute(req, res) {
+  if (req.route && typeof req.route.path === 'string') {
+    return `${req.baseUrl || ''}${req.route.path}`;
+  }
+  if (res.statusCode === 404) return 'unmatched';
+  const pathname = (req.originalUrl || req.url || '').split('?')[0];
+  if (/\.[a-z0-9]+$/i.test(pathname)) return 'static';
+  return pathname
+    .split('/')
+    .map(segment => (ID_SEGMENT.test(segment) ? ':id' : segment))
+    .join('/');
+}
+
 // ============================================
 // Middleware Functions
 // ============================================
@@ -87,15 +256,17 @@ function metricsMiddleware(options = {}) {
       return next();
     }
 
-    const startTime = Date.now();
-    const route = req.route ? req.route.path : req.path;
+    const startTime = performance.now();
 
     // Increment active connections
     activeConnections.inc();
 
     // Capture response finish event
     res.on('finish', () => {
-      const duration = (Date.now() - startTime) / 1000;
+      const elapsedMs = performance.now() - startTime;
+      const duration = elapsedMs / 1000;
+      // 路由匹配完成后再取标签，避免原始路径造成的标签基数膨胀
+      const route = normalizeRoute(req, res);
       const statusCode = res.statusCode.toString();
       const labels = {
         method: req.method,
@@ -108,7 +279,7 @@ function metricsMiddleware(options = {}) {
       httpRequestDuration.observe(labels, duration);
 
       // Update response time gauge
-      apiResponseTime.set({ route }, (Date.now() - startTime));
+      apiResponseTime.set({ route }, elapsedMs);
 
       // Track errors (4xx and 5xx)
       if (res.statusCode >= 400) {
@@ -195,11 +366,24 @@ module.exports = {
   redisConnected,
   apiResponseTime,
   errorsTotal,
+  rateLimitDecisionsTotal,
+  rateLimitDuration,
+  redisCommandDuration,
+  serializeDuration,
+  compressDuration,
+  childProcessDuration,
+  fileReadDuration,
+  eventLoopDelaySeconds,
 
   // Middleware
   metricsMiddleware,
 
   // Helpers
+  timingChannel,
+  observeTiming,
+  timeAsync,
+  timeSync,
+  normalizeRoute,
   updateRedisStatus,
   updateSocketConnections,
   getMetrics,
@@ -0,0 +1,101 @@
+/**
+ * xiaoshazi Request Tracing (opt-in)
+ * Per-request latency breakdowns built from the 'xiaoshazi:timing'
+ * diagnostics channel
+ *
+ * Enabled with TRACE_REQUESTS=1. An AsyncLocalStorage context follows each
+ * request across awaits, so every timing published below the route (Redis
+ * commands, serialization, compression, child process, file reads) is
+ * attributed to the request that caused it. When a request finishes, one line
+ * is logged:
+ *
+ *   [TRACE] GET /api/agents 200 4.81ms redis_command:zRange=0.62ms redis_command:exec=1.10ms ...
+ *
+ * When disabled nothing subscribes to the channel and publishing is skipped
+ * (timingChannel.hasSubscribers).
+ */
+
+const { AsyncLocalStorage } = require('async_hooks');
+const { performance } = require('perf_hooks');
+const { timingChannel, normalizeRoute } = require('./index');
+const logger = require('../utils/logger');
+
+const TRACE_ENABLED = ['1', 'true'].includes(String(process.env.TRACE_REQUESTS || '').toLowerCase());
+
+const requestContext = new AsyncLocalStorage();
+let subscribed = false;
+
+function spanName({ metric, labels }) {
+  const name = metric.replace(/^xiaoshazi_/, '').replace(/_duration_seconds$/, '');
+  const detail = Object.values(labels || {}).join('/');
+  return detail ? `${name}:${detail}` : name;
+}
+
+function onTiming(message) {
+  const trace = requestContext.getStore();
+  if (trace) trace.spans.push({ name: spanName(message), ms: message.ms });
+}
+
+/**
+ * Group spans by name
+ * @param {Array<{name: string, ms: number}>} spans - Raw spans
+ * @returns {Array<{name: string, count: number, ms: number}>} Totals, slowest first
+ */
+function summarizeSpans(spans) {
+  const totals = new Map();
+  for (const { name, ms } of spans) {
+    const total = totals.get(name) || { name, count: 0, ms: 0 };
+    total.count++;
+    total.ms += ms;
+    totals.set(name, total);
+  }
+  return [...totals.values()].sort((a, b) => b.ms - a.ms);
+}
+
+/**
+ * Create the tracing middleware (a pass-through unless enabled)
+ * @param {Object} [options]
+ * @param {boolean} [options.enabled] - Defaults to TRACE_REQUESTS
+ * @param {Function} [options.onTrace] - Receives each finished trace (defaults to logging it)
+ * @returns {Function} Express middleware
+ */
+function traceMiddleware({ enabled = TRACE_ENABLED, onTrace } = {}) {
+  if (!enabled) {
+    return (req, res, next) => next();
+  }
+
+  if (!subscribed) {
+    timingChannel.subscribe(onTiming);
+    subscribed = true;
+  }
+
+  const report = onTrace || ((trace) => {
+    const breakdown = trace.spans
+      .map(span => `${span.name}=${span.ms.toFixed(2)}ms${span.count > 1 ? `x${span.count}` : ''}`)
+      .join(' ');
+    logger.info(`[TRACE] ${trace.method} ${trace.route} ${trace.status} ${trace.totalMs.toFixed(2)}ms ${breakdown}`);
+  });
+
+  return (req, res, next) => {
+    const context = { start: performance.now(), spans: [] };
+
+    res.on('finish', () => {
+      report({
+        method: req.method,
+        route: normalizeRoute(req, res),
+        status: res.statusCode,
+        totalMs: performance.now() - context.start,
+        spans: summarizeSpans(context.spans)
+      });
+    });
+
+    requestContext.run(context, next);
+  };
+}
+
+module.exports = {
+  traceMiddleware,
+  summarizeSpans,
+  requestContext,
+  TRACE_ENABLED,
+};
@@ -1,17 +1,11 @@
 const rateLimit = require('express-rate-limit');
-const fs = require('fs');
+// 审计日志 (批量写入、分段索引，见 utils/audit.js)
+const { auditLog, AuditAggregator } = require('../utils/audit');
+// 滑动窗口计数 (Redis 可用时所有 worker 共享，见 utils/rateLimitStore.js)
+const { SlidingWindowStore, setRedisClient } = require('../utils/rateLimitStore');
 
-// 审计日志函数
-const AUDIT_LOG_FILE = process.env.AUDIT_LOG_FILE || '/tmp/xiaoshazi-audit.log';
-
-function auditLog(event, data) {
-  const timestamp = new Date().toISOString();
-  const logEntry = JSON.stringify({ timestamp, event, ...data });
-  console.log(`[AUDIT] ${event}:`, data);
-  fs.appendFile(AUDIT_LOG_FILE, logEntry + '\n', (err) => {
-    if (err) console.error('审计日志写入失败:', err);
-  });
-}
+// 拒绝事件按窗口聚合: 每个 IP (登录为 IP + 邮箱) 每分钟最多一条审计记录
+const rejections = new AuditAggregator({ windowMs: 60 * 1000 });
 
 // Helper to normalize IP (handle IPv6)
 function getClientIp(req) {
@@ -24,13 +18,14 @@ const apiLimiter = rateLimit({
   max: 60,
   standardHeaders: 'draft-7',
   legacyHeaders: false,
+  store: new SlidingWindowStore({ name: 'api' }),
   skip: (req) => {
     return req.path === '/api/health' || 
            req.path === '/api/time' || 
            req.path.startsWith('/api/entropy');
   },
   handler: (req, res) => {
-    auditLog('RATE_LIMIT_EXCEEDED', {
+    rejections.record('RATE_LIMIT_EXCEEDED', getClientIp(req), {
       ip: getClientIp(req),
       path: req.path,
       method: req.method
@@ -51,12 +46,13 @@ const loginLimiter = rateLimit({
   max: 5,
   standardHeaders: 'draft-7',
   legacyHeaders: false,
+  store: new SlidingWindowStore({ name: 'login' }),
   keyGenerator: (req, res) => {
     const email = req.body?.email || 'unknown';
     return `${getClientIp(req)}:${email}`;
   },
   handler: (req, res) => {
-    auditLog('LOGIN_RATE_LIMIT_EXCEEDED', {
+    rejections.record('LOGIN_RATE_LIMIT_EXCEEDED', `${getClientIp(req)}:${req.body?.email}`, {
       ip: getClientIp(req),
       email: req.body?.email,
       path: req.path
@@ -77,8 +73,9 @@ const registerLimiter = rateLimit({
   max: 3,
   standardHeaders: 'draft-7',
   legacyHeaders: false,
+  store: new SlidingWindowStore({ name: 'register' }),
   handler: (req, res) => {
-    auditLog('REGISTER_RATE_LIMIT_EXCEEDED', {
+    rejections.record('REGISTER_RATE_LIMIT_EXCEEDED', getClientIp(req), {
       ip: getClientIp(req),
       path: req.path
     });
@@ -98,8 +95,9 @@ const refreshLimiter = rateLimit({
   max: 10,
   standardHeaders: 'draft-7',
   legacyHeaders: false,
+  store: new SlidingWindowStore({ name: 'refresh' }),
   handler: (req, res) => {
-    auditLog('REFRESH_RATE_LIMIT_EXCEEDED', {
+    rejections.record('REFRESH_RATE_LIMIT_EXCEEDED', getClientIp(req), {
       ip: getClientIp(req),
       path: req.path
     });
@@ -119,8 +117,9 @@ const passwordResetLimiter = rateLimit({
   max: 3,
   standardHeaders: 'draft-7',
   legacyHeaders: false,
+  store: new SlidingWindowStore({ name: 'password-reset' }),
   handler: (req, res) => {
-    auditLog('PASSWORD_RESET_RATE_LIMIT_EXCEEDED', {
+    rejections.record('PASSWORD_RESET_RATE_LIMIT_EXCEEDED', getClientIp(req), {
       ip: getClientIp(req),
       path: req.path
     });
@@ -140,5 +139,7 @@ module.exports = {
   registerLimiter,
   refreshLimiter,
   passwordResetLimiter,
+  rejections,
+  setRedisClient,
   auditLog
 };
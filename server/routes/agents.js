@@ -6,6 +6,10 @@
 const express = require('express');
 const fs = require('fs');
 const path = require('path');
+const { RankingSnapshotStore, sendSnapshot } = require('../utils/rankingSnapshot');
+const { RankingFeed } = require('../utils/rankingFeed');
+const { readThroughCache } = require('../utils/cache');
+const { timeAsync, redisCommandDuration, fileReadDuration } = require('../metrics');
 
 const router = express.Router();
 
@@ -28,6 +32,17 @@ const MOCK_AGENTS = [
     { id: 15, rank: 15, diff: -2, tier: "D", provider: "Groq", model: "Llama 3 Groq", avgPerf: 60.1, peakPerf: 68.2, samples: 3500, scenarios: ["reasoning"] },
 ];
 
+// Redis 中的排行榜版本号 - sync 脚本写入 leaderboard:overall 后 INCR
+const LEADERBOARD_VERSION_KEY = 'leaderboard:version';
+// 写入时间 (毫秒) - sync 脚本与版本号一起写入，作为响应中的 timestamp
+const LEADERBOARD_UPDATED_AT_KEY = 'leaderboard:updated_at';
+// sync_data.js 的模型家族排行 (ZSet) -> agent:family:{id} (Hash, payload 为带类型的 JSON)
+const FAMILY_LEADERBOARD_KEY = 'leaderboard:families';
+const FAMILY_KEY_PREFIX = 'agent:family:';
+const RANKINGS_FILE = path.join(__dirname, '../data/rankings.json');
+// MOCK_AGENTS 是静态数据，固定的 timestamp 让各 worker 的快照字节一致
+const MOCK_UPDATED_AT = Date.UTC(2026, 0, 1);
+
 /**
  * Set Redis client (called from main server.js)
  * @param {Object} redisClientRef - Redis client reference
@@ -39,38 +54,88 @@ let isRedisAvailable = false;
 router.setRedisClient = (client, available) => {
     redisClient = client;
     isRedisAvailable = available;
+    snapshotStore.invalidate();
+    rankingFeed.setRedisClient(client, available);
 };
 
 /**
- * @swagger
- * /api/agents:
- *   get:
- *     summary: 获取Agent排名
- *     description: 返回AI Agent的性能排名数据
- *     tags: [Agent]
- *     parameters:
- *       - in: query
- *         name: scenario
- *         schema:
- *           type: string
- *         description: 场景过滤 (coding, reasoning, creative)
- *     responses:
- *       200:
- *         description: Agent排名数据
+ * Resolve the current data version (Redis counter + fallback file mtime)
+ * @returns {Promise<string>} Version string
  */
-router.get('/agents', async (req, res) => {
-    const { scenario } = req.query;
-    
-    // Configure proper Cache-Control headers - 30分钟缓存
-    res.set('Cache-Control', 'public, max-age=1800, s-maxage=1800');
+async function getDataVersion() {
+    let redisVersion = 'none';
+    if (isRedisAvailable && redisClient) {
+        try {
+            redisVersion = (await readThroughCache.get(LEADERBOARD_VERSION_KEY)) || '0';
+        } catch (error) {
+            redisVersion = 'error';
+        }
+    }
 
+    let fileVersion = 'none';
+    try {
+        fileVersion = String((await fs.promises.stat(RANKINGS_FILE)).mtimeMs);
+    } catch {
+        // rankings.json missing - MOCK_AGENTS will be used
+    }
+
+    return `${redisVersion}:${fileVersion}`;
+}
+
+/**
+ * Load the family rankings written by sync_data.js
+ * @returns {Promise<Array>} Rankings in score order (empty if none)
+ */
+async function loadFamilyRankings() {
+    const ids = await timeAsync(redisCommandDuration, { command: 'zRange' },
+        () => redisClient.zRange(FAMILY_LEADERBOARD_KEY, 0, -1, { REV: true }));
+    if (!ids || ids.length === 0) return [];
+
+    const pipeline = redisClient.multi();
+    ids.forEach(id => pipeline.hGet(`${FAMILY_KEY_PREFIX}${id}`, 'payload'));
+    const payloads = await timeAsync(redisCommandDuration, { command: 'exec' }, () => pipeline.exec());
+
+    // id / rank 按位置生成，与 rankings.json 一致
+    return payloads
+        .filter(Boolean)
+        .map((payload, index) => ({ ...JSON.parse(payload), id: index + 1, rank: index + 1 }));
+}
+
+/**
+ * When the served data was last written - the same value in every worker,
+ * so snapshots of one version serialize to the same bytes
+ * @param {string} source - Data source reported by loadAgentData
+ * @returns {Promise<number>} Epoch milliseconds
+ */
+async function getDataUpdatedAt(source) {
+    if (source.startsWith('redis')) {
+        try {
+            const updatedAt = Number(await readThroughCache.get(LEADERBOARD_UPDATED_AT_KEY));
+            if (updatedAt > 0) return updatedAt;
+        } catch {
+            // Redis 读取失败时退回文件时间
+        }
+    }
+    try {
+        return Math.floor((await fs.promises.stat(RANKINGS_FILE)).mtimeMs);
+    } catch {
+        return MOCK_UPDATED_AT;
+    }
+}
+
+/**
+ * Load the full (unfiltered) ranking list
+ * @returns {Promise<Object>} { agents, source, cacheable, updatedAt }
+ */
+async function loadAgentData() {
     let agentData = [];
     let source = 'memory';
 
     try {
         if (isRedisAvailable && redisClient) {
             // New Mission Strategy: leaderboard:overall (ZSet) -> agent:metadata:{id} (Hash)
-            const ids = await redisClient.zRange('leaderboard:overall', 0, -1, { REV: true });
+            const ids = await timeAsync(redisCommandDuration, { command: 'zRange' },
+                () => redisClient.zRange('leaderboard:overall', 0, -1, { REV: true }));
             
             if (ids && ids.length > 0) {
                 // Fetch all details using a pipeline
@@ -78,7 +143,7 @@ router.get('/agents', async (req, res) => {
                 ids.forEach(id => {
                     pipeline.hGetAll(`agent:metadata:${id}`);
                 });
-                const rawDetails = await pipeline.exec();
+                const rawDetails = await timeAsync(redisCommandDuration, { command: 'exec' }, () => pipeline.exec());
                 
                 // Process and format data
                 agentData = rawDetails.map((details, index) => {
@@ -92,41 +157,100 @@ router.get('/agents', async (req, res) => {
                 });
                 source = 'redis';
             } else {
-                // Fallback to versioned key or file
-                const cachedData = await redisClient.get('xiaoshazi:agent:rankings:v1');
-                if (cachedData) {
-                    agentData = JSON.parse(cachedData);
-                    source = 'redis-v1';
+                // sync_data.js family rankings, then versioned key or file
+                agentData = await loadFamilyRankings();
+                if (agentData.length > 0) {
+                    source = 'redis-families';
                 } else {
-                    source = 'file-fallback';
+                    const cachedData = await readThroughCache.get('xiaoshazi:agent:rankings:v1');
+                    if (cachedData) {
+                        agentData = JSON.parse(cachedData);
+                        source = 'redis-v1';
+                    } else {
+                        source = 'file-fallback';
+                    }
                 }
             }
         }
         
         // If Redis failed or was empty, use file fallback
         if (agentData.length === 0) {
-            const filePath = path.join(__dirname, '../data/rankings.json');
-            if (fs.existsSync(filePath)) {
-                agentData = JSON.parse(fs.readFileSync(filePath, 'utf8'));
+            try {
+                const json = await timeAsync(fileReadDuration, { file: 'rankings' },
+                    () => fs.promises.readFile(RANKINGS_FILE, 'utf8'));
+                agentData = JSON.parse(json);
                 if (source === 'memory') source = 'file';
-            } else {
+            } catch (error) {
+                if (error.code !== 'ENOENT') throw error;
                 agentData = MOCK_AGENTS;
             }
         }
     } catch (error) {
         console.error('Data retrieval error (falling back to memory):', error.message);
-        agentData = MOCK_AGENTS;
+        // 不缓存错误时的降级数据，下一次请求重新加载
+        return { agents: MOCK_AGENTS, source, cacheable: false, updatedAt: MOCK_UPDATED_AT };
     }
 
-    if (scenario && scenario !== 'all') {
-        agentData = agentData.filter(a => a.scenarios && a.scenarios.includes(scenario));
-    }
+    const updatedAt = agentData === MOCK_AGENTS ? MOCK_UPDATED_AT : await getDataUpdatedAt(source);
+    return { agents: agentData, source, cacheable: true, updatedAt };
+}
+
+// 每个数据版本、每个场景只序列化和压缩一次
+const snapshotStore = new RankingSnapshotStore({
+    loadData: loadAgentData,
+    getVersion: getDataVersion
+});
+
+/**
+ * Drop prebuilt snapshots (e.g. after warmUpCache rewrites the data)
+ */
+router.invalidateSnapshots = () => snapshotStore.invalidate();
+
+// 版本化变更流: 每个数据版本一次 diff，经 Socket.IO 推送给订阅的客户端
+const rankingFeed = new RankingFeed({
+    loadData: loadAgentData,
+    getVersion: getDataVersion
+});
+
+/**
+ * Ranking change feed (server.js wires it to Socket.IO)
+ */
+router.rankingFeed = rankingFeed;
+
+/**
+ * @swagger
+ * /api/agents:
+ *   get:
+ *     summary: 获取Agent排名
+ *     description: 返回AI Agent的性能排名数据 (预构建快照，支持 ETag / 304)
+ *     tags: [Agent]
+ *     parameters:
+ *       - in: query
+ *         name: scenario
+ *         schema:
+ *           type: string
+ *         description: 场景过滤 (coding, reasoning, creative)
+ *       - in: header
+ *         name: If-None-Match
+ *         schema:
+ *           type: string
+ *         description: 上一次响应的 ETag
+ *     responses:
+ *       200:
+ *         description: Agent排名数据 (timestamp 为数据写入时间；version 为数据版本，Socket.IO subscribe:rankings 从该版本起推送 diff)
+ *       304:
+ *         description: 数据未变化
+ */
+router.get('/agents', async (req, res) => {
+    const scenario = typeof req.query.scenario === 'string' && req.query.scenario
+        ? req.query.scenario
+        : 'all';
 
-    res.json({
-        success: true,
-        data: agentData,
-        timestamp: Date.now(),
-        source: source
+    const snapshot = await snapshotStore.get(scenario);
+
+    // Configure proper Cache-Control headers - 30分钟缓存
+    sendSnapshot(req, res, snapshot, {
+        cacheControl: 'public, max-age=1800, s-maxage=1800'
     });
 });
 
@@ -4,11 +4,24 @@
  */
 
 const express = require('express');
-const fs = require('fs');
+const { auditStore } = require('../utils/audit');
+const { timeAsync, fileReadDuration } = require('../metrics');
 
 const router = express.Router();
 
-const AUDIT_LOG_FILE = process.env.AUDIT_LOG_FILE || '/tmp/xiaoshazi-audit.log';
+// 单次请求最多返回的条数
+const MAX_PAGE_SIZE = 500;
+
+// 可在测试中替换为独立目录的 store
+let store = auditStore;
+
+/**
+ * Use a different audit store (tests)
+ * @param {AuditLogStore} newStore - Store instance
+ */
+router.setStore = (newStore) => {
+    store = newStore;
+};
 
 /**
  * @swagger
@@ -20,9 +33,12 @@ const AUDIT_LOG_FILE = process.env.AUDIT_LOG_FILE || '/tmp/xiaoshazi-audit.log';
  *     parameters:
  *       - in: query
  *         name: limit
+ *         description: 每页条数 (最大 500，超出按 500 处理)
  *         schema:
  *           type: integer
  *           default: 50
+ *           minimum: 0
+ *           maximum: 500
  *       - in: query
  *         name: offset
  *         schema:
@@ -36,50 +52,22 @@ const AUDIT_LOG_FILE = process.env.AUDIT_LOG_FILE || '/tmp/xiaoshazi-audit.log';
  *       200:
  *         description: 审计日志列表
  */
-router.get('/logs', (req, res) => {
-    const { limit = 50, offset = 0, event } = req.query;
+router.get('/logs', async (req, res) => {
+    const limit = Math.min(MAX_PAGE_SIZE, Math.max(0, parseInt(req.query.limit, 10) || 50));
+    const offset = Math.max(0, parseInt(req.query.offset, 10) || 0);
+    const { event } = req.query;
     
     try {
-        if (!fs.existsSync(AUDIT_LOG_FILE)) {
-            return res.json({
-                success: true,
-                data: [],
-                total: 0
-            });
-        }
-        
-        const content = fs.readFileSync(AUDIT_LOG_FILE, 'utf8');
-        const lines = content.trim().split('\n').reverse(); // 最新的在前
-        
-        let filtered = lines;
-        if (event) {
-            filtered = lines.filter(line => {
-                try {
-                    const log = JSON.parse(line);
-                    return log.event === event;
-                } catch {
-                    return false;
-                }
-            });
-        }
-        
-        const total = filtered.length;
-        const paginated = filtered.slice(parseInt(offset), parseInt(offset) + parseInt(limit));
-        
-        const logs = paginated.map(line => {
-            try {
-                return JSON.parse(line);
-            } catch {
-                return { raw: line };
-            }
-        });
+        // 按段索引从新到旧定位，只读取当前页涉及的行
+        const { data, total } = await timeAsync(fileReadDuration, { file: 'audit_log' },
+            () => store.readPage({ limit, offset, event }));
         
         res.json({
             success: true,
-            data: logs,
+            data,
             total,
-            limit: parseInt(limit),
-            offset: parseInt(offset)
+            limit,
+            offset
         });
     } catch (error) {
         console.error('Audit log read error:', error);
@@ -102,40 +90,14 @@ router.get('/logs', (req, res) => {
  *       200:
  *         description: 审计统计数据
  */
-router.get('/stats', (req, res) => {
+router.get('/stats', async (req, res) => {
     try {
-        if (!fs.existsSync(AUDIT_LOG_FILE)) {
-            return res.json({
-                success: true,
-                data: {
-                    total: 0,
-                    events: {}
-                }
-            });
-        }
-        
-        const content = fs.readFileSync(AUDIT_LOG_FILE, 'utf8');
-        const lines = content.trim().split('\n');
-        
-        const events = {};
-        let total = 0;
-        
-        lines.forEach(line => {
-            try {
-                const log = JSON.parse(line);
-                total++;
-                events[log.event] = (events[log.event] || 0) + 1;
-            } catch {
-                // ignore
-            }
-        });
+        // 计数器在写入时维护，不扫描日志
+        const data = await store.getStats();
         
         res.json({
             success: true,
-            data: {
-                total,
-                events
-            }
+            data
         });
     } catch (error) {
         console.error('Audit stats error:', error);
@@ -259,12 +259,17 @@ const {
   generateTokens, 
   verifyRefreshToken, 
   verifyAccessTokenSync,
+  verifyRefreshTokenSync,
   hashPassword, 
   verifyPassword,
   revokeRefreshToken,
+  revokeAllUserTokens,
+  getUserValidTokens,
   auditLog
 } = require('../utils/jwt');
 
+const authStore = require('../utils/authStore');
+
 const {
   loginLimiter,
   registerLimiter,
@@ -272,25 +277,9 @@ const {
   passwordResetLimiter
 } = require('../middleware/rateLimiter');
 
-// 模拟用户数据库 (生产环境应使用真实数据库)
-const users = new Map();
-
-// 登录尝试追踪 (防止暴力破解)
-const loginAttempts = new Map();
-
-function cleanupLoginAttempts() {
-  const now = Date.now();
-  const expiryMs = 15 * 60 * 1000; // 15 分钟
-  
-  for (const [key, data] of loginAttempts.entries()) {
-    if (now - data.windowStart > expiryMs) {
-      loginAttempts.delete(key);
-    }
-  }
-}
-
-// 每 5 分钟清理一次
-setInterval(cleanupLoginAttempts, 5 * 60 * 1000);
+// 用户和登录尝试保存在 authStore 中 (内存或 Redis，多进程共享)
+const LOGIN_WINDOW_MS = 15 * 60 * 1000; // 15 分钟
+const MAX_LOGIN_ATTEMPTS = 5;
 
 // 初始化一个测试用户
 const testUser = {
@@ -300,7 +289,25 @@ const testUser = {
   role: 'admin',
   createdAt: new Date().toISOString()
 };
-users.set(testUser.email, testUser);
+
+// 存储就绪前的请求等待测试用户写入
+let seeded = authStore.getAuthStore().createUser(testUser);
+
+function getStore() {
+  return seeded.then(() => authStore.getAuthStore());
+}
+
+/**
+ * 设置 Redis 客户端 (由 server.js 在 Redis 连接后调用)
+ * @param {Object} client - Redis 客户端
+ * @param {boolean} available - Redis 是否可用
+ */
+router.setRedisClient = (client, available) => {
+  authStore.setRedisClient(client, available);
+  seeded = authStore.getAuthStore().createUser(testUser).catch(error => {
+    console.error('Failed to seed test user:', error.message);
+  });
+};
 
 /**
  * POST /api/auth/register
@@ -338,29 +345,33 @@ router.post('/register', registerLimiter, async (req, res) => {
       });
     }
     
+    const store = await getStore();
+    const userExists = () => res.status(409).json({
+      success: false,
+      error: 'User already exists',
+      message: 'An account with this email already exists'
+    });
+    
     // 检查用户是否已存在
-    if (users.has(email)) {
-      return res.status(409).json({
-        success: false,
-        error: 'User already exists',
-        message: 'An account with this email already exists'
-      });
+    if (await store.getUser(email)) {
+      return userExists();
     }
     
-    // 哈希密码并创建用户
+    // 哈希密码并创建用户 (createUser 原子判重，防止并发注册同一邮箱)
     const hashedPassword = await hashPassword(password);
-    const newUser = {
-      id: String(users.size + 1),
+    const newUser = await store.createUser({
       email,
       password: hashedPassword,
       role: 'user',
       createdAt: new Date().toISOString()
-    };
+    });
     
-    users.set(email, newUser);
+    if (!newUser) {
+      return userExists();
+    }
     
     // 生成 Token (带设备信息)
-    const tokens = generateTokens(newUser, { 
+    const tokens = await generateTokens(newUser, { 
       deviceInfo: deviceInfo || req.get('User-Agent') || 'unknown' 
     });
     
@@ -419,16 +430,12 @@ router.post('/login', loginLimiter, async (req, res) => {
       });
     }
     
-    // 检查登录尝试次数 (暴力破解防护)
+    // 检查登录尝试次数 (暴力破解防护，窗口由存储 TTL 控制)
+    const store = await getStore();
     const loginKey = `${req.ip}:${email}`;
-    const now = Date.now();
-    let attempts = loginAttempts.get(loginKey);
-    
-    if (!attempts || now - attempts.windowStart > 15 * 60 * 1000) {
-      attempts = { count: 0, windowStart: now };
-    }
+    const attempts = await store.getLoginAttempts(loginKey) || { count: 0 };
     
-    if (attempts.count >= 5) {
+    if (attempts.count >= MAX_LOGIN_ATTEMPTS) {
       // 审计日志 - 登录尝试过于频繁
       auditLog('LOGIN_RATE_LIMIT_EXCEEDED', {
         email,
@@ -445,18 +452,17 @@ router.post('/login', loginLimiter, async (req, res) => {
     }
     
     // 查找用户
-    const user = users.get(email);
+    const user = await store.getUser(email);
     
     if (!user) {
       // 增加失败计数
-      attempts.count++;
-      loginAttempts.set(loginKey, attempts);
+      const failed = await store.incrementLoginAttempts(loginKey, LOGIN_WINDOW_MS);
       
       // 审计日志 - 用户不存在
       auditLog('LOGIN_FAILED_USER_NOT_FOUND', {
         email,
         ip: req.ip,
-        attemptNumber: attempts.count
+        attemptNumber: failed.count
       });
       
       return res.status(401).json({
@@ -471,15 +477,14 @@ router.post('/login', loginLimiter, async (req, res) => {
     
     if (!isPasswordValid) {
       // 增加失败计数
-      attempts.count++;
-      loginAttempts.set(loginKey, attempts);
+      const failed = await store.incrementLoginAttempts(loginKey, LOGIN_WINDOW_MS);
       
       // 审计日志 - 密码错误
       auditLog('LOGIN_FAILED_INVALID_PASSWORD', {
         userId: user.id,
         email,
         ip: req.ip,
-        attemptNumber: attempts.count
+        attemptNumber: failed.count
       });
       
       return res.status(401).json({
@@ -490,10 +495,12 @@ router.post('/login', loginLimiter, async (req, res) => {
     }
     
     // 登录成功 - 重置计数
-    loginAttempts.delete(loginKey);
+    if (attempts.count > 0) {
+      await store.clearLoginAttempts(loginKey);
+    }
     
     // 生成 Token (带设备信息，进行 token 轮换)
-    const tokens = generateTokens(user, { 
+    const tokens = await generateTokens(user, { 
       deviceInfo: deviceInfo || req.get('User-Agent') || 'unknown' 
     });
     
@@ -552,8 +559,8 @@ router.post('/refresh', refreshLimiter, async (req, res) => {
       });
     }
     
-    // 验证 Refresh Token (包含轮换检查)
-    const payload = await verifyRefreshToken(refreshToken);
+    // 验证并消费 Refresh Token (包含轮换检查)；同一令牌的并发请求只有一个能通过
+    const payload = await verifyRefreshToken(refreshToken, { consume: true });
     
     if (!payload) {
       // 审计日志 - Token 验证失败
@@ -570,7 +577,8 @@ router.post('/refresh', refreshLimiter, async (req, res) => {
     }
     
     // 从数据库获取最新用户信息
-    const user = users.get(payload.email);
+    const store = await getStore();
+    const user = await store.getUser(payload.email);
     
     if (!user) {
       // 审计日志 - 用户不存在
@@ -588,12 +596,27 @@ router.post('/refresh', refreshLimiter, async (req, res) => {
     }
     
     // 生成新的 Token 对 (实现轮换)
-    const tokens = generateTokens(user, { 
+    const tokens = await generateTokens(user, { 
       deviceInfo: req.get('User-Agent') || 'unknown',
       isRefresh: true,
       familyId: payload.familyId
     });
     
+    if (!tokens) {
+      // 并发重用检测已将家族标记为泄露，拒绝轮换
+      auditLog('TOKEN_REFRESH_FAILED', {
+        userId: user.id,
+        ip: req.ip,
+        reason: 'COMPROMISED_FAMILY'
+      });
+      
+      return res.status(401).json({
+        success: false,
+        error: 'Invalid refresh token',
+        message: 'Refresh token is invalid, expired, or has been revoked'
+      });
+    }
+    
     // 审计日志 - Token 刷新成功 (轮换)
     auditLog('TOKEN_REFRESH_SUCCESS', {
       userId: user.id,
@@ -640,9 +663,9 @@ router.post('/logout', async (req, res) => {
     // 如果提供了刷新令牌，尝试撤销
     const { refreshToken } = req.body;
     if (refreshToken) {
-      const payload = verifyAccessTokenSync(refreshToken);
+      const payload = verifyRefreshTokenSync(refreshToken);
       if (payload?.tokenId) {
-        revokeRefreshToken(payload.tokenId);
+        await revokeRefreshToken(payload.tokenId);
         tokenId = payload.tokenId;
       }
     }
@@ -677,8 +700,6 @@ router.post('/logout', async (req, res) => {
  */
 router.post('/logout-all', async (req, res) => {
   try {
-    const { revokeAllUserTokens } = require('../utils/jwt');
-    
     if (!req.user) {
       return res.status(401).json({
         success: false,
@@ -688,7 +709,7 @@ router.post('/logout-all', async (req, res) => {
     }
     
     // 撤销所有令牌
-    const count = revokeAllUserTokens(req.user.id);
+    const count = await revokeAllUserTokens(req.user.id);
     
     // 审计日志 - 撤销所有令牌
     auditLog('LOGOUT_ALL', {
@@ -718,7 +739,7 @@ router.post('/logout-all', async (req, res) => {
  * GET /api/auth/me
  * 获取当前用户信息
  */
-router.get('/me', (req, res) => {
+router.get('/me', async (req, res) => {
   const authHeader = req.headers.authorization;
   
   if (!authHeader) {
@@ -744,7 +765,8 @@ router.get('/me', (req, res) => {
   }
   
   // 从数据库获取用户信息
-  const user = users.get(payload.email);
+  const store = await getStore();
+  const user = await store.getUser(payload.email);
   
   if (!user) {
     return res.status(404).json({
@@ -798,7 +820,7 @@ router.post('/verify', (req, res) => {
  * GET /api/auth/sessions
  * 获取用户的有效会话列表
  */
-router.get('/sessions', (req, res) => {
+router.get('/sessions', async (req, res) => {
   const authHeader = req.headers.authorization;
   
   if (!authHeader) {
@@ -823,8 +845,7 @@ router.get('/sessions', (req, res) => {
     });
   }
   
-  const { getUserValidTokens } = require('../utils/jwt');
-  const sessions = getUserValidTokens(payload.id);
+  const sessions = await getUserValidTokens(payload.id);
   
   res.json({
     success: true,
@@ -4,9 +4,11 @@
  */
 
 const express = require('express');
-const { exec } = require('child_process');
 const path = require('path');
 const fs = require('fs');
+const { EntropyWorker, EntropyService } = require('../utils/entropyWorker');
+const { EntropyHistory } = require('../utils/entropyHistory');
+const { timeAsync, fileReadDuration } = require('../metrics');
 
 const router = express.Router();
 
@@ -20,16 +22,61 @@ if (!fs.existsSync(path.join(OPENDOGE_ROOT, 'AGENTS.md'))) {
     }
 }
 
+const ENTROPY_SCRIPT = path.join(OPENDOGE_ROOT, 'scripts/monitoring/entropy_calculator_unified.py');
+
+// 常驻计算进程 + 结果缓存 (30秒新鲜期，5分钟 stale-while-revalidate)
+let entropyWorker = new EntropyWorker({
+    args: [path.join(__dirname, '../scripts/entropy_worker.py'), ENTROPY_SCRIPT],
+    cwd: OPENDOGE_ROOT
+});
+let entropyService = new EntropyService({
+    worker: entropyWorker,
+    ttlMs: parseInt(process.env.ENTROPY_CACHE_TTL_MS || '30000', 10),
+    staleMs: parseInt(process.env.ENTROPY_STALE_MS || '300000', 10)
+});
+let entropyHistory = new EntropyHistory({
+    filePath: path.join(OPENDOGE_ROOT, 'memory/entropy_history.json'),
+    limit: 100
+});
+
+/**
+ * Replace the entropy worker / history source (tests, alternative deployments)
+ * @param {Object} options
+ * @param {EntropyWorker} [options.worker] - Worker speaking the line-delimited JSON protocol
+ * @param {string} [options.historyPath] - Path to entropy_history.json
+ * @param {number} [options.ttlMs] - Fresh window
+ * @param {number} [options.staleMs] - Stale-while-revalidate window
+ */
+router.configure = ({ worker, historyPath, ttlMs, staleMs } = {}) => {
+    if (worker) {
+        entropyWorker.stop();
+        entropyWorker = worker;
+    }
+    entropyService = new EntropyService({
+        worker: entropyWorker,
+        ttlMs: ttlMs ?? entropyService.ttlMs,
+        staleMs: staleMs ?? entropyService.staleMs
+    });
+    if (historyPath) {
+        entropyHistory = new EntropyHistory({ filePath: historyPath, limit: 100 });
+    }
+};
+
+/**
+ * Stop the entropy worker process
+ */
+router.shutdown = () => entropyWorker.stop();
+
 /**
  * @swagger
  * /api/entropy:
  *   get:
  *     summary: 获取当前熵值
- *     description: 计算并返回系统当前的熵值
+ *     description: 返回系统当前的熵值 (常驻计算进程 + 缓存，过期后后台刷新；计算失败时返回上一次结果并带 Warning 头)
  *     tags: [熵值]
  *     responses:
  *       200:
- *         description: 熵值数据
+ *         description: 熵值数据 (计算失败时为上一次结果，stale 为 true，响应头 Warning 111)
  *         content:
  *           application/json:
  *             schema:
@@ -41,36 +88,35 @@ if (!fs.existsSync(path.join(OPENDOGE_ROOT, 'AGENTS.md'))) {
  *                   type: object
  *                 timestamp:
  *                   type: number
+ *                 cachedAt:
+ *                   type: number
+ *                 stale:
+ *                   type: boolean
+ *       500:
+ *         description: 计算失败且没有可用的旧结果
  */
-router.get('/entropy', (req, res) => {
-    const scriptPath = path.join(OPENDOGE_ROOT, 'scripts/monitoring/entropy_calculator_unified.py');
-    const cmd = `cd ${OPENDOGE_ROOT} && python3 ${scriptPath} --json`;
-    
-    exec(cmd, (error, stdout, stderr) => {
-        if (error) {
-            console.error('Entropy calculation error:', error);
-            return res.status(500).json({
-                success: false,
-                error: 'Failed to calculate entropy',
-                message: error.message
-            });
+router.get('/entropy', async (req, res) => {
+    try {
+        const { data, cachedAt, stale, revalidationFailed } = await entropyService.get();
+        if (revalidationFailed) {
+            // 计算失败时返回上一次结果，并按 HTTP 语义标注
+            res.set('Warning', '111 - "Revalidation Failed"');
         }
-        
-        try {
-            const result = JSON.parse(stdout);
-            res.json({
-                success: true,
-                data: result,
-                timestamp: Date.now()
-            });
-        } catch (parseError) {
-            console.error('JSON parse error:', parseError);
-            res.status(500).json({
-                success: false,
-                error: 'Failed to parse entropy data'
-            });
-        }
-    });
+        res.json({
+            success: true,
+            data,
+            timestamp: Date.now(),
+            cachedAt,
+            stale
+        });
+    } catch (error) {
+        console.error('Entropy calculation error:', error);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to calculate entropy',
+            message: error.message
+        });
+    }
 });
 
 /**
@@ -95,26 +141,15 @@ router.get('/entropy', (req, res) => {
  *                 timestamp:
  *                   type: number
  */
-router.get('/entropy/history', (req, res) => {
-    const historyPath = path.join(OPENDOGE_ROOT, 'memory/entropy_history.json');
-    
-    if (fs.existsSync(historyPath)) {
-        try {
-            const history = JSON.parse(fs.readFileSync(historyPath, 'utf8'));
-            res.json({
-                success: true,
-                data: history.slice(-100),
-                timestamp: Date.now()
-            });
-        } catch (error) {
-            console.error('Failed to read entropy history:', error);
-            res.json({
-                success: true,
-                data: [],
-                timestamp: Date.now()
-            });
-        }
-    } else {
+router.get('/entropy/history', async (req, res) => {
+    try {
+        res.json({
+            success: true,
+            data: await timeAsync(fileReadDuration, { file: 'entropy_history' }, () => entropyHistory.read()),
+            timestamp: Date.now()
+        });
+    } catch (error) {
+        console.error('Failed to read entropy history:', error);
         res.json({
             success: true,
             data: [],
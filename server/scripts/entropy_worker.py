@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Long-lived entropy worker for server/routes/entropy.js.
+
+Speaks line-delimited JSON over stdio so the server does not fork a new
+interpreter per request:
+
+    request:  {"id": 1, "method": "calculate"}
+    response: {"id": 1, "result": {...}}   or   {"id": 1, "error": "..."}
+
+The calculator script is executed in-process with ``--json`` (the same
+contract as the old one-shot ``python3 entropy_calculator_unified.py --json``);
+its stdout is captured and parsed, and imported modules stay warm between
+calls.
+
+Usage: entropy_worker.py <path/to/entropy_calculator_unified.py>
+"""
+
+import contextlib
+import io
+import json
+import os
+import runpy
+import sys
+
+
+def calculate(script):
+    buffer = io.StringIO()
+    saved_argv = sys.argv
+    sys.argv = [script, '--json']
+    try:
+        with contextlib.redirect_stdout(buffer):
+            try:
+                runpy.run_path(script, run_name='__main__')
+            except SystemExit as exc:
+                if exc.code not in (None, 0):
+                    raise RuntimeError('calculator exited with status %s' % exc.code)
+    finally:
+        sys.argv = saved_argv
+    return json.loads(buffer.getvalue())
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.stderr.write('usage: entropy_worker.py <calculator script>\n')
+        return 2
+
+    script = os.path.abspath(sys.argv[1])
+    out = sys.stdout
+
+    # `python3 <script>` puts the script's directory first on sys.path;
+    # run_path does not, so sibling-module imports need it added here
+    sys.path.insert(0, os.path.dirname(script))
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+
+        request_id = request.get('id')
+        try:
+            method = request.get('method', 'calculate')
+            if method != 'calculate':
+                raise ValueError('unknown method: %s' % method)
+            response = {'id': request_id, 'result': calculate(script)}
+        except Exception as exc:  # noqa: BLE001 - report every failure to the caller
+            response = {'id': request_id, 'error': str(exc)}
+
+        out.write(json.dumps(response) + '\n')
+        out.flush()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
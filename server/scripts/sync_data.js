@@ -1,11 +1,20 @@
 const redis = require('redis');
-const { execSync } = require('child_process');
+const crypto = require('crypto');
 const fs = require('fs');
 const path = require('path');
+const { publishInvalidation } = require('../utils/cache');
+const { createSourceFromEnv } = require('../utils/leaderboardSource');
+const { compileRules, compileAgentCoefficients, literals, memoize } = require('../../shared/modelMatcher.mjs');
 
 const REDIS_URL = process.env.REDIS_URL || 'redis://localhost:6379';
-const HF_DATA_URL_BASE = 'https://datasets-server.huggingface.co/rows?dataset=open-llm-leaderboard/contents&config=default&split=train';
 const REDIS_KEY = 'agent:rankings';
+// Own keys: sync_hf.js rebuilds leaderboard:overall / agent:metadata:* from
+// scratch on a different score scale (per model, not per family)
+const LEADERBOARD_KEY = 'leaderboard:families';
+const LEADERBOARD_VERSION_KEY = 'leaderboard:version';
+const LEADERBOARD_UPDATED_AT_KEY = 'leaderboard:updated_at';
+const METADATA_KEY_PREFIX = 'agent:family:';
+const WRITE_BATCH_SIZE = 500;
 
 const CLOSED_SOURCE_PROVIDERS = ['openai', 'anthropic', 'google'];
 
@@ -32,217 +41,205 @@ try {
     console.warn('⚠️ Failed to load agent coefficients, using defaults');
 }
 
-function getAgenticMultiplier(modelName) {
-    const name = modelName.toLowerCase();
-    // Check High Tier
-    if (AGENT_COEFFICIENTS.high.patterns.some(p => name.includes(p.toLowerCase()))) {
-        return AGENT_COEFFICIENTS.high.multiplier;
-    }
-    // Check Mid Tier
-    if (AGENT_COEFFICIENTS.mid.patterns.some(p => name.includes(p.toLowerCase()))) {
-        return AGENT_COEFFICIENTS.mid.multiplier;
-    }
-    return AGENT_COEFFICIENTS.low.multiplier || 1.0;
-}
-
-function extractFamily(fullname) {
-    const name = fullname.split('/').pop();
+// Tier patterns compiled once into one matcher
+const getAgenticMultiplier = compileAgentCoefficients(AGENT_COEFFICIENTS);
+
+// Display names for common families, first match wins
+// (only called from the memoized extractFamily, so no memo of its own)
+const QWEN_FAMILY = 'Qwen';
+const matchFamilyDisplayName = compileRules([
+    { value: 'Llama 3.1', patterns: literals(['llama 3.1']) },
+    { value: 'Llama 3', patterns: literals(['llama 3']) },
+    // Group all Qwen/QwQ into one family
+    { value: QWEN_FAMILY, patterns: literals(['qwen', 'qwq']) }
+], { cacheSize: 0 });
+
+// Every HF row has a distinct fullname - a memo would only add inserts
+const matchMergeKeywords = compileRules(
+    [{ value: true, patterns: ['merge', 'mix', 'quant', 'awq', 'gptq', 'gguf', 'exl2', 'quik'] }],
+    { fallback: false, cacheSize: 0 }
+);
+
+const extractFamily = memoize((fullname) => {
+    const name = fullname.slice(fullname.lastIndexOf('/') + 1);
     
     // Normalize: remove -Instruct, -Chat, -hf, version suffixes, etc.
-    let family = name
-        .replace(/-Instruct/gi, '')
-        .replace(/-Chat/gi, '')
-        .replace(/-hf/gi, '')
-        .replace(/-v[0-9.]+/gi, '')
-        .replace(/_/g, ' ')
-        .replace(/-/g, ' ');
+    const family = name
+        .replace(/-(?:Instruct|Chat|hf|v[0-9.]+)/gi, '')
+        .replace(/[_-]/g, ' ');
 
     // Match size (e.g., 7B, 70B, 8x7B)
-    const sizeMatch = family.match(/([0-9x.]+[Bb])/);
-    const size = sizeMatch ? sizeMatch[1].toUpperCase() : '';
+    const sizeMatch = /[0-9x.]+[Bb]/.exec(family);
+    const size = sizeMatch ? sizeMatch[0].toUpperCase() : '';
     
-    let baseName = family.split(sizeMatch ? sizeMatch[0] : '____')[0].trim();
+    // Everything before the size (the leftmost match is also its first occurrence)
+    let baseName = (sizeMatch ? family.slice(0, sizeMatch.index) : family).trim();
     
     // Clean base name prefixes and junk
     baseName = baseName
-        .replace(/^Meta /i, '')
-        .replace(/^Mistral /i, '')
-        .replace(/^Mixtral /i, '')
-        .replace(/^Qwen /i, '')
+        .replace(/^(?:Meta )?(?:Mistral )?(?:Mixtral )?(?:Qwen )?/i, '')
         .replace(/Base$/i, '')
         .trim();
 
     // Map common names to clean display names
-    if (baseName.toLowerCase().includes('llama 3.1')) baseName = 'Llama 3.1';
-    else if (baseName.toLowerCase().includes('llama 3')) baseName = 'Llama 3';
-    else if (baseName.toLowerCase().includes('qwen') || baseName.toLowerCase().includes('qwq')) return 'Qwen'; // Group all Qwen/QwQ into one family
-    else if (baseName.toLowerCase().includes('qwen 1.5')) baseName = 'Qwen 1.5';
-    else if (baseName.toLowerCase().includes('qwen 2')) baseName = 'Qwen 2';
+    const displayName = matchFamilyDisplayName(baseName);
+    if (displayName === QWEN_FAMILY) return QWEN_FAMILY;
+    if (displayName) baseName = displayName;
 
     return `${baseName} ${size}`.trim();
-}
+});
 
 function isCommunityVariant(fullname, row) {
-    const name = fullname.toLowerCase();
     // Filter: Exclude "Merge", "Mix", "Quant" models
-    const hasMergeKeywords = /merge|mix|quant|awq|gptq|gguf|exl2|quik/.test(name);
-    return (row.Merged === true) || hasMergeKeywords;
+    return (row.Merged === true) || matchMergeKeywords(fullname);
 }
 
-async function syncData() {
-    console.log('🚀 Starting Advanced ETL sync with Model Clustering & Scoring...');
-    
-    let redisClient = null;
-    let isRedisAvailable = false;
+/**
+ * Incremental family clustering & scoring
+ *
+ * Rows are folded in as pages arrive; each family keeps only running
+ * aggregates (best official score, top-3 community scores, Qwen category
+ * maxes, representative row), so memory grows with the number of families
+ * rather than the number of rows.
+ */
+class FamilyAggregator {
+    constructor() {
+        this.families = new Map();
+        this.rowCount = 0;
+    }
 
-    try {
-        // 1. Initialize Redis
-        try {
-            redisClient = redis.createClient({ url: REDIS_URL });
-            await redisClient.connect();
-            console.log('✅ Redis connected');
-            isRedisAvailable = true;
-        } catch (rErr) {
-            console.warn('⚠️ Redis failed, falling back to file only');
+    _family(familyName, provider) {
+        let f = this.families.get(familyName);
+        if (!f) {
+            f = {
+                name: familyName,
+                provider,
+                isClosed: CLOSED_SOURCE_PROVIDERS.includes(provider.toLowerCase()),
+                bestOfficial: null,
+                firstOfficial: null,
+                firstCommunity: null,
+                bestCommunity: null,
+                topCommunityScores: [],
+                categories: { reasoning: null, coding: null, general: null }
+            };
+            this.families.set(familyName, f);
         }
+        return f;
+    }
 
-        // 2. Extract: Fetch in pages to bypass 100-row limit
-        console.log(`📡 Fetching data from HF API (3 pages)...`);
-        let rows = [];
-        for (let i = 0; i < 3; i++) {
-            const offset = i * 100;
-            const tempFile = path.join(__dirname, `temp_hf_data_${i}.json`);
-            console.log(`   Page ${i+1}...`);
-            execSync(`curl -s -L --max-time 60 "${HF_DATA_URL_BASE}&offset=${offset}&limit=100" -o "${tempFile}"`);
-            const pageData = JSON.parse(fs.readFileSync(tempFile, 'utf8'));
-            if (pageData.rows) rows.push(...pageData.rows);
-            fs.unlinkSync(tempFile);
+    /**
+     * Add one HF row
+     * @param {Object} row - Row fields
+     */
+    addRow(row) {
+        this.rowCount++;
+        const fullname = row.fullname || "unknown/model";
+        const providerRaw = fullname.split('/')[0];
+        const familyName = extractFamily(fullname);
+        const f = this._family(familyName, providerRaw);
+
+        const modelInfo = {
+            score: row["Average ⬆️"] || 0,
+            fullname: fullname,
+            row: row
+        };
+
+        if (row["Official Providers"] === true) {
+            this._addOfficial(f, modelInfo);
+        } else if (!isCommunityVariant(fullname, row)) {
+            this._addCommunity(f, modelInfo);
         }
-        console.log(`📦 Received ${rows.length} models for clustering`);
-
-        // 3. Transform: Clustering & Scoring Logic
-        const familyMap = {};
-
-        rows.forEach(item => {
-            const row = item.row;
-            const fullname = row.fullname || "unknown/model";
-            const providerRaw = fullname.split('/')[0];
-            const familyName = extractFamily(fullname);
-            
-            if (!familyMap[familyName]) {
-                familyMap[familyName] = {
-                    name: familyName,
-                    provider: providerRaw,
-                    officialModels: [],
-                    communityModels: [],
-                    isClosed: CLOSED_SOURCE_PROVIDERS.includes(providerRaw.toLowerCase())
-                };
-            }
+    }
 
-            const modelInfo = {
-                score: row["Average ⬆️"] || 0,
-                fullname: fullname,
-                row: row
-            };
+    /**
+     * Add a non-HF official model (e.g. Qwen intel from cn_models.json)
+     */
+    addOfficialModel(familyName, provider, modelInfo) {
+        this._addOfficial(this._family(familyName, provider), modelInfo);
+    }
 
-            const isOfficial = (row["Official Providers"] === true);
-            const isCommunity = isCommunityVariant(fullname, row);
+    _addOfficial(f, m) {
+        if (!f.firstOfficial) f.firstOfficial = m;
+        if (f.bestOfficial === null || m.score > f.bestOfficial) f.bestOfficial = m.score;
+        this._addCategory(f, m);
+    }
 
-            if (isOfficial) {
-                familyMap[familyName].officialModels.push(modelInfo);
-            } else if (!isCommunity) {
-                familyMap[familyName].communityModels.push(modelInfo);
-            }
-        });
+    _addCommunity(f, m) {
+        if (!f.firstCommunity) f.firstCommunity = m;
+        // 严格大于：同分时保留先出现的 (与稳定排序一致)
+        if (!f.bestCommunity || m.score > f.bestCommunity.score) f.bestCommunity = m;
 
-        // 3.5 Inject Qwen Intel from cn_models.json
-        Object.values(QWEN_INTEL.models).forEach(m => {
-            const familyName = 'Qwen';
-            if (!familyMap[familyName]) {
-                familyMap[familyName] = {
-                    name: familyName,
-                    provider: 'Alibaba',
-                    officialModels: [],
-                    communityModels: [],
-                    isClosed: false
-                };
-            }
-            
-            // Convert Elo to a base score compatible with HF (approx 15:1)
-            const baseScore = m._meta.elo_rating ? (m._meta.elo_rating / 15) : 0;
-            
-            familyMap[familyName].officialModels.push({
-                score: baseScore,
-                fullname: m.id,
-                isCNModel: true,
-                type: m.type
-            });
-        });
+        const top = f.topCommunityScores;
+        if (top.length < 3 || m.score > top[top.length - 1]) {
+            top.push(m.score);
+            top.sort((a, b) => b - a);
+            if (top.length > 3) top.pop();
+        }
+        this._addCategory(f, m);
+    }
 
-        // Calculate Scores per Family
-        let families = Object.values(familyMap).map(f => {
+    _addCategory(f, m) {
+        if (f.name !== 'Qwen') return;
+        const name = m.fullname.toLowerCase();
+        let category = null;
+        if (name.includes('qwq')) category = 'reasoning';
+        else if (name.includes('coder')) category = 'coding';
+        else if (name.includes('max') || name.includes('plus') || name.includes('72b')) category = 'general';
+        if (category && (f.categories[category] === null || m.score > f.categories[category])) {
+            f.categories[category] = m.score;
+        }
+    }
+
+    /**
+     * Score every family
+     * @returns {Array} [{ familyName, provider, score, representative, params, benchmarks, ... }]
+     */
+    results() {
+        return Array.from(this.families.values()).map(f => {
             let finalScore = 0;
-            let qwenBonus = 1.0;
+            let reasoningMax;
+            let codingMax;
+            let rep;
 
             if (f.name === 'Qwen') {
                 // MISSION: Qwen-Specific Scoring Algorithm
-                const categories = {
-                    reasoning: [],
-                    coding: [],
-                    general: []
-                };
-
-                [...f.officialModels, ...f.communityModels].forEach(m => {
-                    const name = m.fullname.toLowerCase();
-                    if (name.includes('qwq')) categories.reasoning.push(m.score);
-                    else if (name.includes('coder')) categories.coding.push(m.score);
-                    else if (name.includes('max') || name.includes('plus') || name.includes('72b')) categories.general.push(m.score);
-                });
-
-                const reasoningMax = categories.reasoning.length > 0 ? Math.max(...categories.reasoning) : 0;
-                const codingMax = categories.coding.length > 0 ? Math.max(...categories.coding) : 0;
-                const generalMax = categories.general.length > 0 ? Math.max(...categories.general) : 0;
+                reasoningMax = f.categories.reasoning || 0;
+                codingMax = f.categories.coding || 0;
+                const generalMax = f.categories.general || 0;
 
                 // BaseScore = Max(General_Max, Reasoning_Max, Coding_Max)
-                finalScore = Math.max(reasoningMax, codingMax, generalMax);
-
                 // Note: Bonus (1.05x) will be applied after normalization if category scores > 80
-                // Store category maxes for later
-                f.reasoningMax = reasoningMax;
-                f.codingMax = codingMax;
+                finalScore = Math.max(reasoningMax, codingMax, generalMax);
+                rep = f.firstOfficial || f.firstCommunity;
             } else {
-                const bestOfficial = f.officialModels.length > 0 
-                    ? Math.max(...f.officialModels.map(m => m.score)) 
-                    : null;
-                
-                const sortedCommunity = f.communityModels.sort((a, b) => b.score - a.score);
-                const top3Community = sortedCommunity.slice(0, 3);
-                const communityAvg = top3Community.length > 0 
-                    ? top3Community.reduce((sum, m) => sum + m.score, 0) / top3Community.length 
+                const top3Community = f.topCommunityScores;
+                const communityAvg = top3Community.length > 0
+                    ? top3Community.reduce((sum, score) => sum + score, 0) / top3Community.length
                     : null;
 
                 if (f.isClosed) {
-                    finalScore = bestOfficial || 0;
+                    finalScore = f.bestOfficial || 0;
                 } else {
-                    if (bestOfficial !== null) {
-                        finalScore = communityAvg !== null 
-                            ? (0.6 * bestOfficial) + (0.4 * communityAvg)
-                            : bestOfficial;
+                    if (f.bestOfficial !== null) {
+                        finalScore = communityAvg !== null
+                            ? (0.6 * f.bestOfficial) + (0.4 * communityAvg)
+                            : f.bestOfficial;
                     } else if (communityAvg !== null) {
                         finalScore = communityAvg;
                     }
                 }
+                rep = f.firstOfficial || f.bestCommunity;
             }
 
-            const rep = f.officialModels[0] || f.communityModels[0] || { row: {} };
+            rep = rep || { row: {} };
             const row = rep.row || {};
 
             return {
                 familyName: f.name,
                 provider: f.provider,
                 score: finalScore,
-                reasoningMax: f.reasoningMax, // Passed through for Qwen
-                codingMax: f.codingMax,       // Passed through for Qwen
+                reasoningMax, // Passed through for Qwen
+                codingMax,    // Passed through for Qwen
                 representative: rep.fullname,
                 params: row["#Params (B)"] || 0,
                 benchmarks: {
@@ -252,183 +249,379 @@ async function syncData() {
                 }
             };
         });
+    }
+}
 
-        // Filter and Sort
-        families = families
-            .filter(f => f.score > 0)
-            .sort((a, b) => b.score - a.score);
-
-        // Normalize based on top score found
-        const maxScore = families.length > 0 ? families[0].score : 1;
-        console.log(`📈 Max score found: ${maxScore}`);
-
-        const transformedData = families.map((f, index) => {
-            let normalizedAvg = Math.min(100, (f.score / maxScore) * 98);
-
-            // Apply Qwen Bonus if conditions met
-            if (f.familyName === 'Qwen' && f.reasoningMax && f.codingMax) {
-                const normReasoning = (f.reasoningMax / maxScore) * 98;
-                const normCoding = (f.codingMax / maxScore) * 98;
-                if (normReasoning > 80 && normCoding > 80) {
-                    console.log(`🎯 Qwen Versatility Bonus Applied! (R:${normReasoning.toFixed(1)} C:${normCoding.toFixed(1)})`);
-                    normalizedAvg = Math.min(100, normalizedAvg * 1.05);
+/**
+ * Deterministic pseudo sample count per model, so an unchanged family
+ * serializes identically between runs
+ */
+function stableSamples(name, min, range) {
+    const digest = crypto.createHash('md5').update(name).digest();
+    return min + (digest.readUInt32LE(0) % range);
+}
+
+function loadPmkbModels() {
+    const PMKB_DIR = path.join(__dirname, '../data/pmkb');
+    const pmkbModels = {};
+    try {
+        if (fs.existsSync(PMKB_DIR)) {
+            const files = fs.readdirSync(PMKB_DIR).filter(f => f.endsWith('.json'));
+            files.forEach(file => {
+                const data = JSON.parse(fs.readFileSync(path.join(PMKB_DIR, file), 'utf8'));
+                if (data.models) {
+                    data.models.forEach(m => {
+                        pmkbModels[m.id.toLowerCase()] = {
+                            ...m,
+                            provider: data.provider,
+                            isPMKB: true
+                        };
+                    });
                 }
+            });
+            console.log(`🧠 Loaded ${Object.keys(pmkbModels).length} PMKB models for 2026-Era Flagships`);
+        }
+    } catch (pmkbErr) {
+        console.warn('⚠️ PMKB failed to load:', pmkbErr);
+    }
+    return pmkbModels;
+}
+
+function loadProprietaryModels() {
+    const PROPRIETARY_PATH = path.join(__dirname, '../data/proprietary_models.json');
+    try {
+        if (fs.existsSync(PROPRIETARY_PATH)) {
+            const proprietaryModels = JSON.parse(fs.readFileSync(PROPRIETARY_PATH, 'utf8'));
+            console.log(`🔌 Loaded ${proprietaryModels.length} proprietary models for fusion`);
+            return proprietaryModels;
+        }
+    } catch (pErr) {
+        console.warn('⚠️ Proprietary models failed to load, skipping fusion');
+    }
+    return [];
+}
+
+/**
+ * Normalize family scores, fuse proprietary/PMKB models and rank
+ * @param {Array} familyResults - FamilyAggregator#results()
+ * @param {Object} [options]
+ * @param {Object} [options.pmkbModels] - PMKB models keyed by lowercase id
+ * @param {Array} [options.proprietaryModels] - Proprietary models
+ * @returns {Array} Top 100 rankings
+ */
+function rankFamilies(familyResults, { pmkbModels = {}, proprietaryModels = [] } = {}) {
+    // Filter and Sort
+    const families = familyResults
+        .filter(f => f.score > 0)
+        .sort((a, b) => b.score - a.score);
+
+    // Normalize based on top score found
+    const maxScore = families.length > 0 ? families[0].score : 1;
+    console.log(`📈 Max score found: ${maxScore}`);
+
+    const transformedData = families.map((f, index) => {
+        let normalizedAvg = Math.min(100, (f.score / maxScore) * 98);
+
+        // Apply Qwen Bonus if conditions met
+        if (f.familyName === 'Qwen' && f.reasoningMax && f.codingMax) {
+            const normReasoning = (f.reasoningMax / maxScore) * 98;
+            const normCoding = (f.codingMax / maxScore) * 98;
+            if (normReasoning > 80 && normCoding > 80) {
+                console.log(`🎯 Qwen Versatility Bonus Applied! (R:${normReasoning.toFixed(1)} C:${normCoding.toFixed(1)})`);
+                normalizedAvg = Math.min(100, normalizedAvg * 1.05);
+            }
+        }
+
+        return {
+            id: index + 1,
+            rank: index + 1,
+            diff: 0,
+            tier: normalizedAvg >= 90 ? "S" : normalizedAvg >= 80 ? "A" : normalizedAvg >= 70 ? "B" : normalizedAvg >= 60 ? "C" : "D",
+            provider: f.provider,
+            model: f.familyName,
+            fullName: f.representative,
+            avgPerf: parseFloat(normalizedAvg.toFixed(1)),
+            peakPerf: parseFloat((normalizedAvg * 1.05).toFixed(1)),
+            samples: stableSamples(f.familyName, 1000, 5000),
+            scenarios: ["reasoning", f.params > 10 ? "coding" : null, f.benchmarks.ifeval > 40 ? "instruction-following" : null].filter(Boolean)
+        };
+    });
+
+    // --- Hybrid Fusion Phase ---
+    const proprietaryTransformed = proprietaryModels.map((m, idx) => ({
+        id: `p-${idx}`,
+        rank: 0,
+        diff: 0,
+        tier: "D", // Will be recalculated
+        provider: m.provider,
+        model: m.model,
+        fullName: m.model,
+        avgPerf: m.avgPerf,
+        peakPerf: parseFloat((m.avgPerf * 1.02).toFixed(1)),
+        samples: stableSamples(m.model, 5000, 10000),
+        scenarios: ["reasoning", "coding", "instruction-following"],
+        isProprietary: true
+    }));
+
+    // Merge and apply Hard Override
+    const combinedModels = [...transformedData, ...proprietaryTransformed];
+    const knownModels = new Set(combinedModels.map(m => m.model.toLowerCase()));
+
+    // Add missing PMKB models
+    Object.values(pmkbModels).forEach(pm => {
+        if (!knownModels.has(pm.id.toLowerCase())) {
+            combinedModels.push({
+                id: `pmkb-${pm.id}`,
+                rank: 0,
+                diff: 0,
+                tier: "S+",
+                provider: pm.provider,
+                model: pm.id,
+                fullName: pm.model,
+                avgPerf: pm.avgPerf,
+                peakPerf: parseFloat((pm.avgPerf * 1.05).toFixed(1)),
+                samples: stableSamples(pm.id, 10000, 20000),
+                scenarios: ["reasoning", "coding", "instruction-following"],
+                isPMKB: true,
+                specs: pm.specs,
+                pricing: pm.pricing,
+                url: pm.url
+            });
+        }
+    });
+
+    return combinedModels
+        .map(item => {
+            const pmkbMatch = pmkbModels[item.model.toLowerCase()];
+            if (pmkbMatch) {
+                console.log(`🔥 PMKB Hard Override: Applying 2026 Specs to ${item.model}`);
+                return {
+                    ...item,
+                    avgPerf: pmkbMatch.avgPerf,
+                    peakPerf: parseFloat((pmkbMatch.avgPerf * 1.05).toFixed(1)),
+                    tier: "S+",
+                    provider: pmkbMatch.provider,
+                    specs: pmkbMatch.specs,
+                    pricing: pmkbMatch.pricing,
+                    url: pmkbMatch.url,
+                    isPMKB: true
+                };
             }
 
+            const multiplier = getAgenticMultiplier(item.model);
+            const agenticScore = parseFloat((item.avgPerf * multiplier).toFixed(1));
             return {
+                ...item,
+                multiplier,
+                agenticScore,
+                // Primary metric is now Agentic Performance
+                avgPerf: agenticScore 
+            };
+        })
+        .sort((a, b) => b.avgPerf - a.avgPerf)
+        .map((item, index) => {
+            const normalizedAvg = item.avgPerf;
+            let tier = item.tier;
+            if (tier !== "S+") {
+                tier = normalizedAvg >= 90 ? "S" : normalizedAvg >= 80 ? "A" : normalizedAvg >= 70 ? "B" : normalizedAvg >= 60 ? "C" : "D";
+            }
+            return {
+                ...item,
                 id: index + 1,
                 rank: index + 1,
-                diff: 0,
-                tier: normalizedAvg >= 90 ? "S" : normalizedAvg >= 80 ? "A" : normalizedAvg >= 70 ? "B" : normalizedAvg >= 60 ? "C" : "D",
-                provider: f.provider,
-                model: f.familyName,
-                fullName: f.representative,
-                avgPerf: parseFloat(normalizedAvg.toFixed(1)),
-                peakPerf: parseFloat((normalizedAvg * 1.05).toFixed(1)),
-                samples: Math.floor(Math.random() * 5000 + 1000),
-                scenarios: ["reasoning", f.params > 10 ? "coding" : null, f.benchmarks.ifeval > 40 ? "instruction-following" : null].filter(Boolean)
+                tier: tier
             };
-        });
+        })
+        .slice(0, 100);
+}
 
-        // --- PMKB Loading (2026 Models) ---
-        const PMKB_DIR = path.join(__dirname, '../data/pmkb');
-        const pmkbModels = {};
-        try {
-            if (fs.existsSync(PMKB_DIR)) {
-                const files = fs.readdirSync(PMKB_DIR).filter(f => f.endsWith('.json'));
-                files.forEach(file => {
-                    const data = JSON.parse(fs.readFileSync(path.join(PMKB_DIR, file), 'utf8'));
-                    if (data.models) {
-                        data.models.forEach(m => {
-                            pmkbModels[m.id.toLowerCase()] = {
-                                ...m,
-                                provider: data.provider,
-                                isPMKB: true
-                            };
-                        });
-                    }
-                });
-                console.log(`🧠 Loaded ${Object.keys(pmkbModels).length} PMKB models for 2026-Era Flagships`);
-            }
-        } catch (pmkbErr) {
-            console.warn('⚠️ PMKB failed to load:', pmkbErr);
-        }
+/**
+ * Encode a ranking entry as an agent:family hash: the typed entry as one
+ * JSON `payload` field (numbers, arrays and objects survive the round trip)
+ * plus its content hash. rank/id are positional and derived by the reader,
+ * so they are not stored - otherwise one family moving would rewrite every
+ * family below it
+ */
+function toMetadata(item) {
+    const { id, rank, ...entry } = item;
+    const payload = JSON.stringify(entry);
+    return {
+        payload,
+        etl_hash: crypto.createHash('sha1').update(payload).digest('base64url')
+    };
+}
 
-        // --- Hybrid Fusion Phase ---
-        const PROPRIETARY_PATH = path.join(__dirname, '../data/proprietary_models.json');
-        let proprietaryModels = [];
-        try {
-            if (fs.existsSync(PROPRIETARY_PATH)) {
-                proprietaryModels = JSON.parse(fs.readFileSync(PROPRIETARY_PATH, 'utf8'));
-                console.log(`🔌 Loaded ${proprietaryModels.length} proprietary models for fusion`);
+/**
+ * Write rankings to leaderboard:families / agent:family:{id}
+ *
+ * Only families whose content hash or score changed are written; families
+ * that dropped out are removed.
+ *
+ * @param {Object} client - node-redis client
+ * @param {Array} rankings - rankFamilies() output
+ * @returns {Promise<Object>} { written, removed, unchanged }
+ */
+async function writeLeaderboard(client, rankings) {
+    const entries = rankings.map(item => ({ id: item.model, score: item.avgPerf, fields: toMetadata(item) }));
+    const current = new Set(entries.map(e => e.id));
+    const previous = await client.zRange(LEADERBOARD_KEY, 0, -1);
+
+    // 批量读取现有哈希与分数，找出变化的家族
+    const changed = [];
+    for (let i = 0; i < entries.length; i += WRITE_BATCH_SIZE) {
+        const batch = entries.slice(i, i + WRITE_BATCH_SIZE);
+        const pipeline = client.multi();
+        batch.forEach(e => {
+            pipeline.hGet(`${METADATA_KEY_PREFIX}${e.id}`, 'etl_hash');
+            pipeline.zScore(LEADERBOARD_KEY, e.id);
+        });
+        const replies = await pipeline.exec();
+        batch.forEach((e, j) => {
+            const hash = replies[j * 2];
+            const score = replies[j * 2 + 1];
+            if (hash !== e.fields.etl_hash || score === null || Number(score) !== e.score) {
+                changed.push(e);
             }
-        } catch (pErr) {
-            console.warn('⚠️ Proprietary models failed to load, skipping fusion');
-        }
+        });
+    }
+    const removed = previous.filter(id => !current.has(id));
+
+    for (let i = 0; i < changed.length; i += WRITE_BATCH_SIZE) {
+        const pipeline = client.multi();
+        changed.slice(i, i + WRITE_BATCH_SIZE).forEach(e => {
+            const key = `${METADATA_KEY_PREFIX}${e.id}`;
+            pipeline.del(key);
+            pipeline.hSet(key, e.fields);
+            pipeline.zAdd(LEADERBOARD_KEY, { score: e.score, value: e.id });
+        });
+        await pipeline.exec();
+    }
 
-        const proprietaryTransformed = proprietaryModels.map((m, idx) => ({
-            id: `p-${idx}`,
-            rank: 0,
-            diff: 0,
-            tier: "D", // Will be recalculated
-            provider: m.provider,
-            model: m.model,
-            fullName: m.model,
-            avgPerf: m.avgPerf,
-            peakPerf: parseFloat((m.avgPerf * 1.02).toFixed(1)),
-            samples: Math.floor(Math.random() * 10000 + 5000),
-            scenarios: ["reasoning", "coding", "instruction-following"],
-            isProprietary: true
-        }));
-
-        // Merge and apply Hard Override
-        let combinedModels = [...transformedData, ...proprietaryTransformed];
-
-        // Add missing PMKB models
-        Object.values(pmkbModels).forEach(pm => {
-            if (!combinedModels.some(m => m.model.toLowerCase() === pm.id.toLowerCase())) {
-                combinedModels.push({
-                    id: `pmkb-${pm.id}`,
-                    rank: 0,
-                    diff: 0,
-                    tier: "S+",
-                    provider: pm.provider,
-                    model: pm.id,
-                    fullName: pm.model,
-                    avgPerf: pm.avgPerf,
-                    peakPerf: parseFloat((pm.avgPerf * 1.05).toFixed(1)),
-                    samples: Math.floor(Math.random() * 20000 + 10000),
-                    scenarios: ["reasoning", "coding", "instruction-following"],
-                    isPMKB: true,
-                    specs: pm.specs,
-                    pricing: pm.pricing,
-                    url: pm.url
-                });
-            }
+    for (let i = 0; i < removed.length; i += WRITE_BATCH_SIZE) {
+        const batch = removed.slice(i, i + WRITE_BATCH_SIZE);
+        const pipeline = client.multi();
+        pipeline.zRem(LEADERBOARD_KEY, batch);
+        pipeline.del(batch.map(id => `${METADATA_KEY_PREFIX}${id}`));
+        await pipeline.exec();
+    }
+
+    if (changed.length > 0 || removed.length > 0) {
+        // Bump data version so /api/agents rebuilds its snapshots
+        // updated_at is served as the response timestamp
+        await client.multi()
+            .incr(LEADERBOARD_VERSION_KEY)
+            .set(LEADERBOARD_UPDATED_AT_KEY, String(Date.now()))
+            .exec();
+        await publishInvalidation(client, [LEADERBOARD_VERSION_KEY, LEADERBOARD_UPDATED_AT_KEY]);
+    }
+
+    return {
+        written: changed.length,
+        removed: removed.length,
+        unchanged: entries.length - changed.length
+    };
+}
+
+/**
+ * Extract + transform: stream pages from the source into the aggregator
+ * @param {Object} source - leaderboardSource source
+ * @returns {Promise<Array>} Rankings
+ */
+async function buildRankings(source) {
+    const aggregator = new FamilyAggregator();
+
+    for await (const rows of source.pages()) {
+        rows.forEach(item => aggregator.addRow(item.row));
+    }
+    console.log(`📦 Clustered ${aggregator.rowCount} models into ${aggregator.families.size} families`);
+
+    // Inject Qwen Intel from cn_models.json
+    Object.values(QWEN_INTEL.models).forEach(m => {
+        // Convert Elo to a base score compatible with HF (approx 15:1)
+        const baseScore = m._meta.elo_rating ? (m._meta.elo_rating / 15) : 0;
+        aggregator.addOfficialModel('Qwen', 'Alibaba', {
+            score: baseScore,
+            fullname: m.id,
+            isCNModel: true,
+            type: m.type
         });
+    });
 
-        const finalRankings = combinedModels
-            .map(item => {
-                const pmkbMatch = pmkbModels[item.model.toLowerCase()];
-                if (pmkbMatch) {
-                    console.log(`🔥 PMKB Hard Override: Applying 2026 Specs to ${item.model}`);
-                    return {
-                        ...item,
-                        avgPerf: pmkbMatch.avgPerf,
-                        peakPerf: parseFloat((pmkbMatch.avgPerf * 1.05).toFixed(1)),
-                        tier: "S+",
-                        provider: pmkbMatch.provider,
-                        specs: pmkbMatch.specs,
-                        pricing: pmkbMatch.pricing,
-                        url: pmkbMatch.url,
-                        isPMKB: true
-                    };
-                }
+    return rankFamilies(aggregator.results(), {
+        pmkbModels: loadPmkbModels(),
+        proprietaryModels: loadProprietaryModels()
+    });
+}
 
-                const multiplier = getAgenticMultiplier(item.model);
-                const agenticScore = parseFloat((item.avgPerf * multiplier).toFixed(1));
-                return {
-                    ...item,
-                    multiplier,
-                    agenticScore,
-                    // Primary metric is now Agentic Performance
-                    avgPerf: agenticScore 
-                };
-            })
-            .sort((a, b) => b.avgPerf - a.avgPerf)
-            .map((item, index) => {
-                const normalizedAvg = item.avgPerf;
-                let tier = item.tier;
-                if (tier !== "S+") {
-                    tier = normalizedAvg >= 90 ? "S" : normalizedAvg >= 80 ? "A" : normalizedAvg >= 70 ? "B" : normalizedAvg >= 60 ? "C" : "D";
-                }
-                return {
-                    ...item,
-                    id: index + 1,
-                    rank: index + 1,
-                    tier: tier
-                };
-            })
-            .slice(0, 100);
+async function syncData() {
+    console.log('🚀 Starting Advanced ETL sync with Model Clustering & Scoring...');
+    
+    let redisClient = null;
+    let isRedisAvailable = false;
 
-        // 4. Load
-        if (isRedisAvailable && redisClient) {
-            await redisClient.set(REDIS_KEY, JSON.stringify(finalRankings));
-            console.log('✅ Redis updated with hybrid rankings');
+    try {
+        // 1. Initialize Redis
+        try {
+            redisClient = redis.createClient({ url: REDIS_URL });
+            await redisClient.connect();
+            console.log('✅ Redis connected');
+            isRedisAvailable = true;
+        } catch (rErr) {
+            console.warn('⚠️ Redis failed, falling back to file only');
         }
 
+        // 2. Extract + Transform: pages stream straight into clustering
+        console.log('📡 Fetching leaderboard rows...');
+        const finalRankings = await buildRankings(createSourceFromEnv());
+
+        // 3. Load
         const FILE_PATH = path.join(__dirname, '../data/rankings.json');
-        fs.writeFileSync(FILE_PATH, JSON.stringify(finalRankings, null, 2));
-        console.log(`✅ Hybrid rankings saved to: ${FILE_PATH}`);
+        const fileContent = JSON.stringify(finalRankings, null, 2);
+        const fileChanged = !fs.existsSync(FILE_PATH) || fs.readFileSync(FILE_PATH, 'utf8') !== fileContent;
+
+        if (isRedisAvailable && redisClient) {
+            const result = await writeLeaderboard(redisClient, finalRankings);
+            console.log(`✅ Redis leaderboard: ${result.written} written, ${result.removed} removed, ${result.unchanged} unchanged`);
+            if (fileChanged) {
+                await redisClient.set(REDIS_KEY, fileContent);
+            }
+        }
+
+        if (fileChanged) {
+            fs.writeFileSync(FILE_PATH, fileContent);
+            console.log(`✅ Hybrid rankings saved to: ${FILE_PATH}`);
+
+            // rankings.json changed - tell every server worker to rebuild its snapshots
+            if (isRedisAvailable && redisClient) {
+                await publishInvalidation(redisClient);
+            }
+        } else {
+            console.log('✅ Rankings unchanged, nothing to write');
+        }
 
         console.log('✨ Advanced ETL Sync complete!');
 
     } catch (error) {
         console.error('❌ Sync failed:', error);
-        process.exit(1);
+        process.exitCode = 1;
     } finally {
-        if (redisClient) await redisClient.quit();
+        if (redisClient && isRedisAvailable) await redisClient.quit();
     }
 }
 
-syncData();
+if (require.main === module) {
+    syncData();
+}
+
+module.exports = {
+    FamilyAggregator,
+    rankFamilies,
+    buildRankings,
+    writeLeaderboard,
+    toMetadata,
+    LEADERBOARD_KEY,
+    METADATA_KEY_PREFIX,
+    extractFamily,
+    isCommunityVariant,
+    getAgenticMultiplier
+};
@@ -2,6 +2,7 @@ const redis = require('redis');
 const { execSync } = require('child_process');
 const fs = require('fs');
 const path = require('path');
+const { publishInvalidation } = require('../utils/cache');
 
 const REDIS_URL = process.env.REDIS_URL || 'redis://localhost:6379';
 const HF_DATA_URL_BASE = 'https://datasets-server.huggingface.co/rows?dataset=open-llm-leaderboard/contents&config=default&split=train';
@@ -184,9 +185,16 @@ async function syncHF() {
             modelsForFallback.push(modelData);
         });
 
+        // Bump data version so /api/agents rebuilds its snapshots
+        pipeline.incr('leaderboard:version');
+        pipeline.set('leaderboard:updated_at', String(Date.now()));
+
         await pipeline.exec();
         console.log(`✅ Redis store updated with ${finalModels.length} normalized SOTA models`);
 
+        // Tell every server worker to drop its local cache and snapshots
+        await publishInvalidation(client, ['leaderboard:version', 'leaderboard:updated_at']);
+
         // FALLBACK: Sync to rankings.json
         const filePath = path.join(__dirname, '../data/rankings.json');
         const rankingsFallback = modelsForFallback
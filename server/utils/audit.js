@@ -0,0 +1,707 @@
+/**
+ * xiaoshazi Audit Log
+ * Buffered, segmented audit log with per-segment offset indexes and
+ * write-time event counters
+ *
+ * Layout (AUDIT_LOG_FILE = /tmp/xiaoshazi-audit.log):
+ *   xiaoshazi-audit.log               active segment (one JSON object per line)
+ *   xiaoshazi-audit.log.idx           UInt32LE byte offset of every line
+ *   xiaoshazi-audit.log.000001[.idx]  rotated segments (immutable)
+ *   xiaoshazi-audit.log.manifest.json segment list + per-event counters
+ *
+ * Only one process writes. In cluster mode workers forward batches to the
+ * primary over IPC; every process can read segments and the manifest.
+ */
+
+const cluster = require('cluster');
+const fs = require('fs');
+const path = require('path');
+
+const AUDIT_LOG_FILE = process.env.AUDIT_LOG_FILE || '/tmp/xiaoshazi-audit.log';
+const AUDIT_IPC_TYPE = 'xiaoshazi:audit';
+
+const INDEX_ENTRY_BYTES = 4;
+// 反向扫描时每次读取的行数
+const SCAN_BLOCK_LINES = 512;
+
+function emptyCounters() {
+  return { lines: 0, total: 0, events: {} };
+}
+
+function countInto(counters, event, lines = 1) {
+  counters.lines += lines;
+  if (event !== undefined) {
+    counters.total += lines;
+    counters.events[event] = (counters.events[event] || 0) + lines;
+  }
+}
+
+function parseLine(line) {
+  try {
+    return JSON.parse(line);
+  } catch {
+    return { raw: line };
+  }
+}
+
+class AuditLogStore {
+  /**
+   * @param {Object} options
+   * @param {string} [options.basePath] - Active segment path
+   * @param {number} [options.maxSegmentBytes=8MB] - Rotate once the active segment reaches this size
+   * @param {number} [options.maxSegments=20] - Rotated segments to keep
+   * @param {number} [options.flushIntervalMs=200] - Max time an entry stays buffered
+   * @param {number} [options.maxBufferEntries=500] - Flush early once this many entries are buffered
+   * @param {boolean} [options.readOnly=false] - Reader only (cluster workers)
+   */
+  constructor({
+    basePath = AUDIT_LOG_FILE,
+    maxSegmentBytes = 8 * 1024 * 1024,
+    maxSegments = 20,
+    flushIntervalMs = 200,
+    maxBufferEntries = 500,
+    readOnly = false,
+  } = {}) {
+    this.basePath = basePath;
+    this.maxSegmentBytes = Math.min(maxSegmentBytes, 0xffffffff);
+    this.maxSegments = maxSegments;
+    this.flushIntervalMs = flushIntervalMs;
+    this.maxBufferEntries = maxBufferEntries;
+    this.readOnly = readOnly;
+
+    this.buffer = [];
+    this.timer = null;
+    this.queue = Promise.resolve();
+    this.opening = null;
+    this.manifest = null;
+    this.activeSize = 0;
+  }
+
+  get indexPath() {
+    return `${this.basePath}.idx`;
+  }
+
+  get manifestPath() {
+    return `${this.basePath}.manifest.json`;
+  }
+
+  segmentPath(seq) {
+    return `${this.basePath}.${String(seq).padStart(6, '0')}`;
+  }
+
+  // ============================================
+  // Write side
+  // ============================================
+
+  /**
+   * Buffer an entry; it is written with the next batch
+   * @param {Object} entry - { timestamp, event, ... }
+   */
+  append(entry) {
+    this.appendLines([JSON.stringify(entry)]);
+  }
+
+  /**
+   * Buffer serialized lines (used for batches forwarded from cluster workers)
+   * @param {string[]} lines - JSON lines without trailing newline
+   */
+  appendLines(lines) {
+    this.buffer.push(...lines);
+    if (this.buffer.length >= this.maxBufferEntries) {
+      this.flush().catch(reportWriteError);
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => {
+        this.flush().catch(reportWriteError);
+      }, this.flushIntervalMs);
+      this.timer.unref();
+    }
+  }
+
+  /**
+   * Write all buffered entries
+   * @returns {Promise<void>}
+   */
+  flush() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    const lines = this.buffer;
+    this.buffer = [];
+    if (lines.length === 0) {
+      return this.queue;
+    }
+    // 失败只影响本批次的调用方，队列本身继续可用
+    const write = this.queue.then(() => this._write(lines));
+    this.queue = write.catch(() => {});
+    return write;
+  }
+
+  /**
+   * Best-effort synchronous flush on process exit (data + index only)
+   */
+  flushSync() {
+    if (this.buffer.length === 0) return;
+    const lines = this.buffer;
+    this.buffer = [];
+    try {
+      let position = this._statSize(this.basePath);
+      const index = Buffer.alloc(lines.length * INDEX_ENTRY_BYTES);
+      const data = lines.map((line, i) => {
+        index.writeUInt32LE(position, i * INDEX_ENTRY_BYTES);
+        position += Buffer.byteLength(line) + 1;
+        return line + '\n';
+      }).join('');
+      fs.appendFileSync(this.basePath, data);
+      fs.appendFileSync(this.indexPath, index);
+    } catch (error) {
+      reportWriteError(error);
+    }
+  }
+
+  async _write(lines) {
+    let written = false;
+    try {
+      await this._open();
+
+      if (this.activeSize >= this.maxSegmentBytes) {
+        await this._rotate();
+      }
+
+      const index = Buffer.alloc(lines.length * INDEX_ENTRY_BYTES);
+      let position = this.activeSize;
+      const data = lines.map((line, i) => {
+        index.writeUInt32LE(position, i * INDEX_ENTRY_BYTES);
+        position += Buffer.byteLength(line) + 1;
+        return line + '\n';
+      }).join('');
+
+      // 先写数据再写索引：索引永远不会指向不存在的数据
+      await fs.promises.appendFile(this.basePath, data);
+      written = true;
+      await fs.promises.appendFile(this.indexPath, index);
+      this.activeSize = position;
+
+      for (const line of lines) {
+        const event = eventOf(line);
+        countInto(this.manifest.active, event);
+        countInto(this.manifest.totals, event);
+      }
+      await this._saveManifest();
+    } catch (error) {
+      // 内存中的大小/计数可能已与磁盘不一致，下次写入前重新 _recover
+      this.opening = null;
+      // 已落盘的数据由 _recover 补齐索引和计数；未落盘的放回缓冲区重试
+      if (!written) this._requeue(lines);
+      throw error;
+    }
+  }
+
+  /**
+   * Put lines from a failed write back in front of the buffer, keeping at
+   * most maxBufferEntries of them so a persistent failure cannot grow it
+   * without bound
+   */
+  _requeue(lines) {
+    const kept = lines.slice(-this.maxBufferEntries);
+    if (kept.length < lines.length) {
+      console.error(`审计日志写入失败，丢弃 ${lines.length - kept.length} 条`);
+    }
+    this.buffer.unshift(...kept);
+  }
+
+  async _rotate() {
+    const seq = this.manifest.nextSeq++;
+    await fs.promises.rename(this.basePath, this.segmentPath(seq));
+    await fs.promises.rename(this.indexPath, `${this.segmentPath(seq)}.idx`);
+
+    this.manifest.segments.push({ seq, ...this.manifest.active });
+    this.manifest.active = emptyCounters();
+    this.activeSize = 0;
+
+    while (this.manifest.segments.length > this.maxSegments) {
+      const expired = this.manifest.segments.shift();
+      this.manifest.totals.lines -= expired.lines;
+      this.manifest.totals.total -= expired.total;
+      for (const [event, count] of Object.entries(expired.events)) {
+        this.manifest.totals.events[event] -= count;
+        if (this.manifest.totals.events[event] <= 0) delete this.manifest.totals.events[event];
+      }
+      await fs.promises.rm(this.segmentPath(expired.seq), { force: true });
+      await fs.promises.rm(`${this.segmentPath(expired.seq)}.idx`, { force: true });
+    }
+    await this._saveManifest();
+  }
+
+  async _saveManifest() {
+    const tmp = `${this.manifestPath}.${process.pid}.tmp`;
+    await fs.promises.writeFile(tmp, JSON.stringify(this.manifest));
+    await fs.promises.rename(tmp, this.manifestPath);
+  }
+
+  _open() {
+    if (!this.opening) {
+      this.opening = this._recover().catch((error) => {
+        // 不缓存失败结果，下次调用重新恢复
+        this.opening = null;
+        throw error;
+      });
+    }
+    return this.opening;
+  }
+
+  /**
+   * Load the manifest and bring the active index/counters in line with the
+   * data on disk (crash between data and index write, or a pre-existing
+   * unindexed log file)
+   */
+  async _recover() {
+    this.manifest = await this._loadManifest();
+    if (!this.manifest) {
+      this.manifest = await this._rebuildManifest();
+    }
+
+    this.activeSize = this._statSize(this.basePath);
+    let indexed = this._statSize(this.indexPath) / INDEX_ENTRY_BYTES | 0;
+
+    // 截断不完整的索引项
+    await fs.promises.truncate(this.indexPath, indexed * INDEX_ENTRY_BYTES).catch(() => {});
+
+    let scanFrom = 0;
+    if (indexed > 0) {
+      const last = await readIndex(this.indexPath, indexed - 1, indexed);
+      scanFrom = last[0];
+    }
+
+    const { offsets, lines } = await scanLines(this.basePath, scanFrom, this.activeSize);
+    // offsets[0] 是已索引的最后一行 (indexed > 0 时)
+    const missingOffsets = indexed > 0 ? offsets.slice(1) : offsets;
+    const missingLines = indexed > 0 ? lines.slice(1) : lines;
+
+    if (missingOffsets.length > 0) {
+      const index = Buffer.alloc(missingOffsets.length * INDEX_ENTRY_BYTES);
+      missingOffsets.forEach((offset, i) => index.writeUInt32LE(offset, i * INDEX_ENTRY_BYTES));
+      await fs.promises.appendFile(this.indexPath, index);
+      indexed += missingOffsets.length;
+    }
+
+    // 计数器只统计清单中尚未记录的行
+    const uncounted = indexed - this.manifest.active.lines;
+    if (uncounted > 0) {
+      const tail = await this._readLines(this.basePath, indexed - uncounted, indexed, missingLines);
+      for (const line of tail) {
+        const event = eventOf(line);
+        countInto(this.manifest.active, event);
+        countInto(this.manifest.totals, event);
+      }
+    }
+    await this._saveManifest();
+  }
+
+  async _loadManifest() {
+    try {
+      const manifest = JSON.parse(await fs.promises.readFile(this.manifestPath, 'utf8'));
+      return manifest && manifest.active && manifest.totals ? manifest : null;
+    } catch {
+      return null;
+    }
+  }
+
+  /**
+   * One-time full scan (first start, or manifest lost)
+   */
+  async _rebuildManifest() {
+    const manifest = {
+      nextSeq: 1,
+      segments: [],
+      active: emptyCounters(),
+      totals: emptyCounters(),
+    };
+
+    const dir = path.dirname(this.basePath);
+    const prefix = `${path.basename(this.basePath)}.`;
+    const names = await fs.promises.readdir(dir).catch(() => []);
+    const seqs = names
+      .filter((name) => name.startsWith(prefix) && /^\d{6}$/.test(name.slice(prefix.length)))
+      .map((name) => parseInt(name.slice(prefix.length), 10))
+      .sort((a, b) => a - b);
+
+    for (const seq of seqs) {
+      const counters = emptyCounters();
+      const file = this.segmentPath(seq);
+      const { offsets, lines } = await scanLines(file, 0, this._statSize(file));
+      lines.forEach((line) => countInto(counters, eventOf(line)));
+      if (this._statSize(`${file}.idx`) !== offsets.length * INDEX_ENTRY_BYTES) {
+        const index = Buffer.alloc(offsets.length * INDEX_ENTRY_BYTES);
+        offsets.forEach((offset, i) => index.writeUInt32LE(offset, i * INDEX_ENTRY_BYTES));
+        await fs.promises.writeFile(`${file}.idx`, index);
+      }
+      manifest.segments.push({ seq, ...counters });
+      countInto(manifest.totals, undefined, counters.lines);
+      manifest.totals.total += counters.total;
+      for (const [event, count] of Object.entries(counters.events)) {
+        manifest.totals.events[event] = (manifest.totals.events[event] || 0) + count;
+      }
+      manifest.nextSeq = seq + 1;
+    }
+
+    // 活动段的索引和计数在 _recover 中补齐
+    await fs.promises.rm(this.indexPath, { force: true });
+    return manifest;
+  }
+
+  _statSize(file) {
+    try {
+      return fs.statSync(file).size;
+    } catch {
+      return 0;
+    }
+  }
+
+  // ============================================
+  // Read side
+  // ============================================
+
+  async _readManifest() {
+    if (this.readOnly) {
+      return (await this._loadManifest()) || {
+        nextSeq: 1, segments: [], active: emptyCounters(), totals: emptyCounters(),
+      };
+    }
+    // 写进程：先落盘缓冲区，保证读到刚写入的事件
+    await this.flush();
+    await this._open();
+    return this.manifest;
+  }
+
+  /**
+   * Per-event counters, O(1) in log size
+   * @returns {Promise<Object>} { total, events }
+   */
+  async getStats() {
+    const { totals } = await this._readManifest();
+    return { total: totals.total, events: { ...totals.events } };
+  }
+
+  /**
+   * Newest-first page of entries, seeking backwards through the segments
+   * @param {Object} options
+   * @param {number} [options.limit=50] - Page size
+   * @param {number} [options.offset=0] - Entries to skip (newest first)
+   * @param {string} [options.event] - Only entries with this event name
+   * @returns {Promise<Object>} { data, total }
+   */
+  async readPage({ limit = 50, offset = 0, event } = {}) {
+    const manifest = await this._readManifest();
+    const segments = [
+      { file: this.basePath, counters: null },
+      ...manifest.segments.slice().reverse().map((s) => ({ file: this.segmentPath(s.seq), counters: s })),
+    ];
+
+    const total = event ? (manifest.totals.events[event] || 0) : manifest.totals.lines;
+    const data = [];
+    let skip = offset;
+
+    for (const { file, counters } of segments) {
+      if (data.length >= limit) break;
+
+      // 已轮转的段不可变，可直接用计数器整体跳过
+      if (counters) {
+        const matches = event ? (counters.events[event] || 0) : counters.lines;
+        if (matches <= skip) {
+          skip -= matches;
+          continue;
+        }
+      }
+
+      const count = this._statSize(`${file}.idx`) / INDEX_ENTRY_BYTES | 0;
+      if (!event) {
+        if (count <= skip) {
+          skip -= count;
+          continue;
+        }
+        const end = count - skip;
+        const start = Math.max(0, end - (limit - data.length));
+        const lines = await this._readLines(file, start, end);
+        for (let i = lines.length - 1; i >= 0; i--) data.push(parseLine(lines[i]));
+        skip = 0;
+        continue;
+      }
+
+      const needle = `"event":${JSON.stringify(event)}`;
+      for (let end = count; end > 0 && data.length < limit; end -= SCAN_BLOCK_LINES) {
+        const start = Math.max(0, end - SCAN_BLOCK_LINES);
+        const lines = await this._readLines(file, start, end);
+        for (let i = lines.length - 1; i >= 0 && data.length < limit; i--) {
+          if (!lines[i].includes(needle)) continue;
+          const entry = parseLine(lines[i]);
+          if (entry.event !== event) continue;
+          if (skip > 0) {
+            skip--;
+          } else {
+            data.push(entry);
+          }
+        }
+      }
+    }
+
+    return { data, total };
+  }
+
+  /**
+   * Read lines [start, end) of a segment using its index
+   */
+  async _readLines(file, start, end, known) {
+    if (known && known.length === end - start) return known;
+    if (end <= start) return [];
+
+    const offsets = await readIndex(`${file}.idx`, start, end + 1);
+    const from = offsets[0];
+    const to = offsets.length > end - start ? offsets[end - start] : this._statSize(file);
+
+    const handle = await fs.promises.open(file, 'r').catch(() => null);
+    if (!handle) return [];
+    try {
+      const buffer = Buffer.alloc(Math.max(0, to - from));
+      const { bytesRead } = await handle.read(buffer, 0, buffer.length, from);
+      return buffer.subarray(0, bytesRead).toString('utf8').split('\n').slice(0, end - start);
+    } finally {
+      await handle.close();
+    }
+  }
+}
+
+/**
+ * Read index entries [start, end) (fewer if the index is shorter)
+ */
+async function readIndex(indexPath, start, end) {
+  const handle = await fs.promises.open(indexPath, 'r').catch(() => null);
+  if (!handle) return [];
+  try {
+    const buffer = Buffer.alloc((end - start) * INDEX_ENTRY_BYTES);
+    const { bytesRead } = await handle.read(buffer, 0, buffer.length, start * INDEX_ENTRY_BYTES);
+    const offsets = [];
+    for (let i = 0; i + INDEX_ENTRY_BYTES <= bytesRead; i += INDEX_ENTRY_BYTES) {
+      offsets.push(buffer.readUInt32LE(i));
+    }
+    return offsets;
+  } finally {
+    await handle.close();
+  }
+}
+
+/**
+ * Find complete lines in [from, to) of a file
+ * @returns {Promise<Object>} { offsets, lines }
+ */
+async function scanLines(file, from, to) {
+  const offsets = [];
+  const lines = [];
+  if (to <= from) return { offsets, lines };
+
+  const stream = fs.createReadStream(file, { start: from, end: to - 1 });
+  let position = from;
+  let pending = [];
+  let pendingStart = from;
+
+  for await (const chunk of stream) {
+    let cursor = 0;
+    for (let i = chunk.indexOf(10); i !== -1; i = chunk.indexOf(10, cursor)) {
+      pending.push(chunk.subarray(cursor, i));
+      const line = Buffer.concat(pending).toString('utf8');
+      if (line.trim()) {
+        offsets.push(pendingStart);
+        lines.push(line);
+      }
+      pending = [];
+      pendingStart = position + i + 1;
+      cursor = i + 1;
+    }
+    pending.push(chunk.subarray(cursor));
+    position += chunk.length;
+  }
+  return { offsets, lines };
+}
+
+function eventOf(line) {
+  try {
+    return JSON.parse(line).event;
+  } catch {
+    return undefined;
+  }
+}
+
+function reportWriteError(error) {
+  console.error('审计日志写入失败:', error);
+}
+
+// ============================================
+// Process-wide writer
+// ============================================
+
+const auditStore = new AuditLogStore({
+  maxSegmentBytes: parseInt(process.env.AUDIT_SEGMENT_BYTES || String(8 * 1024 * 1024), 10),
+  maxSegments: parseInt(process.env.AUDIT_MAX_SEGMENTS || '20', 10),
+  readOnly: cluster.isWorker,
+});
+
+// Cluster worker: 批量通过 IPC 转发给 primary 写入
+let forwardBuffer = [];
+let forwardTimer = null;
+
+function flushForwardBuffer() {
+  forwardTimer = null;
+  if (forwardBuffer.length === 0) return;
+  const lines = forwardBuffer;
+  forwardBuffer = [];
+  if (process.connected) {
+    process.send({ type: AUDIT_IPC_TYPE, lines });
+  }
+}
+
+// AUDIT_QUIET=1: 只写审计日志，不再逐条输出到 console (格式化输出的开销随事件数增长)
+const AUDIT_QUIET = process.env.AUDIT_QUIET === '1';
+
+/**
+ * Record an audit event
+ * @param {string} event - Event name
+ * @param {Object} data - Event details
+ * @param {Object} [options]
+ * @param {boolean} [options.quiet] - Skip the `[AUDIT]` console line (default: AUDIT_QUIET)
+ */
+function auditLog(event, data, { quiet = AUDIT_QUIET } = {}) {
+  const timestamp = new Date().toISOString();
+  const entry = { timestamp, event, ...data };
+  if (!quiet) console.log(`[AUDIT] ${event}:`, data);
+
+  if (cluster.isWorker) {
+    forwardBuffer.push(JSON.stringify(entry));
+    if (forwardBuffer.length >= auditStore.maxBufferEntries) {
+      flushForwardBuffer();
+    } else if (!forwardTimer) {
+      forwardTimer = setTimeout(flushForwardBuffer, auditStore.flushIntervalMs);
+      forwardTimer.unref();
+    }
+    return;
+  }
+
+  auditStore.append(entry);
+}
+
+// ============================================
+// Aggregated events
+// ============================================
+
+const aggregators = new Set();
+
+/**
+ * Collapses high-volume events (e.g. rate-limit rejections) into one audit
+ * entry per event + key per window: "IP x hit the limit 4213 times"
+ */
+class AuditAggregator {
+  /**
+   * @param {Object} [options]
+   * @param {number} [options.windowMs=60000] - Summary interval
+   * @param {number} [options.maxKeys=10000] - Distinct keys per window; further keys are only counted
+   * @param {Function} [options.emit=auditLog] - (event, data) sink
+   */
+  constructor({ windowMs = 60 * 1000, maxKeys = 10000, emit = auditLog } = {}) {
+    this.windowMs = windowMs;
+    this.maxKeys = maxKeys;
+    this.emit = emit;
+    this.entries = new Map();
+    this.overflow = new Map();
+    this.timer = null;
+    aggregators.add(this);
+  }
+
+  /**
+   * Count one occurrence
+   * @param {string} event - Event name
+   * @param {string} key - Aggregation key (e.g. client IP)
+   * @param {Object} data - Details of the first occurrence in the window
+   */
+  record(event, key, data) {
+    const now = Date.now();
+    const id = `${event}\u0000${key}`;
+    let entry = this.entries.get(id);
+
+    if (!entry) {
+      if (this.entries.size >= this.maxKeys) {
+        this.overflow.set(event, (this.overflow.get(event) || 0) + 1);
+        this._schedule();
+        return;
+      }
+      entry = { event, data, count: 0, firstSeen: now, lastSeen: now };
+      this.entries.set(id, entry);
+    }
+    entry.count++;
+    entry.lastSeen = now;
+    this._schedule();
+  }
+
+  _schedule() {
+    if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.windowMs);
+      this.timer.unref();
+    }
+  }
+
+  /**
+   * Emit one summary per key and start a new window
+   */
+  flush() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    const entries = this.entries;
+    const overflow = this.overflow;
+    this.entries = new Map();
+    this.overflow = new Map();
+
+    for (const entry of entries.values()) {
+      this.emit(entry.event, {
+        ...entry.data,
+        count: entry.count,
+        firstSeen: new Date(entry.firstSeen).toISOString(),
+        lastSeen: new Date(entry.lastSeen).toISOString()
+      });
+    }
+    for (const [event, count] of overflow) {
+      this.emit(event, { overflow: true, count });
+    }
+  }
+}
+
+/**
+ * Handle a batch forwarded by a cluster worker (called in the primary)
+ * @param {Object} message - IPC message
+ * @returns {boolean} True if the message was an audit batch
+ */
+function handleAuditMessage(message) {
+  if (!message || message.type !== AUDIT_IPC_TYPE || !Array.isArray(message.lines)) {
+    return false;
+  }
+  auditStore.appendLines(message.lines);
+  return true;
+}
+
+process.on('exit', () => {
+  aggregators.forEach(aggregator => aggregator.flush());
+  if (cluster.isWorker) {
+    flushForwardBuffer();
+  } else {
+    auditStore.flushSync();
+  }
+});
+
+module.exports = {
+  AuditLogStore,
+  auditStore,
+  auditLog,
+  AuditAggregator,
+  handleAuditMessage,
+  AUDIT_LOG_FILE,
+  AUDIT_IPC_TYPE,
+};
@@ -0,0 +1,467 @@
+/**
+ * xiaoshazi Auth Store
+ * Pluggable storage for refresh tokens, token families, users and login
+ * attempts
+ *
+ * Both backends keep secondary indexes (tokens by user, tokens by family), so
+ * listing / revoking costs O(tokens of that user or family) instead of a scan
+ * of every token. Expiry comes from TTLs:
+ *   - MemoryAuthStore: entries are kept in insertion (= expiry) order and
+ *     expired entries are dropped from the head on every write
+ *   - RedisAuthStore:  PEXPIRE on every key; index ZSETs are scored by expiry
+ *     and trimmed with ZREMRANGEBYSCORE when read
+ *
+ * Revoking a token deletes its record - verifyRefreshToken treats a missing
+ * record the same as a revoked one (reuse detection). deleteToken reads and
+ * deletes in one atomic step, so when several requests present the same
+ * refresh token only one of them gets its record back.
+ */
+
+const KEY_PREFIX = 'auth:';
+
+// ============================================
+// In-memory backend (single process)
+// ============================================
+
+class MemoryAuthStore {
+  constructor() {
+    // Map 保持插入顺序 = 过期顺序 (TTL 固定)，过期项总在头部
+    this.tokens = new Map();
+    this.families = new Map();
+    this.userTokens = new Map();
+    this.familyTokens = new Map();
+    this.users = new Map();
+    this.loginAttempts = new Map();
+  }
+
+  // ----- internal -----
+
+  _expire(map, now, onExpire) {
+    for (const [key, entry] of map) {
+      if (entry.expiresAt > now) break;
+      map.delete(key);
+      if (onExpire) onExpire(key, entry);
+    }
+  }
+
+  _live(map, key) {
+    const entry = map.get(key);
+    if (!entry) return null;
+    if (entry.expiresAt <= Date.now()) {
+      map.delete(key);
+      return null;
+    }
+    return entry;
+  }
+
+  _unindex(tokenId, record) {
+    for (const [index, id] of [[this.userTokens, record.userId], [this.familyTokens, record.familyId]]) {
+      const set = index.get(id);
+      if (set) {
+        set.delete(tokenId);
+        if (set.size === 0) index.delete(id);
+      }
+    }
+  }
+
+  _sweep() {
+    const now = Date.now();
+    this._expire(this.tokens, now, (tokenId, entry) => this._unindex(tokenId, entry.record));
+    this._expire(this.families, now);
+    this._expire(this.loginAttempts, now);
+  }
+
+  // ----- refresh tokens -----
+
+  async saveToken(record, ttlMs) {
+    this._sweep();
+    this.tokens.set(record.tokenId, { record, expiresAt: record.createdAt + ttlMs });
+    for (const [index, id] of [[this.userTokens, record.userId], [this.familyTokens, record.familyId]]) {
+      if (!index.has(id)) index.set(id, new Set());
+      index.get(id).add(record.tokenId);
+    }
+  }
+
+  async getToken(tokenId) {
+    const entry = this.tokens.get(tokenId);
+    if (!entry) return null;
+    if (entry.expiresAt <= Date.now()) {
+      this.tokens.delete(tokenId);
+      this._unindex(tokenId, entry.record);
+      return null;
+    }
+    return entry.record;
+  }
+
+  async deleteToken(tokenId) {
+    const entry = this.tokens.get(tokenId);
+    if (!entry) return null;
+    this.tokens.delete(tokenId);
+    this._unindex(tokenId, entry.record);
+    return entry.expiresAt > Date.now() ? entry.record : null;
+  }
+
+  async _deleteIndexed(index, id) {
+    const tokenIds = [...(index.get(id) || [])];
+    let count = 0;
+    for (const tokenId of tokenIds) {
+      if (await this.deleteToken(tokenId)) count++;
+    }
+    return count;
+  }
+
+  async deleteFamilyTokens(familyId) {
+    return this._deleteIndexed(this.familyTokens, familyId);
+  }
+
+  async deleteUserTokens(userId) {
+    return this._deleteIndexed(this.userTokens, userId);
+  }
+
+  async listUserTokens(userId) {
+    const records = [];
+    for (const tokenId of this.userTokens.get(userId) || []) {
+      const record = await this.getToken(tokenId);
+      if (record) records.push(record);
+    }
+    return records;
+  }
+
+  // ----- token families -----
+
+  async saveFamily(familyId, family, ttlMs) {
+    this._sweep();
+    // 重新插入到尾部，保持过期顺序
+    this.families.delete(familyId);
+    this.families.set(familyId, { family: { ...family }, expiresAt: Date.now() + ttlMs });
+  }
+
+  async getFamily(familyId) {
+    const entry = this._live(this.families, familyId);
+    return entry ? { ...entry.family } : null;
+  }
+
+  /**
+   * Point a family at its newest token without clearing a compromise flag
+   * set by a concurrent reuse detection
+   * @param {string} familyId - Family ID
+   * @param {Object} family - { userId, currentTokenId }
+   * @param {number} ttlMs - Family TTL
+   * @returns {Promise<boolean>} False if the family is compromised
+   */
+  async rotateFamily(familyId, family, ttlMs) {
+    const entry = this._live(this.families, familyId);
+    const isCompromised = Boolean(entry && entry.family.isCompromised);
+    await this.saveFamily(familyId, { ...family, isCompromised }, ttlMs);
+    return !isCompromised;
+  }
+
+  async markFamilyCompromised(familyId) {
+    const entry = this._live(this.families, familyId);
+    if (entry) entry.family.isCompromised = true;
+  }
+
+  // ----- users -----
+
+  async getUser(email) {
+    return this.users.get(email) || null;
+  }
+
+  /**
+   * Create a user unless the email is taken
+   * @param {Object} fields - User fields without id
+   * @returns {Promise<Object|null>} Created user, or null if it exists
+   */
+  async createUser(fields) {
+    if (this.users.has(fields.email)) return null;
+    const user = { id: fields.id || String(this.users.size + 1), ...fields };
+    this.users.set(user.email, user);
+    return user;
+  }
+
+  // ----- login attempts -----
+
+  async getLoginAttempts(key) {
+    const entry = this._live(this.loginAttempts, key);
+    return entry ? { count: entry.count, windowStart: entry.windowStart } : null;
+  }
+
+  async incrementLoginAttempts(key, windowMs) {
+    this._sweep();
+    let entry = this._live(this.loginAttempts, key);
+    if (!entry) {
+      const now = Date.now();
+      entry = { count: 0, windowStart: now, expiresAt: now + windowMs };
+      this.loginAttempts.set(key, entry);
+    }
+    entry.count++;
+    return { count: entry.count, windowStart: entry.windowStart };
+  }
+
+  async clearLoginAttempts(key) {
+    this.loginAttempts.delete(key);
+  }
+}
+
+// ============================================
+// Redis backend (shared by all workers)
+// ============================================
+
+// 仅在 key 存在时写入字段，避免给已过期的 key 重新创建一个没有 TTL 的空壳
+const HSET_IF_EXISTS = `
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  return redis.call('HSET', KEYS[1], unpack(ARGV))
+end
+return 0
+`;
+
+// 计数与 TTL 一步完成：不会留下没有过期时间的计数 (否则账号会被永久锁定)
+// PTTL < 0 也覆盖了旧版本遗留的无 TTL key
+const INCREMENT_LOGIN_ATTEMPTS = `
+local count = redis.call('HINCRBY', KEYS[1], 'count', 1)
+redis.call('HSETNX', KEYS[1], 'windowStart', ARGV[1])
+if redis.call('PTTL', KEYS[1]) < 0 then
+  redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return {count, redis.call('HGET', KEYS[1], 'windowStart')}
+`;
+
+class RedisAuthStore {
+  /**
+   * @param {Object} client - node-redis client
+   * @param {Object} [options]
+   * @param {string} [options.prefix='auth:'] - Key prefix
+   */
+  constructor(client, { prefix = KEY_PREFIX } = {}) {
+    this.client = client;
+    this.prefix = prefix;
+  }
+
+  _tokenKey(tokenId) { return `${this.prefix}token:${tokenId}`; }
+  _userTokensKey(userId) { return `${this.prefix}user-tokens:${userId}`; }
+  _familyKey(familyId) { return `${this.prefix}family:${familyId}`; }
+  _familyTokensKey(familyId) { return `${this.prefix}family-tokens:${familyId}`; }
+  _userKey(email) { return `${this.prefix}user:${email}`; }
+  _userSeqKey() { return `${this.prefix}user-seq`; }
+  _loginKey(key) { return `${this.prefix}login-attempts:${key}`; }
+
+  _parseToken(tokenId, hash) {
+    if (!hash || !hash.userId) return null;
+    return {
+      tokenId,
+      userId: hash.userId,
+      email: hash.email,
+      familyId: hash.familyId,
+      deviceInfo: hash.deviceInfo,
+      createdAt: Number(hash.createdAt),
+      revoked: false
+    };
+  }
+
+  // ----- refresh tokens -----
+
+  async saveToken(record, ttlMs) {
+    const expiresAt = record.createdAt + ttlMs;
+    const member = { score: expiresAt, value: record.tokenId };
+    await this.client.multi()
+      .hSet(this._tokenKey(record.tokenId), {
+        userId: String(record.userId),
+        email: record.email,
+        familyId: record.familyId,
+        deviceInfo: String(record.deviceInfo),
+        createdAt: String(record.createdAt)
+      })
+      .pExpireAt(this._tokenKey(record.tokenId), expiresAt)
+      // 索引的过期时间跟随最新的令牌
+      .zAdd(this._userTokensKey(record.userId), member)
+      .pExpireAt(this._userTokensKey(record.userId), expiresAt)
+      .zAdd(this._familyTokensKey(record.familyId), member)
+      .pExpireAt(this._familyTokensKey(record.familyId), expiresAt)
+      .exec();
+  }
+
+  async getToken(tokenId) {
+    return this._parseToken(tokenId, await this.client.hGetAll(this._tokenKey(tokenId)));
+  }
+
+  async deleteToken(tokenId) {
+    // MULTI 中的 HGETALL + DEL 原子执行：并发请求中只有一个能拿到记录
+    const [hash] = await this.client.multi()
+      .hGetAll(this._tokenKey(tokenId))
+      .del(this._tokenKey(tokenId))
+      .exec();
+    const record = this._parseToken(tokenId, hash);
+    if (!record) return null;
+    await this.client.multi()
+      .zRem(this._userTokensKey(record.userId), tokenId)
+      .zRem(this._familyTokensKey(record.familyId), tokenId)
+      .exec();
+    return record;
+  }
+
+  /**
+   * Live token records referenced by an index ZSET (expired members trimmed)
+   */
+  async _indexedTokens(indexKey) {
+    const [, tokenIds] = await this.client.multi()
+      .zRemRangeByScore(indexKey, '-inf', Date.now())
+      .zRange(indexKey, 0, -1)
+      .exec();
+    if (!tokenIds || tokenIds.length === 0) return [];
+
+    const pipeline = this.client.multi();
+    tokenIds.forEach(tokenId => pipeline.hGetAll(this._tokenKey(tokenId)));
+    const hashes = await pipeline.exec();
+    return tokenIds
+      .map((tokenId, i) => this._parseToken(tokenId, hashes[i]))
+      .filter(Boolean);
+  }
+
+  async _deleteRecords(records) {
+    if (records.length === 0) return 0;
+    const pipeline = this.client.multi();
+    records.forEach(record => {
+      pipeline.del(this._tokenKey(record.tokenId));
+      pipeline.zRem(this._userTokensKey(record.userId), record.tokenId);
+      pipeline.zRem(this._familyTokensKey(record.familyId), record.tokenId);
+    });
+    await pipeline.exec();
+    return records.length;
+  }
+
+  async deleteFamilyTokens(familyId) {
+    return this._deleteRecords(await this._indexedTokens(this._familyTokensKey(familyId)));
+  }
+
+  async deleteUserTokens(userId) {
+    return this._deleteRecords(await this._indexedTokens(this._userTokensKey(userId)));
+  }
+
+  async listUserTokens(userId) {
+    return this._indexedTokens(this._userTokensKey(userId));
+  }
+
+  // ----- token families -----
+
+  async saveFamily(familyId, family, ttlMs) {
+    await this.client.multi()
+      .hSet(this._familyKey(familyId), {
+        userId: String(family.userId),
+        currentTokenId: family.currentTokenId,
+        isCompromised: family.isCompromised ? '1' : '0'
+      })
+      .pExpire(this._familyKey(familyId), ttlMs)
+      .exec();
+  }
+
+  async getFamily(familyId) {
+    const hash = await this.client.hGetAll(this._familyKey(familyId));
+    if (!hash || !hash.userId) return null;
+    return {
+      userId: hash.userId,
+      currentTokenId: hash.currentTokenId,
+      isCompromised: hash.isCompromised === '1'
+    };
+  }
+
+  async rotateFamily(familyId, family, ttlMs) {
+    const familyKey = this._familyKey(familyId);
+    // HSETNX 只在新建家族时写入 isCompromised，已设置的泄露标记不会被清除
+    const [, , , isCompromised] = await this.client.multi()
+      .hSet(familyKey, {
+        userId: String(family.userId),
+        currentTokenId: family.currentTokenId
+      })
+      .hSetNX(familyKey, 'isCompromised', '0')
+      .pExpire(familyKey, ttlMs)
+      .hGet(familyKey, 'isCompromised')
+      .exec();
+    return isCompromised !== '1';
+  }
+
+  async markFamilyCompromised(familyId) {
+    await this.client.eval(HSET_IF_EXISTS, {
+      keys: [this._familyKey(familyId)],
+      arguments: ['isCompromised', '1']
+    });
+  }
+
+  // ----- users -----
+
+  async getUser(email) {
+    const json = await this.client.get(this._userKey(email));
+    return json ? JSON.parse(json) : null;
+  }
+
+  async createUser(fields) {
+    if (await this.client.exists(this._userKey(fields.email))) return null;
+    const id = fields.id || String(await this.client.incr(this._userSeqKey()));
+    const user = { id, ...fields };
+    const created = await this.client.set(this._userKey(user.email), JSON.stringify(user), { NX: true });
+    if (!created) return null;
+    if (fields.id) {
+      // 预置用户占用的 ID 不能再被分配
+      await this.client.set(this._userSeqKey(), fields.id, { NX: true });
+    }
+    return user;
+  }
+
+  // ----- login attempts -----
+
+  async getLoginAttempts(key) {
+    const hash = await this.client.hGetAll(this._loginKey(key));
+    if (!hash || !hash.count) return null;
+    return { count: Number(hash.count), windowStart: Number(hash.windowStart) };
+  }
+
+  async incrementLoginAttempts(key, windowMs) {
+    const [count, windowStart] = await this.client.eval(INCREMENT_LOGIN_ATTEMPTS, {
+      keys: [this._loginKey(key)],
+      arguments: [String(Date.now()), String(windowMs)]
+    });
+    return { count: Number(count), windowStart: Number(windowStart) };
+  }
+
+  async clearLoginAttempts(key) {
+    await this.client.del(this._loginKey(key));
+  }
+}
+
+// ============================================
+// Active store
+// ============================================
+
+let activeStore = new MemoryAuthStore();
+
+/**
+ * Get the active store
+ * @returns {MemoryAuthStore|RedisAuthStore} Store
+ */
+function getAuthStore() {
+  return activeStore;
+}
+
+/**
+ * Replace the active store (tests, benchmarks)
+ * @param {MemoryAuthStore|RedisAuthStore} store - Store
+ */
+function setAuthStore(store) {
+  activeStore = store;
+}
+
+/**
+ * Switch to the Redis backend when Redis is available (called from server.js)
+ * @param {Object} client - node-redis client
+ * @param {boolean} available - Redis availability flag
+ */
+function setRedisClient(client, available) {
+  activeStore = client && available ? new RedisAuthStore(client) : new MemoryAuthStore();
+}
+
+module.exports = {
+  MemoryAuthStore,
+  RedisAuthStore,
+  getAuthStore,
+  setAuthStore,
+  setRedisClient,
+};
@@ -0,0 +1,228 @@
+/**
+ * xiaoshazi In-Process Cache
+ * Bounded LRU read-through cache in front of Redis, invalidated via Redis pub/sub
+ */
+
+const { timeAsync, redisCommandDuration } = require('../metrics');
+
+// 所有 worker 订阅同一个频道；warmUpCache / sync 脚本写入新数据后发布
+const CACHE_INVALIDATION_CHANNEL = 'xiaoshazi:cache:invalidate';
+
+/**
+ * Bounded LRU cache with optional per-entry TTL
+ * Map keeps insertion order, so the first key is always the least recently used.
+ */
+class LRUCache {
+  /**
+   * @param {Object} options
+   * @param {number} [options.max=500] - Maximum number of entries
+   * @param {number} [options.ttlMs=0] - Default TTL in ms (0 = no expiry)
+   */
+  constructor({ max = 500, ttlMs = 0 } = {}) {
+    this.max = max;
+    this.ttlMs = ttlMs;
+    this.entries = new Map();
+  }
+
+  get size() {
+    return this.entries.size;
+  }
+
+  has(key) {
+    return this._lookup(key) !== undefined;
+  }
+
+  get(key) {
+    const entry = this._lookup(key);
+    if (!entry) return undefined;
+
+    // 重新插入，移到最近使用的位置
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  set(key, value, ttlMs = this.ttlMs) {
+    this.entries.delete(key);
+    this.entries.set(key, {
+      value,
+      expiresAt: ttlMs > 0 ? Date.now() + ttlMs : 0,
+    });
+
+    while (this.entries.size > this.max) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+    return this;
+  }
+
+  delete(key) {
+    return this.entries.delete(key);
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+
+  _lookup(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+    if (entry.expiresAt && entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+    return entry;
+  }
+}
+
+/**
+ * Read-through cache for Redis string keys
+ *
+ * Reads hit the local LRU first; misses go to Redis once (concurrent misses for
+ * the same key share one GET). Missing keys are cached too, so a fallback path
+ * does not turn into a Redis round trip per request.
+ */
+class ReadThroughCache {
+  /**
+   * @param {Object} options
+   * @param {number} [options.max=1000] - Maximum number of cached keys
+   * @param {number} [options.ttlMs=30000] - Safety TTL in case an invalidation is missed
+   * @param {string} [options.channel] - Pub/sub invalidation channel
+   */
+  constructor({ max = 1000, ttlMs = 30000, channel = CACHE_INVALIDATION_CHANNEL } = {}) {
+    this.lru = new LRUCache({ max, ttlMs });
+    this.channel = channel;
+    this.redisClient = null;
+    this.isRedisAvailable = false;
+    this.inflight = new Map();
+    this.listeners = new Set();
+    this.hits = 0;
+    this.misses = 0;
+  }
+
+  /**
+   * Set Redis client (called from main server.js)
+   * @param {Object} client - Redis client
+   * @param {boolean} available - Redis availability flag
+   */
+  setRedisClient(client, available) {
+    this.redisClient = client;
+    this.isRedisAvailable = available;
+    this.lru.clear();
+  }
+
+  /**
+   * Get a string value by key
+   * @param {string} key - Redis key
+   * @returns {Promise<string|null>} Value or null
+   */
+  async get(key) {
+    if (this.lru.has(key)) {
+      this.hits++;
+      return this.lru.get(key);
+    }
+
+    this.misses++;
+    if (!this.isRedisAvailable || !this.redisClient) return null;
+
+    if (!this.inflight.has(key)) {
+      const pending = timeAsync(redisCommandDuration, { command: 'get' }, () => this.redisClient.get(key))
+        .then((value) => {
+          // 加载期间收到失效消息时不回填旧值
+          if (this.inflight.get(key) === pending) this.lru.set(key, value);
+          return value;
+        })
+        .finally(() => {
+          if (this.inflight.get(key) === pending) this.inflight.delete(key);
+        });
+      this.inflight.set(key, pending);
+    }
+    return this.inflight.get(key);
+  }
+
+  /**
+   * Register a listener called after every invalidation (local or remote)
+   * @param {Function} listener - (keys: string[]|null) => void
+   * @returns {Function} Unsubscribe function
+   */
+  onInvalidate(listener) {
+    this.listeners.add(listener);
+    return () => this.listeners.delete(listener);
+  }
+
+  /**
+   * Drop keys from this process only
+   * @param {string[]|null} [keys=null] - Keys to drop (null = everything)
+   */
+  invalidateLocal(keys = null) {
+    if (Array.isArray(keys)) {
+      keys.forEach((key) => {
+        this.lru.delete(key);
+        this.inflight.delete(key);
+      });
+    } else {
+      this.lru.clear();
+      this.inflight.clear();
+    }
+    this.listeners.forEach((listener) => listener(keys));
+  }
+
+  /**
+   * Drop keys in this process and broadcast to all other workers
+   * @param {string[]|null} [keys=null] - Keys to drop (null = everything)
+   */
+  async invalidate(keys = null) {
+    this.invalidateLocal(keys);
+    if (this.isRedisAvailable && this.redisClient) {
+      await publishInvalidation(this.redisClient, keys, this.channel);
+    }
+  }
+
+  /**
+   * Subscribe to the invalidation channel
+   * @param {Object} subscriber - Connected Redis client dedicated to pub/sub
+   */
+  async subscribe(subscriber) {
+    await subscriber.subscribe(this.channel, (message) => {
+      let keys = null;
+      try {
+        keys = JSON.parse(message).keys || null;
+      } catch {
+        // 无法解析的消息按全量失效处理
+      }
+      this.invalidateLocal(keys);
+    });
+  }
+
+  stats() {
+    return {
+      size: this.lru.size,
+      hits: this.hits,
+      misses: this.misses,
+    };
+  }
+}
+
+/**
+ * Publish a cache invalidation (usable from scripts without a ReadThroughCache)
+ * @param {Object} client - Connected Redis client
+ * @param {string[]|null} [keys=null] - Keys to drop (null = everything)
+ * @param {string} [channel] - Pub/sub channel
+ * @returns {Promise<number>} Number of subscribers that received the message
+ */
+function publishInvalidation(client, keys = null, channel = CACHE_INVALIDATION_CHANNEL) {
+  return client.publish(channel, JSON.stringify({ keys, timestamp: Date.now() }));
+}
+
+// 进程内共享实例
+const readThroughCache = new ReadThroughCache({
+  max: parseInt(process.env.LOCAL_CACHE_MAX || '1000', 10),
+  ttlMs: parseInt(process.env.LOCAL_CACHE_TTL_MS || '30000', 10),
+});
+
+module.exports = {
+  LRUCache,
+  ReadThroughCache,
+  readThroughCache,
+  publishInvalidation,
+  CACHE_INVALIDATION_CHANNEL,
+};
@@ -0,0 +1,83 @@
+/**
+ * xiaoshazi Entropy History
+ * Cached reader for memory/entropy_history.json (a JSON array written by the
+ * Python calculator)
+ *
+ * The parsed tail is kept together with the file's identity (inode, size and
+ * mtime). An unchanged file costs a single stat(); any change - an append, an
+ * in-place rewrite or an atomic rename over the file - triggers a full parse.
+ * Sampling parts of the file to detect appends can miss edits in the middle,
+ * so the cache never guesses.
+ */
+
+const fs = require('fs');
+
+class EntropyHistory {
+  /**
+   * @param {Object} options
+   * @param {string} options.filePath - Path to entropy_history.json
+   * @param {number} [options.limit=100] - Number of trailing entries to keep
+   */
+  constructor({ filePath, limit = 100 }) {
+    this.filePath = filePath;
+    this.limit = limit;
+    this.reset();
+  }
+
+  reset() {
+    this.entries = [];
+    // 已解析内容对应的文件标识: (ino, size, mtimeMs)
+    this.ino = -1;
+    this.size = -1;
+    this.mtimeMs = 0;
+    this.pending = null;
+  }
+
+  /**
+   * Get the trailing entries (oldest first, like history.slice(-limit))
+   * @returns {Promise<Array>} Entries
+   */
+  async read() {
+    if (!this.pending) {
+      this.pending = this._sync().finally(() => {
+        this.pending = null;
+      });
+    }
+    await this.pending;
+    return this.entries;
+  }
+
+  async _sync() {
+    let stat;
+    try {
+      stat = await fs.promises.stat(this.filePath);
+    } catch (error) {
+      if (error.code === 'ENOENT') {
+        this.reset();
+        return;
+      }
+      throw error;
+    }
+
+    if (stat.ino === this.ino && stat.size === this.size && stat.mtimeMs === this.mtimeMs) return;
+
+    const text = await fs.promises.readFile(this.filePath, 'utf8');
+    let history;
+    try {
+      history = JSON.parse(text);
+    } catch {
+      // 文件正在被写入 (JSON 不完整) 时保留旧数据，下次请求重试
+      return;
+    }
+    if (!Array.isArray(history)) history = [];
+
+    this.entries = history.length > this.limit ? history.slice(-this.limit) : history;
+    this.ino = stat.ino;
+    this.size = stat.size;
+    this.mtimeMs = stat.mtimeMs;
+  }
+}
+
+module.exports = {
+  EntropyHistory,
+};
@@ -0,0 +1,220 @@
+/**
+ * xiaoshazi Entropy Worker
+ * Long-lived entropy calculator process (line-delimited JSON over stdio)
+ * plus a TTL / stale-while-revalidate result cache
+ *
+ * Protocol (one JSON object per line):
+ *   request:  {"id": 1, "method": "calculate"}
+ *   response: {"id": 1, "result": {...}}  or  {"id": 1, "error": "message"}
+ */
+
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+const logger = require('./logger');
+const { timeAsync, childProcessDuration } = require('../metrics');
+
+const DEFAULT_WORKER_SCRIPT = path.join(__dirname, '../scripts/entropy_worker.py');
+
+class EntropyWorker {
+  /**
+   * @param {Object} options
+   * @param {string} [options.command='python3'] - Executable
+   * @param {string[]} [options.args] - Arguments (defaults to the Python worker shim)
+   * @param {string} [options.cwd] - Working directory
+   * @param {number} [options.timeoutMs=30000] - Per-request timeout
+   */
+  constructor({ command = 'python3', args = [DEFAULT_WORKER_SCRIPT], cwd, timeoutMs = 30000 } = {}) {
+    this.command = command;
+    this.args = args;
+    this.cwd = cwd;
+    this.timeoutMs = timeoutMs;
+
+    this.child = null;
+    this.nextId = 1;
+    this.pending = new Map();
+  }
+
+  /**
+   * Spawn the child process if it is not running
+   */
+  start() {
+    if (this.child) return;
+
+    const child = spawn(this.command, this.args, {
+      cwd: this.cwd,
+      stdio: ['pipe', 'pipe', 'pipe'],
+    });
+    this.child = child;
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => this._onLine(line));
+    child.stderr.on('data', (chunk) => {
+      logger.warn('⚠️ Entropy worker stderr:', { message: chunk.toString().trim() });
+    });
+
+    const onGone = (reason) => {
+      if (this.child !== child) return;
+      this.child = null;
+      this._rejectAll(new Error(reason));
+    };
+    child.on('error', (err) => onGone(`Entropy worker failed: ${err.message}`));
+    child.on('exit', (code, signal) => onGone(`Entropy worker exited (${signal || code})`));
+    child.stdin.on('error', () => {});
+  }
+
+  /**
+   * Send a request; the worker is (re)started on demand
+   * @param {string} [method='calculate'] - Method name
+   * @param {Object} [params={}] - Method parameters
+   * @returns {Promise<Object>} Result
+   */
+  request(method = 'calculate', params = {}) {
+    return timeAsync(childProcessDuration, { method }, () => this._send(method, params));
+  }
+
+  _send(method, params) {
+    this.start();
+
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Entropy worker timed out after ${this.timeoutMs}ms`));
+        // 卡住的进程直接重启
+        this.stop();
+      }, this.timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.child.stdin.write(JSON.stringify({ id, method, params }) + '\n');
+    });
+  }
+
+  /**
+   * Stop the child process; pending requests are rejected
+   */
+  stop() {
+    const child = this.child;
+    if (!child) return;
+    this.child = null;
+    this._rejectAll(new Error('Entropy worker stopped'));
+    child.stdin.end();
+    child.kill();
+  }
+
+  _onLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch {
+      logger.warn('⚠️ Entropy worker emitted non-JSON output:', { line: line.slice(0, 200) });
+      return;
+    }
+
+    const entry = this.pending.get(message.id);
+    if (!entry) return;
+    this.pending.delete(message.id);
+    clearTimeout(entry.timer);
+
+    if (message.error) {
+      entry.reject(new Error(message.error));
+    } else {
+      entry.resolve(message.result);
+    }
+  }
+
+  _rejectAll(error) {
+    for (const { reject, timer } of this.pending.values()) {
+      clearTimeout(timer);
+      reject(error);
+    }
+    this.pending.clear();
+  }
+}
+
+/**
+ * Entropy result cache with TTL and stale-while-revalidate
+ *
+ * - age < ttlMs: cached result
+ * - age < ttlMs + staleMs: cached result, refresh in the background
+ * - otherwise: wait for a fresh calculation
+ * Concurrent callers always share one in-flight calculation.
+ */
+class EntropyService {
+  /**
+   * @param {Object} options
+   * @param {EntropyWorker} options.worker - Worker to run calculations
+   * @param {number} [options.ttlMs=30000] - Fresh window
+   * @param {number} [options.staleMs=300000] - Stale-while-revalidate window
+   */
+  constructor({ worker, ttlMs = 30000, staleMs = 300000 }) {
+    this.worker = worker;
+    this.ttlMs = ttlMs;
+    this.staleMs = staleMs;
+
+    this.cached = null;
+    this.cachedAt = 0;
+    this.inflight = null;
+  }
+
+  /**
+   * Get the entropy result
+   *
+   * When a calculation fails but an earlier result exists (even one past the
+   * stale window), that result is returned with revalidationFailed set
+   * instead of the error.
+   * @returns {Promise<Object>} { data, cachedAt, stale, revalidationFailed }
+   */
+  async get() {
+    const age = Date.now() - this.cachedAt;
+
+    if (this.cached && age < this.ttlMs) {
+      return { data: this.cached, cachedAt: this.cachedAt, stale: false };
+    }
+
+    if (this.cached && age < this.ttlMs + this.staleMs) {
+      this.refresh().catch((err) => {
+        logger.warn('⚠️ Background entropy refresh failed:', { error: err.message });
+      });
+      return { data: this.cached, cachedAt: this.cachedAt, stale: true };
+    }
+
+    try {
+      const data = await this.refresh();
+      return { data, cachedAt: this.cachedAt, stale: false };
+    } catch (err) {
+      if (!this.cached) throw err;
+      logger.warn('⚠️ Entropy calculation failed, serving the last result:', { error: err.message });
+      return { data: this.cached, cachedAt: this.cachedAt, stale: true, revalidationFailed: true };
+    }
+  }
+
+  /**
+   * Run a calculation (single-flight)
+   * @returns {Promise<Object>} Result
+   */
+  refresh() {
+    if (!this.inflight) {
+      this.inflight = this.worker.request('calculate')
+        .then((result) => {
+          this.cached = result;
+          this.cachedAt = Date.now();
+          return result;
+        })
+        .finally(() => {
+          this.inflight = null;
+        });
+    }
+    return this.inflight;
+  }
+
+  invalidate() {
+    this.cached = null;
+    this.cachedAt = 0;
+  }
+}
+
+module.exports = {
+  EntropyWorker,
+  EntropyService,
+  DEFAULT_WORKER_SCRIPT,
+};
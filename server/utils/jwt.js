@@ -8,26 +8,14 @@ const REFRESH_SECRET = process.env.REFRESH_SECRET || 'xiaoshazi-refresh-secret-c
 const ACCESS_TOKEN_EXPIRY = '15m';
 const REFRESH_TOKEN_EXPIRY = '7d';
 
-// 内存存储 (生产环境应使用 Redis)
-// 结构: { refreshTokenId: { userId, email, familyId, deviceInfo, createdAt, revoked } }
-const refreshTokenStore = new Map();
+// 令牌 / 令牌家族存储 (内存或 Redis，见 utils/authStore.js)
+// 令牌记录: { tokenId, userId, email, familyId, deviceInfo, createdAt }
+// 家族记录: { userId, currentTokenId, isCompromised } - 用于检测 token 重用攻击
+const { getAuthStore } = require('./authStore');
+const REFRESH_TOKEN_TTL_MS = 7 * 24 * 60 * 60 * 1000; // 与 REFRESH_TOKEN_EXPIRY 一致
 
-// Token 家族追踪 - 用于检测 token 重用攻击
-// 结构: { familyId: { userId, currentTokenId, isCompromised } }
-const tokenFamilies = new Map();
-
-// 审计日志函数
-const AUDIT_LOG_FILE = process.env.AUDIT_LOG_FILE || '/tmp/xiaoshazi-audit.log';
-const fs = require('fs');
-
-function auditLog(event, data) {
-  const timestamp = new Date().toISOString();
-  const logEntry = JSON.stringify({ timestamp, event, ...data });
-  console.log(`[AUDIT] ${event}:`, data);
-  fs.appendFile(AUDIT_LOG_FILE, logEntry + '\n', (err) => {
-    if (err) console.error('审计日志写入失败:', err);
-  });
-}
+// 审计日志 (批量写入、分段索引，见 utils/audit.js)
+const { auditLog } = require('./audit');
 
 /**
  * 生成 Access Token
@@ -66,10 +54,12 @@ function generateRefreshToken(payload, familyId, tokenId) {
  * @param {string} options.deviceInfo - 设备信息
  * @param {boolean} options.isRefresh - 是否是刷新操作
  * @param {string} options.familyId - 现有家族 ID (刷新时使用)
- * @returns {Object} { accessToken, refreshToken, tokenId, familyId }
+ * @returns {Promise<Object|null>} { accessToken, refreshToken, tokenId, familyId }；
+ *   刷新时如果家族已被标记为泄露则返回 null (不轮换)
  */
-function generateTokens(user, options = {}) {
+async function generateTokens(user, options = {}) {
   const { deviceInfo = 'unknown', isRefresh = false, familyId: existingFamilyId } = options;
+  const store = getAuthStore();
   
   const payload = {
     id: user.id,
@@ -81,9 +71,9 @@ function generateTokens(user, options = {}) {
   const familyId = existingFamilyId || uuidv4();
   const tokenId = uuidv4();
   
-  // 如果是刷新操作，标记旧令牌为已撤销
+  // 如果是刷新操作，撤销该家族中的旧令牌 (旧令牌再次使用即视为重用)
   if (isRefresh && existingFamilyId) {
-    revokeRefreshTokenByFamily(existingFamilyId);
+    await revokeRefreshTokenByFamily(existingFamilyId, { userId: user.id });
   }
   
   // 记录令牌发放
@@ -93,19 +83,29 @@ function generateTokens(user, options = {}) {
     familyId,
     tokenId,
     deviceInfo,
-    createdAt: Date.now(),
-    revoked: false
+    createdAt: Date.now()
   };
   
-  // 存储令牌记录
-  refreshTokenStore.set(tokenId, tokenRecord);
+  // 存储令牌记录并更新家族追踪
+  // 轮换时不能覆盖泄露标记：并发重用检测可能刚刚把家族标记为已泄露
+  const family = { userId: user.id, currentTokenId: tokenId };
+  const [, rotated] = await Promise.all([
+    store.saveToken(tokenRecord, REFRESH_TOKEN_TTL_MS),
+    isRefresh && existingFamilyId
+      ? store.rotateFamily(familyId, family, REFRESH_TOKEN_TTL_MS)
+      : store.saveFamily(familyId, { ...family, isCompromised: false }, REFRESH_TOKEN_TTL_MS).then(() => true)
+  ]);
   
-  // 更新家族追踪
-  tokenFamilies.set(familyId, {
-    userId: user.id,
-    currentTokenId: tokenId,
-    isCompromised: false
-  });
+  if (!rotated) {
+    await store.deleteToken(tokenId);
+    auditLog('SECURITY_ALERT', {
+      event: 'COMPROMISED_TOKEN_FAMILY',
+      familyId,
+      userId: user.id,
+      message: 'Refused to rotate a compromised token family'
+    });
+    return null;
+  }
   
   // 审计日志
   auditLog('TOKEN_ISSUED', {
@@ -126,36 +126,42 @@ function generateTokens(user, options = {}) {
 }
 
 /**
- * 撤销指定家族的刷新令牌 (用于轮换)
+ * 撤销指定家族的所有刷新令牌 (用于轮换和重用检测)
  * @param {string} familyId - 令牌家族 ID
+ * @param {Object} [options]
+ * @param {string} [options.userId] - 家族所属用户 (省略时从家族记录读取)
+ * @param {string} [options.reason='TOKEN_ROTATION'] - 审计原因
+ * @returns {Promise<number>} 撤销的令牌数量
  */
-function revokeRefreshTokenByFamily(familyId) {
-  const family = tokenFamilies.get(familyId);
-  if (family) {
-    // 标记旧令牌为已撤销
-    for (const [tokenId, record] of refreshTokenStore.entries()) {
-      if (record.familyId === familyId && tokenId !== family.currentTokenId) {
-        record.revoked = true;
-      }
+async function revokeRefreshTokenByFamily(familyId, { userId, reason = 'TOKEN_ROTATION' } = {}) {
+  const store = getAuthStore();
+  const count = await store.deleteFamilyTokens(familyId);
+  
+  if (count > 0) {
+    if (userId === undefined) {
+      const family = await store.getFamily(familyId);
+      userId = family ? family.userId : null;
     }
     
     auditLog('TOKEN_REVOKED', {
       familyId,
-      reason: 'TOKEN_ROTATION',
-      userId: family.userId
+      reason,
+      userId,
+      count
     });
   }
+  
+  return count;
 }
 
 /**
  * 撤销单个刷新令牌
  * @param {string} tokenId - 令牌 ID
+ * @returns {Promise<boolean>} 是否撤销了有效令牌
  */
-function revokeRefreshToken(tokenId) {
-  const record = refreshTokenStore.get(tokenId);
+async function revokeRefreshToken(tokenId) {
+  const record = await getAuthStore().deleteToken(tokenId);
   if (record) {
-    record.revoked = true;
-    
     auditLog('TOKEN_REVOKED', {
       tokenId,
       familyId: record.familyId,
@@ -171,42 +177,45 @@ function revokeRefreshToken(tokenId) {
 /**
  * 验证 Refresh Token (带轮换检查)
  * @param {string} token - JWT token
+ * @param {Object} [options]
+ * @param {boolean} [options.consume=false] - 原子地取出并删除令牌记录 (刷新时使用)；
+ *   并发使用同一令牌的请求中只有一个能通过，其余进入重用检测分支
  * @returns {Promise<Object|null>} 解码后的 payload 或 null
  */
-async function verifyRefreshToken(token) {
+async function verifyRefreshToken(token, { consume = false } = {}) {
   try {
     const payload = jwt.verify(token, REFRESH_SECRET);
     const { tokenId, familyId } = payload;
+    const store = getAuthStore();
     
-    // 检查令牌是否存在且未被撤销
-    const record = refreshTokenStore.get(tokenId);
+    // 令牌记录和家族记录一次取回
+    const [record, family] = await Promise.all([
+      consume ? store.deleteToken(tokenId) : store.getToken(tokenId),
+      familyId ? store.getFamily(familyId) : null
+    ]);
     
-    // 如果令牌不存在或已被撤销
-    if (!record || record.revoked) {
+    // 如果令牌不存在 (已轮换、已撤销或已过期)
+    if (!record) {
       // 检测可能的 token 重用攻击!
-      if (familyId) {
-        const family = tokenFamilies.get(familyId);
-        if (family && !family.isCompromised) {
-          // 标记家族为已泄露
-          family.isCompromised = true;
-          
-          auditLog('SECURITY_ALERT', {
-            event: 'POSSIBLE_TOKEN_REUSE_ATTACK',
-            familyId,
-            userId: family.userId,
-            message: 'Refresh token reuse detected - possible token theft!'
-          });
-          
-          // 撤销整个令牌家族
-          revokeRefreshTokenByFamily(familyId);
-        }
+      if (family && !family.isCompromised) {
+        // 标记家族为已泄露
+        await store.markFamilyCompromised(familyId);
+        
+        auditLog('SECURITY_ALERT', {
+          event: 'POSSIBLE_TOKEN_REUSE_ATTACK',
+          familyId,
+          userId: family.userId,
+          message: 'Refresh token reuse detected - possible token theft!'
+        });
+        
+        // 撤销整个令牌家族
+        await revokeRefreshTokenByFamily(familyId, { userId: family.userId, reason: 'TOKEN_REUSE' });
       }
       
       return null;
     }
     
     // 检查令牌家族是否已被泄露
-    const family = tokenFamilies.get(familyId);
     if (family && family.isCompromised) {
       auditLog('SECURITY_ALERT', {
         event: 'COMPROMISED_TOKEN_FAMILY',
@@ -298,38 +307,27 @@ function decodeToken(token) {
 }
 
 /**
- * 获取用户的有效刷新令牌列表
+ * 获取用户的有效刷新令牌列表 (按用户索引，不扫描全部令牌)
  * @param {string} userId - 用户 ID
- * @returns {Array} 有效令牌列表
+ * @returns {Promise<Array>} 有效令牌列表
  */
-function getUserValidTokens(userId) {
-  const validTokens = [];
-  for (const [tokenId, record] of refreshTokenStore.entries()) {
-    if (record.userId === userId && !record.revoked) {
-      validTokens.push({
-        tokenId,
-        familyId: record.familyId,
-        deviceInfo: record.deviceInfo,
-        createdAt: record.createdAt
-      });
-    }
-  }
-  return validTokens;
+async function getUserValidTokens(userId) {
+  const records = await getAuthStore().listUserTokens(userId);
+  return records.map(record => ({
+    tokenId: record.tokenId,
+    familyId: record.familyId,
+    deviceInfo: record.deviceInfo,
+    createdAt: record.createdAt
+  }));
 }
 
 /**
  * 撤销用户所有令牌 (用于安全事件)
  * @param {string} userId - 用户 ID
- * @returns {number} 撤销的令牌数量
+ * @returns {Promise<number>} 撤销的令牌数量
  */
-function revokeAllUserTokens(userId) {
-  let count = 0;
-  for (const [tokenId, record] of refreshTokenStore.entries()) {
-    if (record.userId === userId && !record.revoked) {
-      record.revoked = true;
-      count++;
-    }
-  }
+async function revokeAllUserTokens(userId) {
+  const count = await getAuthStore().deleteUserTokens(userId);
   
   if (count > 0) {
     auditLog('ALL_TOKENS_REVOKED', {
@@ -342,38 +340,6 @@ function revokeAllUserTokens(userId) {
   return count;
 }
 
-/**
- * 清理过期令牌 (定时任务)
- */
-function cleanupExpiredTokens() {
-  const now = Date.now();
-  const expiryMs = 7 * 24 * 60 * 60 * 1000; // 7 days
-  let cleaned = 0;
-  
-  for (const [tokenId, record] of refreshTokenStore.entries()) {
-    if (now - record.createdAt > expiryMs) {
-      refreshTokenStore.delete(tokenId);
-      cleaned++;
-    }
-  }
-  
-  // 清理空的家族
-  for (const [familyId, family] of tokenFamilies.entries()) {
-    const hasValidToken = Array.from(refreshTokenStore.values())
-      .some(r => r.familyId === familyId && !r.revoked);
-    if (!hasValidToken) {
-      tokenFamilies.delete(familyId);
-    }
-  }
-  
-  if (cleaned > 0) {
-    console.log(`[JWT] Cleaned up ${cleaned} expired refresh tokens`);
-  }
-}
-
-// 每小时清理一次过期令牌
-setInterval(cleanupExpiredTokens, 60 * 60 * 1000);
-
 module.exports = {
   generateAccessToken,
   generateRefreshToken,
@@ -393,5 +359,6 @@ module.exports = {
   JWT_SECRET,
   REFRESH_SECRET,
   ACCESS_TOKEN_EXPIRY,
-  REFRESH_TOKEN_EXPIRY
+  REFRESH_TOKEN_EXPIRY,
+  REFRESH_TOKEN_TTL_MS
 };
@@ -0,0 +1,157 @@
+/**
+ * xiaoshazi Leaderboard Sources
+ * Pluggable row sources for server/scripts/sync_data.js
+ *
+ * A source exposes `pages()`, an async iterator of row arrays in HF
+ * datasets-server format ([{ row: {...} }, ...]), yielded in page order:
+ *   - createHttpSource: HF datasets-server API (or a local fixture server),
+ *     bounded concurrency with retry/backoff
+ *   - createDirectorySource: *.json page files ({ rows: [...] }) for tests and
+ *     offline runs
+ */
+
+const fs = require('fs');
+const path = require('path');
+
+const HF_DATA_URL_BASE = 'https://datasets-server.huggingface.co/rows?dataset=open-llm-leaderboard/contents&config=default&split=train';
+
+function sleep(ms) {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+/**
+ * GET a JSON document, retrying network errors, 429 and 5xx with
+ * exponential backoff + jitter
+ * @param {string} url - URL
+ * @param {Object} options
+ * @returns {Promise<Object>} Parsed body
+ */
+async function fetchJson(url, { retries = 3, backoffMs = 500, timeoutMs = 60000, fetchImpl = globalThis.fetch } = {}) {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const response = await fetchImpl(url, { signal: AbortSignal.timeout(timeoutMs) });
+      if (response.ok) {
+        return await response.json();
+      }
+      const error = new Error(`HTTP ${response.status} for ${url}`);
+      error.retryable = response.status === 429 || response.status >= 500;
+      throw error;
+    } catch (error) {
+      if (error.retryable === false || attempt >= retries) {
+        throw error;
+      }
+      const delay = backoffMs * 2 ** attempt * (0.5 + Math.random() / 2);
+      console.warn(`⚠️ ${error.message}, retrying in ${Math.round(delay)}ms (${attempt + 1}/${retries})`);
+      await sleep(delay);
+    }
+  }
+}
+
+/**
+ * HF datasets-server source
+ * @param {Object} [options]
+ * @param {string} [options.baseUrl] - Rows endpoint (offset/limit are appended)
+ * @param {number} [options.pageSize=100] - Rows per request (HF maximum is 100)
+ * @param {number} [options.concurrency=6] - Max requests in flight
+ * @param {number} [options.maxRows=Infinity] - Stop after this many rows
+ * @param {number} [options.retries=3] - Retries per page
+ * @param {number} [options.backoffMs=500] - Initial backoff
+ * @param {number} [options.timeoutMs=60000] - Per-request timeout
+ * @param {Function} [options.fetchImpl] - fetch implementation
+ * @returns {Object} Source
+ */
+function createHttpSource({
+  baseUrl = HF_DATA_URL_BASE,
+  pageSize = 100,
+  concurrency = 6,
+  maxRows = Infinity,
+  ...fetchOptions
+} = {}) {
+  const fetchPage = (offset) => {
+    const limit = Math.min(pageSize, maxRows - offset);
+    const separator = baseUrl.includes('?') ? '&' : '?';
+    return fetchJson(`${baseUrl}${separator}offset=${offset}&limit=${limit}`, fetchOptions);
+  };
+
+  return {
+    async *pages() {
+      // 第一页确定总行数，之后按滑动窗口并发拉取
+      const first = await fetchPage(0);
+      const firstRows = first.rows || [];
+      yield firstRows;
+      if (firstRows.length < pageSize) return;
+
+      const total = Math.min(
+        Number.isFinite(first.num_rows_total) ? first.num_rows_total : Infinity,
+        maxRows
+      );
+      const inFlight = [];
+      let nextOffset = firstRows.length;
+      let ended = false;
+
+      const schedule = () => {
+        while (!ended && inFlight.length < concurrency && nextOffset < total) {
+          const request = fetchPage(nextOffset);
+          // 失败在按序 await 时抛出，这里只避免 unhandled rejection
+          request.catch(() => {});
+          inFlight.push(request);
+          nextOffset += pageSize;
+        }
+      };
+
+      schedule();
+      while (inFlight.length > 0) {
+        const rows = (await inFlight.shift()).rows || [];
+        // 总数未知时以短页作为结尾
+        if (rows.length < pageSize) ended = true;
+        yield rows;
+        schedule();
+      }
+    },
+  };
+}
+
+/**
+ * Directory source - every *.json file is one page, read in name order
+ * @param {string} dir - Directory path
+ * @returns {Object} Source
+ */
+function createDirectorySource(dir) {
+  return {
+    async *pages() {
+      const files = (await fs.promises.readdir(dir))
+        .filter(name => name.endsWith('.json'))
+        .sort();
+      for (const file of files) {
+        const page = JSON.parse(await fs.promises.readFile(path.join(dir, file), 'utf8'));
+        yield page.rows || [];
+      }
+    },
+  };
+}
+
+/**
+ * Pick the source from the environment
+ *   SYNC_SOURCE_DIR - read pages from a directory
+ *   SYNC_SOURCE_URL - rows endpoint (defaults to HF)
+ *   SYNC_CONCURRENCY / SYNC_MAX_ROWS - HTTP source tuning
+ * @returns {Object} Source
+ */
+function createSourceFromEnv(env = process.env) {
+  if (env.SYNC_SOURCE_DIR) {
+    return createDirectorySource(env.SYNC_SOURCE_DIR);
+  }
+  return createHttpSource({
+    baseUrl: env.SYNC_SOURCE_URL || HF_DATA_URL_BASE,
+    concurrency: parseInt(env.SYNC_CONCURRENCY || '6', 10),
+    maxRows: env.SYNC_MAX_ROWS ? parseInt(env.SYNC_MAX_ROWS, 10) : Infinity,
+  });
+}
+
+module.exports = {
+  fetchJson,
+  createHttpSource,
+  createDirectorySource,
+  createSourceFromEnv,
+  HF_DATA_URL_BASE,
+};
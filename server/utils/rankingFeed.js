@@ -0,0 +1,196 @@
+/**
+ * xiaoshazi Ranking Change Feed
+ * Versioned leaderboard diffs for Socket.IO clients
+ *
+ * Writers (sync_data.js, sync_hf.js, score updates) bump leaderboard:version
+ * and publish a cache invalidation after each batch. The leader worker then
+ * refreshes the feed: the ranking is loaded once for the new version and
+ * diffed against the previous one (shared/rankingDiff.mjs), and listeners
+ * push the diff to the `rankings:{scenario}` rooms - the Socket.IO Redis
+ * adapter delivers it to clients on every worker.
+ *
+ * The last diffs are kept in a capped Redis list (in memory without Redis),
+ * so any worker can replay the versions a (re)connecting client missed.
+ * Bursts of invalidations during a sync collapse into one refresh.
+ */
+
+const { diffRankings, diffScenarios } = require('../../shared/rankingDiff.mjs');
+const logger = require('./logger');
+
+const HISTORY_KEY = 'leaderboard:changes';
+
+class RankingFeed {
+  /**
+   * @param {Object} options
+   * @param {Function} options.loadData - async () => { agents, source, cacheable }
+   * @param {Function} options.getVersion - async () => string
+   * @param {number} [options.historySize=50] - Diffs kept for catch-up
+   * @param {number} [options.debounceMs=250] - Invalidations within this window share one refresh
+   * @param {number} [options.maxChangeRatio=0.5] - Above this share of changed agents, send a reset instead of a diff
+   */
+  constructor({ loadData, getVersion, historySize = 50, debounceMs = 250, maxChangeRatio = 0.5 }) {
+    this.loadData = loadData;
+    this.getVersion = getVersion;
+    this.historySize = historySize;
+    this.debounceMs = debounceMs;
+    this.maxChangeRatio = maxChangeRatio;
+
+    this.redisClient = null;
+    this.isRedisAvailable = false;
+    this.version = null;
+    this.agents = null;
+    this.history = [];
+    this.listeners = new Set();
+    this.timer = null;
+    this.running = null;
+    this.rerun = false;
+  }
+
+  /**
+   * Set Redis client (history shared by all workers)
+   * @param {Object} client - Redis client
+   * @param {boolean} available - Redis availability flag
+   */
+  setRedisClient(client, available) {
+    this.redisClient = client;
+    this.isRedisAvailable = available;
+  }
+
+  /**
+   * Register a listener called with every new diff
+   * @param {Function} listener - (diff) => void
+   * @returns {Function} Unsubscribe function
+   */
+  onDiff(listener) {
+    this.listeners.add(listener);
+    return () => this.listeners.delete(listener);
+  }
+
+  /**
+   * Refresh after debounceMs; further calls in the meantime are absorbed
+   */
+  scheduleRefresh() {
+    if (this.timer) return;
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.refresh().catch((error) => {
+        logger.warn('⚠️ Ranking feed refresh failed:', { error: error.message });
+      });
+    }, this.debounceMs);
+    this.timer.unref();
+  }
+
+  /**
+   * Load the current version and emit a diff if it changed. Calls during a
+   * refresh are coalesced into one more run once it finishes.
+   * @returns {Promise<void>}
+   */
+  refresh() {
+    if (this.running) {
+      this.rerun = true;
+      return this.running;
+    }
+    this.running = (async () => {
+      try {
+        do {
+          this.rerun = false;
+          await this._refresh();
+        } while (this.rerun);
+      } finally {
+        this.running = null;
+      }
+    })();
+    return this.running;
+  }
+
+  async _refresh() {
+    const version = String(await this.getVersion());
+    if (version === this.version) return;
+
+    const { agents, cacheable = true } = await this.loadData();
+    // 降级数据 (Redis 故障时的 MOCK) 不进入版本链
+    if (!cacheable) return;
+
+    const previous = this.agents;
+    const previousVersion = this.version;
+    this.agents = agents;
+    this.version = version;
+    // 第一次加载只建立基线
+    if (!previous) return;
+
+    let diff = diffRankings(previous, agents, { version, previousVersion });
+    const changes = diff.removed.length + diff.inserted.length + diff.changed.length;
+    if (changes > Math.max(previous.length, agents.length) * this.maxChangeRatio) {
+      // 接近全量替换时让客户端重新拉取，比逐条 diff 更省
+      diff = { version, previousVersion, reset: true, removed: [], inserted: [], changed: [] };
+    }
+
+    // 两个版本中出现过的全部场景: 这些房间都需要推进版本号
+    const scenarios = new Set(diffScenarios(diff));
+    [previous, agents].forEach(list => list.forEach((agent) => {
+      if (Array.isArray(agent.scenarios)) agent.scenarios.forEach(s => scenarios.add(s));
+    }));
+    diff.scenarios = [...scenarios];
+    diff.timestamp = Date.now();
+
+    await this._record(diff);
+    this.listeners.forEach((listener) => listener(diff));
+  }
+
+  async _record(diff) {
+    this.history.push(diff);
+    if (this.history.length > this.historySize) this.history.shift();
+
+    if (this.isRedisAvailable && this.redisClient) {
+      try {
+        await this.redisClient.multi()
+          .lPush(HISTORY_KEY, JSON.stringify(diff))
+          .lTrim(HISTORY_KEY, 0, this.historySize - 1)
+          .exec();
+      } catch (error) {
+        logger.warn('⚠️ Failed to store ranking diff:', { error: error.message });
+      }
+    }
+  }
+
+  async _loadHistory() {
+    if (this.isRedisAvailable && this.redisClient) {
+      try {
+        const entries = await this.redisClient.lRange(HISTORY_KEY, 0, -1);
+        return entries.map(entry => JSON.parse(entry)).reverse();
+      } catch (error) {
+        logger.warn('⚠️ Failed to read ranking diffs:', { error: error.message });
+      }
+    }
+    return this.history;
+  }
+
+  /**
+   * Diffs that take a client from `version` to the latest recorded version
+   * @param {string} version - Version the client holds
+   * @returns {Promise<Object[]|null>} Diffs oldest first, or null when the
+   *   version is unknown or too old (the client has to reload)
+   */
+  async since(version) {
+    if (!version) return null;
+    if (version === this.version) return [];
+
+    const history = await this._loadHistory();
+    const start = history.findIndex(diff => diff.previousVersion === version);
+    if (start === -1) {
+      return history.length > 0 && history[history.length - 1].version === version ? [] : null;
+    }
+
+    const diffs = history.slice(start);
+    // leader 重启后重新建立基线，版本链可能断开
+    for (let i = 1; i < diffs.length; i++) {
+      if (diffs[i].previousVersion !== diffs[i - 1].version) return null;
+    }
+    return diffs;
+  }
+}
+
+module.exports = {
+  RankingFeed,
+  HISTORY_KEY,
+};
@@ -0,0 +1,238 @@
+/**
+ * xiaoshazi Rate Limit Store
+ * Sliding-window counter store for express-rate-limit, shared by all workers
+ * through Redis
+ *
+ * Each key has one counter per fixed window. The sliding count is
+ *   current + floor(previous * (1 - elapsed / windowMs))
+ * which smooths the burst a fixed window allows at its boundary while
+ * keeping O(1) state per key (a sorted-set log would grow with every hit
+ * during an abusive burst).
+ *
+ * Redis: one atomic Lua script per request (EVALSHA, falls back to EVAL).
+ * When Redis is not available or a call fails, the store counts in process
+ * memory instead, so the limiter keeps working per worker.
+ */
+
+const crypto = require('crypto');
+const { rateLimitDecisionsTotal, rateLimitDuration } = require('../metrics');
+
+const KEY_PREFIX = 'ratelimit:';
+
+// KEYS[1] 当前窗口计数, KEYS[2] 上一窗口计数
+// ARGV[1] windowMs, ARGV[2] 当前窗口已过去的毫秒数
+const SLIDING_WINDOW_SCRIPT = `
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+  redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[1]) * 2)
+end
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local weight = (tonumber(ARGV[1]) - tonumber(ARGV[2])) / tonumber(ARGV[1])
+return current + math.floor(previous * weight)
+`;
+const SLIDING_WINDOW_SHA = crypto.createHash('sha1').update(SLIDING_WINDOW_SCRIPT).digest('hex');
+
+// 仅递减已存在的计数，避免创建没有 TTL 的 key
+const DECREMENT_SCRIPT = `
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  return redis.call('DECR', KEYS[1])
+end
+return 0
+`;
+
+// Redis 客户端由 server.js 注入，所有 store 共用
+let redisClient = null;
+let redisAvailable = false;
+
+/**
+ * Set the Redis client used by every rate limit store
+ * @param {Object} client - node-redis client
+ * @param {boolean} available - Redis availability flag
+ */
+function setRedisClient(client, available) {
+  redisClient = client;
+  redisAvailable = !!available;
+}
+
+function getRedis() {
+  // isReady 在断线重连期间为 false，此时直接走本地计数
+  if (!redisClient || !redisAvailable || redisClient.isReady === false) return null;
+  return redisClient;
+}
+
+/**
+ * In-process sliding-window counters. Keys live in two Maps (current and
+ * previous window); rolling the window drops everything older, so no sweep
+ * timer is needed.
+ */
+class LocalWindowCounter {
+  /**
+   * @param {number} windowMs - Window length
+   */
+  constructor(windowMs) {
+    this.windowMs = windowMs;
+    this.windowIndex = -1;
+    this.current = new Map();
+    this.previous = new Map();
+  }
+
+  _roll(now) {
+    const index = Math.floor(now / this.windowMs);
+    if (index !== this.windowIndex) {
+      this.previous = index === this.windowIndex + 1 ? this.current : new Map();
+      this.current = new Map();
+      this.windowIndex = index;
+    }
+  }
+
+  /**
+   * Count one hit
+   * @param {string} key - Client key
+   * @param {number} [now] - Timestamp
+   * @returns {number} Sliding hit count including this one
+   */
+  increment(key, now = Date.now()) {
+    this._roll(now);
+    const current = (this.current.get(key) || 0) + 1;
+    this.current.set(key, current);
+    const weight = 1 - (now % this.windowMs) / this.windowMs;
+    return current + Math.floor((this.previous.get(key) || 0) * weight);
+  }
+
+  decrement(key, now = Date.now()) {
+    this._roll(now);
+    const current = this.current.get(key);
+    if (current > 1) this.current.set(key, current - 1);
+    else this.current.delete(key);
+  }
+
+  reset(key) {
+    this.current.delete(key);
+    this.previous.delete(key);
+  }
+
+  resetAll() {
+    this.current.clear();
+    this.previous.clear();
+  }
+}
+
+/**
+ * express-rate-limit Store (promise API)
+ */
+class SlidingWindowStore {
+  /**
+   * @param {Object} options
+   * @param {string} options.name - Limiter name (Redis key prefix, metric label)
+   * @param {string} [options.prefix='ratelimit:'] - Redis key prefix
+   */
+  constructor({ name, prefix = KEY_PREFIX }) {
+    this.name = name;
+    this.prefix = `${prefix}${name}:`;
+    this.windowMs = 60 * 1000;
+    this.max = null;
+    this.local = new LocalWindowCounter(this.windowMs);
+  }
+
+  /**
+   * Called by express-rate-limit with the limiter options
+   * @param {Object} options - Limiter options
+   */
+  init(options) {
+    this.windowMs = options.windowMs;
+    this.max = typeof options.max === 'number' ? options.max : null;
+    this.local = new LocalWindowCounter(this.windowMs);
+  }
+
+  _keys(key, windowIndex) {
+    // hash tag 保证两个窗口的 key 落在同一个 Redis Cluster slot
+    return [`${this.prefix}{${key}}:${windowIndex}`, `${this.prefix}{${key}}:${windowIndex - 1}`];
+  }
+
+  async _incrementRedis(client, key, now) {
+    const windowIndex = Math.floor(now / this.windowMs);
+    const options = {
+      keys: this._keys(key, windowIndex),
+      arguments: [String(this.windowMs), String(now % this.windowMs)]
+    };
+    try {
+      return Number(await client.evalSha(SLIDING_WINDOW_SHA, options));
+    } catch (error) {
+      if (!String(error.message).includes('NOSCRIPT')) throw error;
+      return Number(await client.eval(SLIDING_WINDOW_SCRIPT, options));
+    }
+  }
+
+  /**
+   * Count a request
+   * @param {string} key - Client key
+   * @returns {Promise<{totalHits: number, resetTime: Date}>}
+   */
+  async increment(key) {
+    const now = Date.now();
+    const start = process.hrtime.bigint();
+    const client = getRedis();
+    let store = 'local';
+    let totalHits;
+
+    if (client) {
+      try {
+        totalHits = await this._incrementRedis(client, key, now);
+        store = 'redis';
+      } catch (error) {
+        // Redis 异常时退回本地计数，限流不因 Redis 故障失效或报错
+        totalHits = this.local.increment(key, now);
+      }
+    } else {
+      totalHits = this.local.increment(key, now);
+    }
+
+    rateLimitDuration.observe({ limiter: this.name, store }, Number(process.hrtime.bigint() - start) / 1e9);
+    if (this.max !== null) {
+      rateLimitDecisionsTotal.inc({
+        limiter: this.name,
+        decision: totalHits > this.max ? 'rejected' : 'allowed',
+        store
+      });
+    }
+
+    return {
+      totalHits,
+      resetTime: new Date((Math.floor(now / this.windowMs) + 1) * this.windowMs)
+    };
+  }
+
+  async decrement(key) {
+    const client = getRedis();
+    if (client) {
+      try {
+        const [currentKey] = this._keys(key, Math.floor(Date.now() / this.windowMs));
+        await client.eval(DECREMENT_SCRIPT, { keys: [currentKey] });
+        return;
+      } catch (error) {
+        // 退回本地
+      }
+    }
+    this.local.decrement(key);
+  }
+
+  async resetKey(key) {
+    this.local.reset(key);
+    const client = getRedis();
+    if (client) {
+      const windowIndex = Math.floor(Date.now() / this.windowMs);
+      await client.del(this._keys(key, windowIndex)).catch(() => {});
+    }
+  }
+
+  async resetAll() {
+    this.local.resetAll();
+  }
+}
+
+module.exports = {
+  SlidingWindowStore,
+  LocalWindowCounter,
+  setRedisClient,
+  SLIDING_WINDOW_SCRIPT,
+};
@@ -5,6 +5,7 @@
 
 import fs from 'fs';
 import path from 'path';
+import { compileScenarioRules, MODEL_MULTIPLIER_RULES } from '../../shared/modelMatcher.mjs';
 
 // Types
 export interface Agent {
@@ -91,51 +92,15 @@ function loadAgentCoefficients(): AgentCoefficients {
   }
 }
 
+// Scenario bonus/penalty rules compiled once
+const modelMultipliers = compileScenarioRules(MODEL_MULTIPLIER_RULES);
+
 /**
  * Get model-specific multiplier based on scenario
  */
 function getModelMultiplier(agent: Agent, scenario: Scenario): number {
-  const modelName = agent.model.toLowerCase();
-  const modelId = agent.id.toString();
-  const searchStr = `${modelName} ${modelId}`;
-  
-  // Scenario-specific multipliers
-  const multipliers: Record<Scenario, { bonus: RegExp; penalty: RegExp; bonusVal: number; penaltyVal: number }> = {
-    all: { 
-      bonus: /sonnet/i, 
-      penalty: /haiku|mini|turbo/i, 
-      bonusVal: 1.05, 
-      penaltyVal: 0.90 
-    },
-    coding: { 
-      bonus: /coder|sonnet.*3\.5|deepseek.*coder|claude.*3\.5/i, 
-      penalty: /flash|mini|turbo|small|haiku/i, 
-      bonusVal: 1.10, 
-      penaltyVal: 0.85 
-    },
-    reasoning: { 
-      bonus: /qwq|o1|r1|opus/i, 
-      penalty: /turbo|flash|mini/i, 
-      bonusVal: 1.10, 
-      penaltyVal: 0.90 
-    },
-    creative: { 
-      bonus: /opus|gpt-4o|gemini.*pro|sonnet/i, 
-      penalty: /haiku|turbo|flash/i, 
-      bonusVal: 1.08, 
-      penaltyVal: 0.88 
-    },
-  };
-  
-  const config = multipliers[scenario];
-  
-  if (config.bonus.test(searchStr)) {
-    return config.bonusVal;
-  } else if (config.penalty.test(searchStr)) {
-    return config.penaltyVal;
-  }
-  
-  return 1.0;
+  const match = Object.hasOwn(modelMultipliers, scenario) ? modelMultipliers[scenario] : null;
+  return match ? match(`${agent.model} ${agent.id}`) : 1.0;
 }
 
 /**
@@ -0,0 +1,143 @@
+/**
+ * xiaoshazi Socket.IO Redis Adapter
+ * Relays broadcasts between cluster workers over Redis pub/sub
+ *
+ * Only broadcasts are forwarded (io.emit / io.to(room).emit). Operations
+ * that need answers from or state on the other workers - broadcasts with
+ * acks, fetchSockets, socketsJoin/socketsLeave, disconnectSockets and
+ * serverSideEmit - throw instead of silently covering this worker only; call
+ * them with `.local` to run them on this worker. Room membership is per
+ * worker (socket.join works as usual, since a socket lives on one worker).
+ * Packets are JSON-encoded, so binary attachments are not supported.
+ */
+
+const crypto = require('crypto');
+const { Adapter } = require('socket.io-adapter');
+const logger = require('./logger');
+
+const DEFAULT_KEY = 'xiaoshazi:socket.io';
+
+function unsupported(operation) {
+  return new Error(`${operation} is not supported across cluster workers by the Redis broadcast adapter; use .local`);
+}
+
+function isLocal(opts) {
+  return Boolean(opts && opts.flags && opts.flags.local);
+}
+
+class RedisBroadcastAdapter extends Adapter {
+  /**
+   * @param {Object} nsp - Socket.IO namespace
+   * @param {Object} options
+   * @param {Object} options.pubClient - Connected Redis client for PUBLISH
+   * @param {Object} options.subClient - Connected Redis client in subscriber mode
+   * @param {string} options.channel - Channel for this namespace
+   * @param {string} options.uid - Id of this server (to skip our own messages)
+   */
+  constructor(nsp, { pubClient, subClient, channel, uid }) {
+    super(nsp);
+    this.pubClient = pubClient;
+    this.subClient = subClient;
+    this.channel = channel;
+    this.uid = uid;
+
+    this.subClient.subscribe(this.channel, (message) => this.onMessage(message))
+      .catch((err) => logger.warn('⚠️ Socket.IO adapter subscribe failed:', { error: err.message }));
+  }
+
+  broadcast(packet, opts) {
+    packet.nsp = this.nsp.name;
+
+    if (!opts.flags || !opts.flags.local) {
+      const message = JSON.stringify({
+        uid: this.uid,
+        packet,
+        opts: {
+          rooms: [...opts.rooms],
+          except: [...(opts.except || [])],
+          flags: opts.flags || {},
+        },
+      });
+      this.pubClient.publish(this.channel, message)
+        .catch((err) => logger.warn('⚠️ Socket.IO adapter publish failed:', { error: err.message }));
+    }
+
+    super.broadcast(packet, opts);
+  }
+
+  broadcastWithAck(packet, opts, clientCountCallback, ack) {
+    if (!isLocal(opts)) throw unsupported('Broadcast with acknowledgements');
+    super.broadcastWithAck(packet, opts, clientCountCallback, ack);
+  }
+
+  fetchSockets(opts) {
+    if (!isLocal(opts)) return Promise.reject(unsupported('fetchSockets()'));
+    return super.fetchSockets(opts);
+  }
+
+  addSockets(opts, rooms) {
+    if (!isLocal(opts)) throw unsupported('socketsJoin()');
+    super.addSockets(opts, rooms);
+  }
+
+  delSockets(opts, rooms) {
+    if (!isLocal(opts)) throw unsupported('socketsLeave()');
+    super.delSockets(opts, rooms);
+  }
+
+  disconnectSockets(opts, close) {
+    if (!isLocal(opts)) throw unsupported('disconnectSockets()');
+    super.disconnectSockets(opts, close);
+  }
+
+  serverSideEmit() {
+    throw unsupported('serverSideEmit()');
+  }
+
+  onMessage(message) {
+    let parsed;
+    try {
+      parsed = JSON.parse(message);
+    } catch {
+      return;
+    }
+    if (parsed.uid === this.uid) return;
+
+    const { packet, opts } = parsed;
+    super.broadcast(packet, {
+      rooms: new Set(opts.rooms),
+      except: new Set(opts.except),
+      flags: opts.flags,
+    });
+  }
+
+  close() {
+    return this.subClient.unsubscribe(this.channel).catch(() => {});
+  }
+}
+
+/**
+ * Create an adapter factory for `new Server(httpServer, { adapter })`
+ * @param {Object} pubClient - Connected Redis client
+ * @param {Object} subClient - Connected Redis client dedicated to pub/sub
+ * @param {Object} [options]
+ * @param {string} [options.key] - Channel prefix
+ * @returns {Function} Adapter constructor
+ */
+function createRedisAdapter(pubClient, subClient, { key = DEFAULT_KEY } = {}) {
+  const uid = crypto.randomUUID();
+
+  return function RedisAdapter(nsp) {
+    return new RedisBroadcastAdapter(nsp, {
+      pubClient,
+      subClient,
+      channel: `${key}#${nsp.name}#`,
+      uid,
+    });
+  };
+}
+
+module.exports = {
+  RedisBroadcastAdapter,
+  createRedisAdapter,
+};
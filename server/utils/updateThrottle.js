@@ -0,0 +1,88 @@
+/**
+ * xiaoshazi Update Throttle
+ * Coalesced, rate-limited on-demand pushes (Socket.IO `request:update`)
+ *
+ * Each socket gets at most one reply per intervalMs. A request inside the
+ * window is not answered right away: all requests in it fold into a single
+ * trailing reply at the end of the window. The payload is computed at most
+ * once per computeIntervalMs and shared by every socket asking in that time,
+ * and it only goes to the socket that asked, never to every client.
+ */
+
+class UpdateThrottle {
+  /**
+   * @param {Object} options
+   * @param {Function} options.compute - () => payload
+   * @param {string} options.event - Event name to emit
+   * @param {number} [options.intervalMs=2000] - Min interval between replies to one socket
+   * @param {number} [options.computeIntervalMs=1000] - Max age of a shared payload
+   */
+  constructor({ compute, event, intervalMs = 2000, computeIntervalMs = 1000 }) {
+    this.compute = compute;
+    this.event = event;
+    this.intervalMs = intervalMs;
+    this.computeIntervalMs = computeIntervalMs;
+    this.payload = null;
+    this.computedAt = 0;
+  }
+
+  _state(socket) {
+    if (!socket.data.updateThrottle) {
+      socket.data.updateThrottle = { lastSentAt: 0, timer: null };
+    }
+    return socket.data.updateThrottle;
+  }
+
+  _currentPayload() {
+    const now = Date.now();
+    if (this.payload === null || now - this.computedAt >= this.computeIntervalMs) {
+      this.payload = this.compute();
+      this.computedAt = now;
+    }
+    return this.payload;
+  }
+
+  _send(socket, state) {
+    state.lastSentAt = Date.now();
+    socket.emit(this.event, this._currentPayload());
+  }
+
+  /**
+   * Handle one update request
+   * @param {Object} socket - Socket.IO socket
+   * @returns {boolean} true if answered now, false if folded into a trailing reply
+   */
+  request(socket) {
+    const state = this._state(socket);
+    if (state.timer) return false;
+
+    const wait = state.lastSentAt + this.intervalMs - Date.now();
+    if (wait <= 0) {
+      this._send(socket, state);
+      return true;
+    }
+
+    state.timer = setTimeout(() => {
+      state.timer = null;
+      if (socket.connected !== false) this._send(socket, state);
+    }, wait);
+    state.timer.unref();
+    return false;
+  }
+
+  /**
+   * Drop a pending trailing reply (on disconnect)
+   * @param {Object} socket - Socket.IO socket
+   */
+  release(socket) {
+    const state = socket.data.updateThrottle;
+    if (state && state.timer) {
+      clearTimeout(state.timer);
+      state.timer = null;
+    }
+  }
+}
+
+module.exports = {
+  UpdateThrottle,
+};
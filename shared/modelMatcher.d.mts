@@ -0,0 +1,28 @@
+/**
+ * Type declarations for shared/modelMatcher.mjs
+ */
+
+export interface MatchRule<T> {
+  value: T;
+  patterns: string[];
+}
+
+export interface ScenarioRules<T> {
+  fallback: T;
+  rules: MatchRule<T>[];
+}
+
+export interface Matcher<T> {
+  (name: string): T;
+  clear(): void;
+}
+
+export function escapeRegExp(text: string): string;
+export function literals(list: string[]): string[];
+export function memoize<T>(fn: (key: string) => T, cacheSize?: number): Matcher<T>;
+export function compileRules<T>(rules: MatchRule<T>[], options?: { fallback?: T; cacheSize?: number }): Matcher<T>;
+export function compileScenarioRules<T>(table: Record<string, ScenarioRules<T>>): Record<string, Matcher<T>>;
+export function compileAgentCoefficients(coefficients: Record<string, { multiplier: number; patterns?: string[] }>): Matcher<number>;
+
+export const MODEL_MULTIPLIER_RULES: Record<'all' | 'coding' | 'reasoning' | 'creative', ScenarioRules<number>>;
+export const SCENARIO_WEIGHT_RULES: Record<'all' | 'coding' | 'reasoning' | 'creative', ScenarioRules<number>>;
@@ -0,0 +1,209 @@
+/**
+ * xiaoshazi Model Matcher
+ * Compiled model-name matching shared by the server (scripts/sync_data.js,
+ * utils/scoring.ts) and the client scoring worker (utils/scoringUtils.js)
+ *
+ * An ordered rule list compiles into one alternation with a capture group per
+ * rule. A single exec() finds the leftmost pattern of any rule; most names
+ * match nothing and are settled by that one scan. When the hit belongs to a
+ * lower-priority rule, only the rules ranked above it are re-tested, so the
+ * answer is the same as an if / else-if chain of includes()/test().
+ * Results are memoized in a small bounded cache (cacheSize, 1024 by default):
+ * rescoring a catalogue repeats the same few thousand names, and a hit skips
+ * the scan entirely. Expensive derivations such as extractFamily wrap
+ * themselves with memoize() and a larger bound.
+ *
+ * Plain ESM without imports: Vite bundles it for the browser/worker and Node
+ * (>= 20.19) loads it with require().
+ */
+
+// 远大于排行榜规模 (数千个模型)，整份目录可常驻缓存
+const DEFAULT_CACHE_SIZE = 200000;
+// compileRules 的默认上限: 覆盖一个场景下反复重算的模型名
+const DEFAULT_MATCH_CACHE_SIZE = 1024;
+
+/**
+ * Escape a literal for use inside a RegExp
+ * @param {string} text - Literal text
+ * @returns {string} Regex source
+ */
+export function escapeRegExp(text) {
+  return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+/**
+ * Turn literal substrings into regex pattern sources
+ * @param {string[]} list - Substrings
+ * @returns {string[]} Regex sources
+ */
+export function literals(list) {
+  return list.map(escapeRegExp);
+}
+
+/**
+ * Memoize a single-argument function with a bounded cache
+ * @param {Function} fn - Function of one string argument
+ * @param {number} [cacheSize] - Entries per generation (at most twice this many are kept)
+ * @returns {Function} Memoized function (with .clear())
+ */
+export function memoize(fn, cacheSize = DEFAULT_CACHE_SIZE) {
+  // 两代缓存: 当前代写满后整体降为上一代，命中上一代的条目提升回当前代。
+  // 淘汰只是换一个 Map，不在热路径上逐条删除
+  let current = new Map();
+  let previous = new Map();
+  const store = (key, value) => {
+    if (current.size >= cacheSize) {
+      previous = current;
+      current = new Map();
+    }
+    current.set(key, value);
+    return value;
+  };
+  const memoized = (key) => {
+    const value = current.get(key);
+    if (value !== undefined || current.has(key)) return value;
+    const older = previous.get(key);
+    if (older !== undefined || previous.has(key)) return store(key, older);
+    return store(key, fn(key));
+  };
+  memoized.clear = () => {
+    current = new Map();
+    previous = new Map();
+  };
+  return memoized;
+}
+
+/**
+ * Compile an ordered rule list into one matcher
+ * @param {Array<{value: *, patterns: string[]}>} rules - Highest priority first; patterns are
+ *   regex sources without capturing groups
+ * @param {Object} [options]
+ * @param {*} [options.fallback=null] - Value when no rule matches
+ * @param {number} [options.cacheSize=1024] - Memoized names (0 = no memo)
+ * @returns {Function} match(name) => value (with .clear())
+ */
+export function compileRules(rules, { fallback = null, cacheSize = DEFAULT_MATCH_CACHE_SIZE } = {}) {
+  const active = rules.filter(rule => rule.patterns && rule.patterns.length > 0);
+  if (active.length === 0) {
+    const constant = () => fallback;
+    constant.clear = () => {};
+    return constant;
+  }
+
+  // 一次扫描: 每条规则一个捕获组，找到最左侧命中的规则
+  const combined = new RegExp(active.map(rule => `(${rule.patterns.join('|')})`).join('|'), 'i');
+  // 仅当命中的是低优先级规则时，才逐条复查排在它前面的规则
+  const perRule = active.map(rule => new RegExp(rule.patterns.join('|'), 'i'));
+  const values = active.map(rule => rule.value);
+
+  const match = (name) => {
+    const hit = combined.exec(name);
+    if (!hit) return fallback;
+    let index = 0;
+    while (hit[index + 1] === undefined) index++;
+    for (let i = 0; i < index; i++) {
+      if (perRule[i].test(name)) return values[i];
+    }
+    return values[index];
+  };
+
+  if (cacheSize > 0) return memoize(match, cacheSize);
+  match.clear = () => {};
+  return match;
+}
+
+/**
+ * Compile a { scenario: { rules, fallback } } table
+ * @param {Object} table - Rule table
+ * @returns {Object} { scenario: match(name) }
+ */
+export function compileScenarioRules(table) {
+  const matchers = {};
+  for (const [scenario, { rules, fallback }] of Object.entries(table)) {
+    matchers[scenario] = compileRules(rules, { fallback });
+  }
+  return matchers;
+}
+
+/**
+ * Compile server/data/agent_coefficients.json (high > mid > low tiers,
+ * case-insensitive substrings)
+ * @param {Object} coefficients - { high, mid, low: { multiplier, patterns } }
+ * @returns {Function} match(modelName) => multiplier
+ */
+export function compileAgentCoefficients(coefficients) {
+  return compileRules(
+    ['high', 'mid']
+      .filter(tier => coefficients[tier])
+      .map(tier => ({
+        value: coefficients[tier].multiplier,
+        patterns: literals(coefficients[tier].patterns || []),
+      })),
+    { fallback: (coefficients.low && coefficients.low.multiplier) || 1.0 }
+  );
+}
+
+/**
+ * Server-side scenario multipliers (utils/scoring.ts); bonus beats penalty
+ */
+export const MODEL_MULTIPLIER_RULES = {
+  all: {
+    fallback: 1.0,
+    rules: [
+      { value: 1.05, patterns: ['sonnet'] },
+      { value: 0.90, patterns: ['haiku', 'mini', 'turbo'] },
+    ],
+  },
+  coding: {
+    fallback: 1.0,
+    rules: [
+      { value: 1.10, patterns: ['coder', 'sonnet.*3\\.5', 'deepseek.*coder', 'claude.*3\\.5'] },
+      { value: 0.85, patterns: ['flash', 'mini', 'turbo', 'small', 'haiku'] },
+    ],
+  },
+  reasoning: {
+    fallback: 1.0,
+    rules: [
+      { value: 1.10, patterns: ['qwq', 'o1', 'r1', 'opus'] },
+      { value: 0.90, patterns: ['turbo', 'flash', 'mini'] },
+    ],
+  },
+  creative: {
+    fallback: 1.0,
+    rules: [
+      { value: 1.08, patterns: ['opus', 'gpt-4o', 'gemini.*pro', 'sonnet'] },
+      { value: 0.88, patterns: ['haiku', 'turbo', 'flash'] },
+    ],
+  },
+};
+
+/**
+ * Client ranking weights (client/src/utils/scoringUtils.js)
+ */
+export const SCENARIO_WEIGHT_RULES = {
+  all: {
+    fallback: 1.0,
+    rules: [],
+  },
+  coding: {
+    fallback: 0.95,
+    rules: [
+      { value: 1.0, patterns: literals(['coder', 'sonnet 3.5', 'sonnet-3-5', 'deepseek-coder']) },
+      { value: 0.85, patterns: literals(['flash', 'mini', 'turbo', 'small', 'haiku']) },
+    ],
+  },
+  reasoning: {
+    fallback: 1.0,
+    rules: [
+      { value: 1.0, patterns: literals(['qwq', 'o1', 'r1', 'opus']) },
+      { value: 0.90, patterns: literals(['turbo', 'flash', 'mini']) },
+    ],
+  },
+  creative: {
+    fallback: 1.0,
+    rules: [
+      { value: 1.0, patterns: literals(['opus', 'gpt-4o', 'gemini pro', 'gemini-pro']) },
+      { value: 0.85, patterns: literals(['coder', 'math']) },
+    ],
+  },
+};
@@ -0,0 +1,37 @@
+/**
+ * Type declarations for shared/rankingDiff.mjs
+ */
+
+export interface Agent {
+  id?: string | number;
+  model?: string;
+  rank?: number;
+  avgPerf?: number;
+  scenarios?: string[];
+  [field: string]: unknown;
+}
+
+export interface RankingDiff {
+  version: string;
+  previousVersion: string;
+  reset?: boolean;
+  removed: { key: string; scenarios: string[] }[];
+  inserted: Agent[];
+  changed: { key: string; scenarios: string[]; fields: Record<string, unknown> }[];
+}
+
+export interface ScopedRankingDiff {
+  version: string;
+  previousVersion: string;
+  scenario: string;
+  reset?: boolean;
+  removed: string[];
+  inserted: Agent[];
+  changed: ({ key: string } & Record<string, unknown>)[];
+}
+
+export function agentKey(agent: Agent): string;
+export function diffRankings(previous: Agent[], next: Agent[], versions: { version: string; previousVersion: string }): RankingDiff;
+export function diffScenarios(diff: RankingDiff): string[];
+export function scopeDiff(diff: RankingDiff, scenario: string): ScopedRankingDiff;
+export function applyDiff(agents: Map<string, Agent>, diff: ScopedRankingDiff): Set<string>;
@@ -0,0 +1,156 @@
+/**
+ * xiaoshazi Ranking Diffs
+ * Compact leaderboard change sets shared by the server change feed
+ * (server/utils/rankingFeed.js) and the client ranking state
+ * (client/src/utils/rankingState.js)
+ *
+ * A diff takes one data version of the ranking list to the next:
+ *   removed  - keys of agents that left the list
+ *   inserted - full agent objects that joined it
+ *   changed  - { key, fields } with only the fields whose value changed
+ * An agent whose scenario membership changed is sent as removed + inserted, so
+ * a diff narrowed to one scenario (scopeDiff) stays a valid diff of that
+ * scenario's list. A diff with `reset: true` carries no changes and tells the
+ * receiver to reload the full list instead.
+ *
+ * Ranks are positional: only agents whose score changed carry their new rank,
+ * neighbours shifted by a move are re-ranked by the receiver.
+ *
+ * Plain ESM without imports: Vite bundles it for the browser/worker and Node
+ * (>= 20.19) loads it with require().
+ */
+
+/**
+ * Stable identity of an agent across versions (file data numbers `id` by rank)
+ * @param {Object} agent - Agent object
+ * @returns {string} Key
+ */
+export function agentKey(agent) {
+  return String(agent.model ?? agent.id);
+}
+
+function sameValue(a, b) {
+  if (Array.isArray(a) && Array.isArray(b)) {
+    return a.length === b.length && a.every((item, i) => item === b[i]);
+  }
+  return a === b;
+}
+
+function scenariosOf(agent) {
+  return Array.isArray(agent.scenarios) ? agent.scenarios : [];
+}
+
+/**
+ * Compute the diff between two ranking lists
+ * @param {Object[]} previous - Agents at previousVersion
+ * @param {Object[]} next - Agents at version
+ * @param {Object} versions
+ * @param {string} versions.version - New data version
+ * @param {string} versions.previousVersion - Data version `previous` was loaded at
+ * @returns {Object} Diff { version, previousVersion, removed, inserted, changed }
+ */
+export function diffRankings(previous, next, { version, previousVersion }) {
+  const before = new Map(previous.map(agent => [agentKey(agent), agent]));
+  const removed = [];
+  const inserted = [];
+  const changed = [];
+
+  for (const agent of next) {
+    const key = agentKey(agent);
+    const old = before.get(key);
+    before.delete(key);
+
+    if (!old) {
+      inserted.push(agent);
+      continue;
+    }
+    if (!sameValue(scenariosOf(old), scenariosOf(agent))) {
+      removed.push({ key, scenarios: scenariosOf(old) });
+      inserted.push(agent);
+      continue;
+    }
+
+    const fields = {};
+    let count = 0;
+    for (const name of new Set([...Object.keys(old), ...Object.keys(agent)])) {
+      if (name === 'rank' || sameValue(old[name], agent[name])) continue;
+      fields[name] = agent[name] === undefined ? null : agent[name];
+      count++;
+    }
+    if (count > 0) {
+      if ('avgPerf' in fields) fields.rank = agent.rank;
+      changed.push({ key, scenarios: scenariosOf(agent), fields });
+    }
+  }
+
+  for (const [key, old] of before) {
+    removed.push({ key, scenarios: scenariosOf(old) });
+  }
+
+  return { version, previousVersion, removed, inserted, changed };
+}
+
+/**
+ * Scenarios touched by a diff (rooms that need to hear about it)
+ * @param {Object} diff - Diff from diffRankings
+ * @returns {string[]} Scenario names
+ */
+export function diffScenarios(diff) {
+  const scenarios = new Set();
+  diff.removed.forEach(entry => entry.scenarios.forEach(s => scenarios.add(s)));
+  diff.inserted.forEach(agent => scenariosOf(agent).forEach(s => scenarios.add(s)));
+  diff.changed.forEach(entry => entry.scenarios.forEach(s => scenarios.add(s)));
+  return [...scenarios];
+}
+
+/**
+ * Narrow a diff to one scenario view, in wire format
+ * @param {Object} diff - Diff from diffRankings
+ * @param {string} scenario - Scenario ('all' keeps everything)
+ * @returns {Object} { version, previousVersion, scenario, [reset], removed: key[], inserted, changed: {key, ...fields}[] }
+ */
+export function scopeDiff(diff, scenario) {
+  const inScenario = scenarios => scenario === 'all' || scenarios.includes(scenario);
+  return {
+    version: diff.version,
+    previousVersion: diff.previousVersion,
+    scenario,
+    ...(diff.reset ? { reset: true } : {}),
+    removed: diff.removed.filter(entry => inScenario(entry.scenarios)).map(entry => entry.key),
+    inserted: diff.inserted.filter(agent => inScenario(scenariosOf(agent))),
+    changed: diff.changed
+      .filter(entry => inScenario(entry.scenarios))
+      .map(entry => ({ key: entry.key, ...entry.fields }))
+  };
+}
+
+/**
+ * Apply a wire-format diff to agents held by key
+ * @param {Map<string, Object>} agents - Agents by agentKey (mutated)
+ * @param {Object} diff - Diff from scopeDiff
+ * @returns {Set<string>} Keys that were removed, inserted or changed
+ */
+export function applyDiff(agents, diff) {
+  const touched = new Set();
+  for (const key of diff.removed) {
+    agents.delete(key);
+    touched.add(key);
+  }
+  for (const agent of diff.inserted) {
+    const key = agentKey(agent);
+    agents.set(key, agent);
+    touched.add(key);
+  }
+  for (const { key, ...fields } of diff.changed) {
+    const agent = agents.get(key);
+    if (!agent) continue;
+    const updated = { ...agent };
+    for (const [name, value] of Object.entries(fields)) {
+      if (value === null) delete updated[name];
+      else updated[name] = value;
+    }
+    agents.set(key, updated);
+    touched.add(key);
+  }
+  return touched;
+}
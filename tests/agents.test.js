@@ -0,0 +1,200 @@
+/**
+ * API Unit Tests - Agents Routes (ranking snapshots)
+ */
+const request = require('supertest');
+const express = require('express');
+
+const agentsRoutes = require('../server/routes/agents');
+const { writeLeaderboard } = require('../server/scripts/sync_data');
+const { createFakeRedis } = require('./fixtures/fakeRedis');
+const { RankingSnapshotStore, MAX_SNAPSHOTS, UNKNOWN_SCENARIO_KEY } = require('../server/utils/rankingSnapshot');
+
+describe('Agents API Routes', () => {
+  let app;
+
+  beforeEach(() => {
+    app = express();
+    app.use('/api', agentsRoutes);
+    agentsRoutes.invalidateSnapshots();
+  });
+
+  describe('GET /api/agents', () => {
+    it('should return rankings with a strong ETag', async () => {
+      const response = await request(app).get('/api/agents');
+
+      expect(response.status).toBe(200);
+      expect(response.body.success).toBe(true);
+      expect(Array.isArray(response.body.data)).toBe(true);
+      expect(typeof response.body.timestamp).toBe('number');
+      expect(response.headers.etag).toMatch(/^"[^"]+"$/);
+      expect(response.headers['cache-control']).toContain('max-age=1800');
+    });
+
+    it('should return 304 when If-None-Match matches', async () => {
+      const first = await request(app).get('/api/agents').set('Accept-Encoding', 'identity');
+      const second = await request(app)
+        .get('/api/agents')
+        .set('Accept-Encoding', 'identity')
+        .set('If-None-Match', first.headers.etag);
+
+      expect(second.status).toBe(304);
+      expect(second.headers.etag).toBe(first.headers.etag);
+    });
+
+    it('should serve prebuilt gzip bytes with a distinct ETag', async () => {
+      const identity = await request(app).get('/api/agents').set('Accept-Encoding', 'identity');
+      const gzipped = await request(app).get('/api/agents').set('Accept-Encoding', 'gzip');
+
+      expect(gzipped.status).toBe(200);
+      expect(gzipped.headers['content-encoding']).toBe('gzip');
+      expect(gzipped.headers.etag).not.toBe(identity.headers.etag);
+      expect(gzipped.body.data).toEqual(identity.body.data);
+    });
+
+    it('should keep field types of sync_data.js rankings', async () => {
+      const redis = createFakeRedis();
+      await writeLeaderboard(redis, [
+        { id: 1, rank: 1, diff: 0, tier: 'S+', provider: 'acme', model: 'Alpha', fullName: 'acme/Alpha',
+          avgPerf: 95.5, peakPerf: 100.3, samples: 12000, multiplier: 1.2, scenarios: ['reasoning', 'coding'],
+          isPMKB: true, specs: { context: 200000 }, pricing: { input: 3 } },
+        { id: 2, rank: 2, diff: 0, tier: 'B', provider: 'acme', model: 'Beta', fullName: 'acme/Beta',
+          avgPerf: 71, peakPerf: 74.6, samples: 3000, multiplier: 1, scenarios: ['reasoning'] }
+      ]);
+      agentsRoutes.setRedisClient(redis, true);
+
+      try {
+        const response = await request(app).get('/api/agents');
+        const [alpha, beta] = response.body.data;
+
+        expect(response.body.source).toBe('redis-families');
+        expect(alpha).toMatchObject({ id: 1, rank: 1, model: 'Alpha', avgPerf: 95.5, peakPerf: 100.3, samples: 12000, multiplier: 1.2 });
+        expect(alpha.scenarios).toEqual(['reasoning', 'coding']);
+        expect(alpha.isPMKB).toBe(true);
+        expect(alpha.specs).toEqual({ context: 200000 });
+        expect(alpha.pricing).toEqual({ input: 3 });
+        expect(beta).toMatchObject({ id: 2, rank: 2, peakPerf: 74.6, samples: 3000 });
+      } finally {
+        agentsRoutes.setRedisClient(null, false);
+      }
+    });
+
+    it('should filter by scenario', async () => {
+      const response = await request(app).get('/api/agents?scenario=coding');
+
+      expect(response.status).toBe(200);
+      response.body.data.forEach(agent => {
+        expect(agent.scenarios).toContain('coding');
+      });
+    });
+  });
+});
+
+describe('RankingSnapshotStore', () => {
+  const agents = [
+    { id: 1, scenarios: ['coding'] },
+    { id: 2, scenarios: ['reasoning'] }
+  ];
+
+  it('should load data once per version across scenarios and concurrent requests', async () => {
+    let loads = 0;
+    const store = new RankingSnapshotStore({
+      loadData: async () => { loads++; return { agents, source: 'test' }; },
+      getVersion: async () => '1',
+      versionCheckIntervalMs: 0
+    });
+
+    const [a, b] = await Promise.all([store.get('all'), store.get('all')]);
+    const coding = await store.get('coding');
+
+    expect(a).toBe(b);
+    expect(coding.count).toBe(1);
+    expect(loads).toBe(1);
+  });
+
+  it('should rebuild when the data version changes', async () => {
+    let loads = 0;
+    let version = '1';
+    const store = new RankingSnapshotStore({
+      loadData: async () => { loads++; return { agents, source: 'test' }; },
+      getVersion: async () => version,
+      versionCheckIntervalMs: 0
+    });
+
+    const first = await store.get('all');
+    version = '2';
+    const second = await store.get('all');
+
+    expect(second).not.toBe(first);
+    expect(second.version).toBe('2');
+    expect(loads).toBe(2);
+  });
+
+  it('should not cache uncacheable fallback data', async () => {
+    let loads = 0;
+    const store = new RankingSnapshotStore({
+      loadData: async () => { loads++; return { agents, source: 'memory', cacheable: false }; },
+      getVersion: async () => '1',
+      versionCheckIntervalMs: 0
+    });
+
+    await store.get('all');
+    await store.get('all');
+
+    expect(loads).toBe(2);
+  });
+
+  it('should share one snapshot between unknown scenarios', async () => {
+    const store = new RankingSnapshotStore({
+      loadData: async () => ({ agents, source: 'test' }),
+      getVersion: async () => '1',
+      versionCheckIntervalMs: 0
+    });
+
+    for (let i = 0; i < MAX_SNAPSHOTS * 2; i++) {
+      await store.get(`junk-${i}`);
+    }
+    const unknown = await store.get('junk-x');
+    const coding = await store.get('coding');
+
+    expect(unknown.count).toBe(0);
+    expect(store.snapshots.size).toBe(2);
+    expect(store.snapshots.has(UNKNOWN_SCENARIO_KEY)).toBe(true);
+    expect(await store.get('coding')).toBe(coding);
+  });
+
+  it('should change the ETag when only the version changes', async () => {
+    let version = '1';
+    const store = new RankingSnapshotStore({
+      loadData: async () => ({ agents, source: 'test', updatedAt: 1700000000000 }),
+      getVersion: async () => version,
+      versionCheckIntervalMs: 0
+    });
+
+    const first = await store.get('all');
+    version = '2';
+    const second = await store.get('all');
+
+    expect(JSON.parse(first.variants.identity.body).version).toBe('1');
+    expect(second.variants.identity.etag).not.toBe(first.variants.identity.etag);
+    expect(second.variants.br.etag).not.toBe(first.variants.br.etag);
+  });
+
+  it('should build the same bytes and ETag for one version in every worker', async () => {
+    const createStore = () => new RankingSnapshotStore({
+      loadData: async () => ({ agents, source: 'test', updatedAt: 1700000000000 }),
+      getVersion: async () => '7'
+    });
+
+    const first = await createStore().get('all');
+    // 另一个 worker 稍后构建同一版本
+    await new Promise(resolve => setTimeout(resolve, 5));
+    const other = await createStore().get('all');
+
+    expect(other.builtAt).toBeGreaterThan(first.builtAt);
+    expect(other.variants.identity.body.equals(first.variants.identity.body)).toBe(true);
+    expect(other.variants.identity.etag).toBe(first.variants.identity.etag);
+    expect(other.variants.br.etag).toBe(first.variants.br.etag);
+    // timestamp 是数据写入时间，不是构建时间
+    expect(JSON.parse(first.variants.identity.body).timestamp).toBe(1700000000000);
+  });
+});
@@ -0,0 +1,131 @@
+/**
+ * Unit Tests - Segmented Audit Log Store
+ */
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const { AuditLogStore } = require('../server/utils/audit');
+
+describe('AuditLogStore', () => {
+  let dir;
+  let basePath;
+
+  beforeEach(() => {
+    dir = fs.mkdtempSync(path.join(os.tmpdir(), 'audit-store-'));
+    basePath = path.join(dir, 'audit.log');
+  });
+
+  afterEach(() => {
+    fs.rmSync(dir, { recursive: true, force: true });
+  });
+
+  const createStore = (options = {}) => new AuditLogStore({ basePath, flushIntervalMs: 5, ...options });
+  const appendAll = (store, count, event = (i) => (i % 3 === 0 ? 'LOGIN' : 'TOKEN_ISSUED')) => {
+    for (let i = 0; i < count; i++) {
+      store.append({ timestamp: new Date(i).toISOString(), event: event(i), i });
+    }
+  };
+
+  it('should return entries newest first with offset pagination', async () => {
+    const store = createStore();
+    appendAll(store, 10);
+
+    const page = await store.readPage({ limit: 3, offset: 2 });
+    expect(page.total).toBe(10);
+    expect(page.data.map(e => e.i)).toEqual([7, 6, 5]);
+  });
+
+  it('should filter by event and report the event total', async () => {
+    const store = createStore();
+    appendAll(store, 10);
+
+    const page = await store.readPage({ limit: 2, offset: 1, event: 'LOGIN' });
+    expect(page.total).toBe(4);
+    expect(page.data.map(e => e.i)).toEqual([6, 3]);
+  });
+
+  it('should keep per-event counters as entries are written', async () => {
+    const store = createStore();
+    appendAll(store, 10);
+
+    expect(await store.getStats()).toEqual({
+      total: 10,
+      events: { LOGIN: 4, TOKEN_ISSUED: 6 },
+    });
+  });
+
+  it('should page across rotated segments and drop expired ones', async () => {
+    const store = createStore({ maxSegmentBytes: 100, maxSegments: 2, maxBufferEntries: 1 });
+    for (let i = 0; i < 20; i++) {
+      store.append({ event: 'E', i });
+      await store.flush();
+    }
+
+    const stats = await store.getStats();
+    const page = await store.readPage({ limit: 100 });
+    expect(page.total).toBe(stats.total);
+    expect(page.data).toHaveLength(stats.total);
+    expect(page.data[0].i).toBe(19);
+    expect(stats.total).toBeLessThan(20);
+    // 连续且无重复
+    page.data.forEach((entry, k) => expect(entry.i).toBe(19 - k));
+  });
+
+  it('should index an existing unindexed log on first open', async () => {
+    const lines = [0, 1, 2].map(i => JSON.stringify({ event: 'LEGACY', i }));
+    fs.writeFileSync(basePath, lines.join('\n') + '\n');
+
+    const store = createStore();
+    const page = await store.readPage({ limit: 2 });
+    expect(page.total).toBe(3);
+    expect(page.data.map(e => e.i)).toEqual([2, 1]);
+    expect((await store.getStats()).events).toEqual({ LEGACY: 3 });
+  });
+
+  it('should let a read-only store read what the writer flushed', async () => {
+    const writer = createStore();
+    appendAll(writer, 5);
+    await writer.flush();
+
+    const reader = createStore({ readOnly: true });
+    const page = await reader.readPage({ limit: 10 });
+    expect(page.data.map(e => e.i)).toEqual([4, 3, 2, 1, 0]);
+    expect((await reader.getStats()).total).toBe(5);
+  });
+
+  it('should keep writing after a transient write failure', async () => {
+    const store = createStore();
+    appendAll(store, 3);
+    await store.flush();
+
+    // 活动段路径暂时变成目录 → EISDIR
+    fs.renameSync(basePath, `${basePath}.saved`);
+    fs.mkdirSync(basePath);
+    store.append({ event: 'LOGIN', i: 3 });
+    await expect(store.flush()).rejects.toThrow();
+
+    fs.rmdirSync(basePath);
+    fs.renameSync(`${basePath}.saved`, basePath);
+    store.append({ event: 'LOGIN', i: 4 });
+
+    const page = await store.readPage({ limit: 10 });
+    expect(page.data.map(e => e.i)).toEqual([4, 3, 2, 1, 0]);
+    expect(await store.getStats()).toEqual({
+      total: 5,
+      events: { LOGIN: 3, TOKEN_ISSUED: 2 },
+    });
+  });
+
+  it('should retry opening after a failed recovery', async () => {
+    fs.mkdirSync(basePath);
+    const store = createStore();
+    store.append({ event: 'LOGIN', i: 0 });
+    await expect(store.flush()).rejects.toThrow();
+
+    fs.rmdirSync(basePath);
+    const page = await store.readPage({ limit: 10 });
+    expect(page.data.map(e => e.i)).toEqual([0]);
+    expect((await store.getStats()).total).toBe(1);
+  });
+});
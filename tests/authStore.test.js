@@ -0,0 +1,191 @@
+/**
+ * Unit Tests - Auth Store (token / family / user indexes) & token rotation
+ */
+const { MemoryAuthStore, RedisAuthStore, getAuthStore, setAuthStore } = require('../server/utils/authStore');
+const {
+  generateTokens,
+  verifyRefreshToken,
+  revokeAllUserTokens,
+  getUserValidTokens
+} = require('../server/utils/jwt');
+
+const DAY = 24 * 60 * 60 * 1000;
+
+const tokenRecord = (tokenId, userId, familyId, createdAt = Date.now()) => ({
+  tokenId,
+  userId,
+  email: `${userId}@test.com`,
+  familyId,
+  deviceInfo: 'test',
+  createdAt
+});
+
+// The same contract runs against every backend; Redis only when reachable
+function describeStore(name, createStore) {
+  describe(name, () => {
+    let store;
+
+    beforeEach(async () => {
+      store = await createStore();
+    });
+
+    it('should list and revoke tokens through the user and family indexes', async () => {
+      if (!store) return;
+      await store.saveToken(tokenRecord('t1', 'u1', 'f1'), DAY);
+      await store.saveToken(tokenRecord('t2', 'u1', 'f2'), DAY);
+      await store.saveToken(tokenRecord('t3', 'u2', 'f3'), DAY);
+
+      expect((await store.listUserTokens('u1')).map(r => r.tokenId).sort()).toEqual(['t1', 't2']);
+      expect(await store.deleteFamilyTokens('f1')).toBe(1);
+      expect(await store.getToken('t1')).toBeNull();
+      expect(await store.deleteUserTokens('u1')).toBe(1);
+      expect(await store.listUserTokens('u1')).toEqual([]);
+      expect((await store.getToken('t3')).userId).toBe('u2');
+    });
+
+    it('should hand a token record to only one of concurrent deletes', async () => {
+      if (!store) return;
+      await store.saveToken(tokenRecord('t1', 'u1', 'f1'), DAY);
+
+      const records = await Promise.all([store.deleteToken('t1'), store.deleteToken('t1')]);
+
+      expect(records.filter(Boolean)).toHaveLength(1);
+      expect(await store.listUserTokens('u1')).toEqual([]);
+    });
+
+    it('should expire tokens by TTL', async () => {
+      if (!store) return;
+      await store.saveToken(tokenRecord('old', 'u1', 'f1', Date.now() - 2 * DAY), DAY);
+      await store.saveToken(tokenRecord('new', 'u1', 'f1'), DAY);
+
+      expect(await store.getToken('old')).toBeNull();
+      expect((await store.listUserTokens('u1')).map(r => r.tokenId)).toEqual(['new']);
+    });
+
+    it('should track family compromise', async () => {
+      if (!store) return;
+      await store.saveFamily('f1', { userId: 'u1', currentTokenId: 't1', isCompromised: false }, DAY);
+      await store.markFamilyCompromised('f1');
+      await store.markFamilyCompromised('missing');
+
+      expect(await store.getFamily('f1')).toEqual({ userId: 'u1', currentTokenId: 't1', isCompromised: true });
+      expect(await store.getFamily('missing')).toBeNull();
+    });
+
+    it('should keep the compromise flag when a family is rotated', async () => {
+      if (!store) return;
+      await store.saveFamily('f1', { userId: 'u1', currentTokenId: 't1', isCompromised: false }, DAY);
+      expect(await store.rotateFamily('f1', { userId: 'u1', currentTokenId: 't2' }, DAY)).toBe(true);
+      await store.markFamilyCompromised('f1');
+
+      expect(await store.rotateFamily('f1', { userId: 'u1', currentTokenId: 't3' }, DAY)).toBe(false);
+      expect((await store.getFamily('f1')).isCompromised).toBe(true);
+    });
+
+    it('should create each user once and count login attempts per window', async () => {
+      if (!store) return;
+      const email = `user${Date.now()}@test.com`;
+      const user = await store.createUser({ email, role: 'user' });
+
+      expect(user.id).toBeDefined();
+      expect(await store.createUser({ email, role: 'user' })).toBeNull();
+      expect((await store.getUser(email)).id).toBe(user.id);
+
+      await store.incrementLoginAttempts(email, 60000);
+      expect((await store.incrementLoginAttempts(email, 60000)).count).toBe(2);
+      await store.clearLoginAttempts(email);
+      expect(await store.getLoginAttempts(email)).toBeNull();
+    });
+  });
+}
+
+describeStore('MemoryAuthStore', () => new MemoryAuthStore());
+
+let redisClient = null;
+describeStore('RedisAuthStore', async () => {
+  if (redisClient === null) {
+    try {
+      const redis = require('redis');
+      const client = redis.createClient({
+        url: process.env.REDIS_URL || 'redis://localhost:6379',
+        socket: { reconnectStrategy: false }
+      });
+      client.on('error', () => {});
+      await client.connect();
+      redisClient = client;
+    } catch (error) {
+      console.warn('Redis not available - skipping RedisAuthStore tests:', error.message);
+      redisClient = false;
+    }
+  }
+  return redisClient ? new RedisAuthStore(redisClient, { prefix: `test:auth:${Date.now()}:${Math.random()}:` }) : null;
+});
+
+afterAll(async () => {
+  if (redisClient) await redisClient.quit().catch(() => {});
+});
+
+describe('Refresh token rotation', () => {
+  const user = { id: 'rot-1', email: 'rotation@test.com', role: 'user' };
+
+  beforeEach(() => {
+    setAuthStore(new MemoryAuthStore());
+  });
+
+  it('should invalidate the previous refresh token on rotation', async () => {
+    const first = await generateTokens(user);
+    const payload = await verifyRefreshToken(first.refreshToken);
+    const second = await generateTokens(user, { isRefresh: true, familyId: payload.familyId });
+
+    expect(second.familyId).toBe(first.familyId);
+    expect(await verifyRefreshToken(second.refreshToken)).not.toBeNull();
+    expect((await getUserValidTokens(user.id)).map(s => s.tokenId)).toEqual([second.tokenId]);
+  });
+
+  it('should revoke the whole family when an old token is reused', async () => {
+    const first = await generateTokens(user);
+    const second = await generateTokens(user, { isRefresh: true, familyId: first.familyId });
+
+    expect(await verifyRefreshToken(first.refreshToken)).toBeNull();
+    expect(await verifyRefreshToken(second.refreshToken)).toBeNull();
+  });
+
+  it('should rotate a refresh token only once when it is presented concurrently', async () => {
+    // 与 POST /api/auth/refresh 相同的步骤
+    const refresh = async (refreshToken) => {
+      const payload = await verifyRefreshToken(refreshToken, { consume: true });
+      return payload ? generateTokens(user, { isRefresh: true, familyId: payload.familyId }) : null;
+    };
+    const first = await generateTokens(user);
+
+    const results = await Promise.all([refresh(first.refreshToken), refresh(first.refreshToken)]);
+
+    // 失败的一方走重用检测分支，家族被标记为已泄露；轮换不能清除该标记
+    const winners = results.filter(Boolean);
+    expect(winners.length).toBeLessThanOrEqual(1);
+    expect((await getAuthStore().getFamily(first.familyId)).isCompromised).toBe(true);
+    expect(await verifyRefreshToken(first.refreshToken)).toBeNull();
+    for (const winner of winners) {
+      expect(await verifyRefreshToken(winner.refreshToken)).toBeNull();
+    }
+  });
+
+  it('should refuse to rotate a compromised family', async () => {
+    const first = await generateTokens(user);
+    await getAuthStore().markFamilyCompromised(first.familyId);
+
+    expect(await generateTokens(user, { isRefresh: true, familyId: first.familyId })).toBeNull();
+    expect((await getAuthStore().getFamily(first.familyId)).isCompromised).toBe(true);
+    expect(await getUserValidTokens(user.id)).toEqual([]);
+  });
+
+  it('should revoke all sessions of one user only', async () => {
+    await generateTokens(user);
+    await generateTokens(user);
+    const other = await generateTokens({ id: 'rot-2', email: 'other@test.com' });
+
+    expect(await revokeAllUserTokens(user.id)).toBe(2);
+    expect(await getUserValidTokens(user.id)).toEqual([]);
+    expect(await verifyRefreshToken(other.refreshToken)).not.toBeNull();
+  });
+});
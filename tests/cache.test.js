@@ -0,0 +1,75 @@
+/**
+ * Unit Tests - In-Process LRU / Read-Through Cache
+ */
+const { LRUCache, ReadThroughCache } = require('../server/utils/cache');
+const { createFakeRedis } = require('./fixtures/fakeRedis');
+
+describe('LRUCache', () => {
+  it('should evict the least recently used entry', () => {
+    const lru = new LRUCache({ max: 2 });
+    lru.set('a', 1);
+    lru.set('b', 2);
+    lru.get('a');
+    lru.set('c', 3);
+
+    expect(lru.has('a')).toBe(true);
+    expect(lru.has('b')).toBe(false);
+    expect(lru.has('c')).toBe(true);
+  });
+
+  it('should expire entries after their TTL', async () => {
+    const lru = new LRUCache({ max: 10, ttlMs: 5 });
+    lru.set('a', 1);
+    await new Promise(resolve => setTimeout(resolve, 10));
+
+    expect(lru.get('a')).toBeUndefined();
+  });
+});
+
+describe('ReadThroughCache', () => {
+  it('should hit Redis once for repeated and concurrent reads', async () => {
+    const redis = createFakeRedis({ strings: { key: 'value' } });
+    const cache = new ReadThroughCache();
+    cache.setRedisClient(redis, true);
+
+    const [a, b] = await Promise.all([cache.get('key'), cache.get('key')]);
+    const c = await cache.get('key');
+
+    expect([a, b, c]).toEqual(['value', 'value', 'value']);
+    expect(redis.calls.get).toBe(1);
+  });
+
+  it('should cache missing keys', async () => {
+    const redis = createFakeRedis();
+    const cache = new ReadThroughCache();
+    cache.setRedisClient(redis, true);
+
+    await cache.get('missing');
+    expect(await cache.get('missing')).toBeNull();
+    expect(redis.calls.get).toBe(1);
+  });
+
+  it('should invalidate other workers via pub/sub', async () => {
+    const redis = createFakeRedis({ strings: { key: 'v1' } });
+    const workerA = new ReadThroughCache();
+    const workerB = new ReadThroughCache();
+    workerA.setRedisClient(redis, true);
+    workerB.setRedisClient(redis, true);
+    await workerB.subscribe(redis);
+
+    const invalidated = [];
+    workerB.onInvalidate(keys => invalidated.push(keys));
+
+    expect(await workerB.get('key')).toBe('v1');
+    redis.store.set('key', 'v2');
+    await workerA.invalidate(['key']);
+
+    expect(invalidated).toEqual([['key']]);
+    expect(await workerB.get('key')).toBe('v2');
+  });
+
+  it('should return null when Redis is unavailable', async () => {
+    const cache = new ReadThroughCache();
+    expect(await cache.get('key')).toBeNull();
+  });
+});
@@ -0,0 +1,215 @@
+/**
+ * Unit Tests - Entropy Worker, Result Cache, History and Route
+ */
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const { EntropyWorker, EntropyService } = require('../server/utils/entropyWorker');
+const { EntropyHistory } = require('../server/utils/entropyHistory');
+
+const STUB = path.join(__dirname, 'fixtures/entropyWorkerStub.js');
+
+function createStubWorker() {
+  return new EntropyWorker({ command: process.execPath, args: [STUB], timeoutMs: 5000 });
+}
+
+describe('EntropyWorker', () => {
+  let worker;
+
+  beforeEach(() => {
+    worker = createStubWorker();
+  });
+
+  afterEach(() => {
+    worker.stop();
+  });
+
+  it('should reuse one child process across requests', async () => {
+    const first = await worker.request('calculate');
+    const second = await worker.request('calculate');
+
+    expect(first.pid).toBe(second.pid);
+    expect(second.calls).toBe(2);
+  });
+
+  it('should reject worker errors', async () => {
+    let error;
+    try {
+      await worker.request('unknown');
+    } catch (err) {
+      error = err;
+    }
+    expect(error.message).toContain('unknown method');
+  });
+
+  it('should restart after the child exits', async () => {
+    const first = await worker.request('calculate');
+
+    let error;
+    try {
+      await worker.request('crash');
+    } catch (err) {
+      error = err;
+    }
+    expect(error.message).toContain('exited');
+
+    const second = await worker.request('calculate');
+    expect(second.pid).not.toBe(first.pid);
+  });
+});
+
+describe('EntropyService', () => {
+  let worker;
+
+  beforeEach(() => {
+    worker = createStubWorker();
+  });
+
+  afterEach(() => {
+    worker.stop();
+  });
+
+  it('should share one in-flight calculation between concurrent callers', async () => {
+    const service = new EntropyService({ worker, ttlMs: 1000, staleMs: 1000 });
+    const results = await Promise.all([service.get(), service.get(), service.get()]);
+
+    results.forEach(({ data }) => expect(data.calls).toBe(1));
+  });
+
+  it('should serve stale data while revalidating', async () => {
+    const service = new EntropyService({ worker, ttlMs: 10, staleMs: 10000 });
+    await service.get();
+    await new Promise(resolve => setTimeout(resolve, 20));
+
+    const stale = await service.get();
+    expect(stale.stale).toBe(true);
+    expect(stale.data.calls).toBe(1);
+
+    await service.inflight;
+    const fresh = await service.get();
+    expect(fresh.stale).toBe(false);
+    expect(fresh.data.calls).toBe(2);
+  });
+
+  it('should serve the last result when a calculation fails', async () => {
+    const failing = {
+      request: vi.fn()
+        .mockResolvedValueOnce({ entropy: 0.4 })
+        .mockRejectedValue(new Error('calculator crashed'))
+    };
+    const service = new EntropyService({ worker: failing, ttlMs: 0, staleMs: 0 });
+
+    await service.get();
+    const result = await service.get();
+
+    expect(result).toMatchObject({ data: { entropy: 0.4 }, stale: true, revalidationFailed: true });
+    await expect(new EntropyService({ worker: failing }).get()).rejects.toThrow('calculator crashed');
+  });
+});
+
+describe('GET /api/entropy', () => {
+  const express = require('express');
+  const request = require('supertest');
+  const entropyRoutes = require('../server/routes/entropy');
+
+  it('should answer with the stale result and a Warning header when the worker fails', async () => {
+    const worker = {
+      request: vi.fn()
+        .mockResolvedValueOnce({ entropy: 0.4 })
+        .mockRejectedValue(new Error('calculator crashed')),
+      stop: () => {}
+    };
+    entropyRoutes.configure({ worker, ttlMs: 0, staleMs: 0 });
+    const app = express();
+    app.use('/api', entropyRoutes);
+
+    await request(app).get('/api/entropy').expect(200);
+    const response = await request(app).get('/api/entropy');
+
+    expect(response.status).toBe(200);
+    expect(response.headers.warning).toBe('111 - "Revalidation Failed"');
+    expect(response.body).toMatchObject({ success: true, data: { entropy: 0.4 }, stale: true });
+  });
+});
+
+describe('EntropyHistory', () => {
+  let dir;
+  let filePath;
+
+  beforeEach(() => {
+    dir = fs.mkdtempSync(path.join(os.tmpdir(), 'entropy-history-'));
+    filePath = path.join(dir, 'entropy_history.json');
+  });
+
+  afterEach(() => {
+    fs.rmSync(dir, { recursive: true, force: true });
+  });
+
+  const write = (entries) => fs.writeFileSync(filePath, JSON.stringify(entries, null, 2));
+  const range = (from, to) => Array.from({ length: to - from }, (_, i) => ({ i: from + i }));
+
+  it('should return an empty list when the file is missing', async () => {
+    const history = new EntropyHistory({ filePath });
+    expect(await history.read()).toEqual([]);
+  });
+
+  it('should keep only the trailing entries', async () => {
+    write(range(0, 150));
+    const history = new EntropyHistory({ filePath, limit: 100 });
+
+    const entries = await history.read();
+    expect(entries).toHaveLength(100);
+    expect(entries[0]).toEqual({ i: 50 });
+    expect(entries[99]).toEqual({ i: 149 });
+  });
+
+  it('should pick up appended entries incrementally', async () => {
+    write(range(0, 5));
+    const history = new EntropyHistory({ filePath, limit: 100 });
+    await history.read();
+
+    write(range(0, 8));
+    const entries = await history.read();
+
+    expect(entries).toEqual(range(0, 8));
+  });
+
+  it('should fall back to a full parse when the file is rewritten', async () => {
+    write(range(0, 5));
+    const history = new EntropyHistory({ filePath, limit: 100 });
+    await history.read();
+
+    write(range(3, 10));
+    expect(await history.read()).toEqual(range(3, 10));
+  });
+
+  it('should notice a same-size edit in the middle of the file', async () => {
+    write(range(0, 50));
+    const history = new EntropyHistory({ filePath, limit: 100 });
+    await history.read();
+
+    const edited = range(0, 50);
+    edited[25] = { i: 99 };
+    write(edited);
+    expect(await history.read()).toEqual(edited);
+  });
+
+  it('should notice a file renamed over the old one with the same size and mtime', async () => {
+    const mtime = new Date('2026-01-01T00:00:00Z');
+    write(range(0, 50));
+    fs.utimesSync(filePath, mtime, mtime);
+    const history = new EntropyHistory({ filePath, limit: 100 });
+    await history.read();
+
+    // 原子写入: 先写临时文件再 rename，大小与 mtime 都相同，只有 inode 不同
+    const edited = range(0, 50);
+    edited[25] = { i: 99 };
+    const tmpPath = `${filePath}.tmp`;
+    fs.writeFileSync(tmpPath, JSON.stringify(edited, null, 2));
+    fs.utimesSync(tmpPath, mtime, mtime);
+    fs.renameSync(tmpPath, filePath);
+
+    expect(await history.read()).toEqual(edited);
+  });
+});
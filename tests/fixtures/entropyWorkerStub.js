@@ -0,0 +1,26 @@
+/**
+ * Entropy worker stub - speaks the same line-delimited JSON protocol as
+ * server/scripts/entropy_worker.py without needing Python or OpenDoge
+ *
+ * Env:
+ *   STUB_DELAY_MS - delay before each response (default 20)
+ */
+const readline = require('readline');
+
+const delay = parseInt(process.env.STUB_DELAY_MS || '20', 10);
+let calls = 0;
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+  const { id, method } = JSON.parse(line);
+
+  if (method === 'crash') {
+    process.exit(1);
+  }
+
+  setTimeout(() => {
+    const response = method === 'calculate'
+      ? { id, result: { entropy: 0.42, calls: ++calls, pid: process.pid } }
+      : { id, error: `unknown method: ${method}` };
+    process.stdout.write(JSON.stringify(response) + '\n');
+  }, delay);
+});
@@ -0,0 +1,267 @@
+/**
+ * Fake Redis - in-memory stand-in for the node-redis v5 client commands the
+ * server uses (strings, hashes, sorted sets, sets, lists, TTLs, MULTI,
+ * pub/sub, EVAL/EVALSHA). Shared by the unit tests and scripts/bench_suite.js.
+ *
+ * By default commands resolve right away and pub/sub listeners run
+ * synchronously, so tests need no timers. With `latencyMs` set (0 included)
+ * every command - and every MULTI as a whole - completes on a later turn of
+ * the event loop after that delay, approximating one network round trip.
+ *
+ * `calls` counts every command by name (commands queued in a MULTI
+ * included); `writes` counts commands that modify data.
+ *
+ * Options:
+ *   strings   - initial string keys ({ key: value })
+ *   script    - (redis, { keys, arguments }) => reply, run for every EVAL /
+ *               EVALSHA; EVALSHA replies NOSCRIPT until the script was sent
+ *               once with EVAL. Without it, both reject (callers fall back).
+ *   latencyMs - simulated round-trip time (null = resolve immediately)
+ */
+const crypto = require('crypto');
+
+const WRITE_COMMANDS = new Set([
+  'set', 'setEx', 'incr', 'del', 'pExpire', 'pExpireAt',
+  'hSet', 'hSetNX', 'hIncrBy', 'zAdd', 'zRem', 'zRemRangeByScore',
+  'sAdd', 'sRem', 'lPush', 'lTrim',
+]);
+
+function createFakeRedis({ strings = {}, script = null, latencyMs = null } = {}) {
+  const store = new Map(Object.entries(strings));
+  const hashes = new Map();
+  const zsets = new Map();
+  const sets = new Map();
+  const lists = new Map();
+  const keyspaces = [store, hashes, zsets, sets, lists];
+  const expiry = new Map();
+  const subscribers = new Map();
+  const loadedScripts = new Set();
+
+  const exists = key => keyspaces.some(map => map.has(key));
+  const remove = (key) => {
+    expiry.delete(key);
+    return keyspaces.filter(map => map.delete(key)).length > 0;
+  };
+  // 过期的 key 在下一次访问时删除
+  const purge = (key) => {
+    const expiresAt = expiry.get(key);
+    if (expiresAt !== undefined && expiresAt <= Date.now()) remove(key);
+  };
+  const container = (map, key, create) => {
+    if (!map.has(key)) map.set(key, create());
+    return map.get(key);
+  };
+  const range = (list, start, stop) => list.slice(start, stop < 0 ? list.length + stop + 1 : stop + 1);
+  const later = (fn) => {
+    if (latencyMs > 0) setTimeout(fn, latencyMs);
+    else setImmediate(fn);
+  };
+
+  const redis = {
+    isOpen: true,
+    isReady: true,
+    calls: {},
+    writes: 0,
+    store,
+    hashes,
+    zsets,
+    sets,
+    lists,
+  };
+
+  const runScript = (options) => {
+    if (!script) throw new Error('Lua scripts are not supported by the fake Redis');
+    return script(redis, options);
+  };
+
+  const commands = {
+    // ----- strings -----
+    get: key => (store.has(key) ? store.get(key) : null),
+    set: (key, value, options = {}) => {
+      if (options.NX && exists(key)) return null;
+      store.set(key, String(value));
+      expiry.delete(key);
+      if (options.PX) expiry.set(key, Date.now() + options.PX);
+      if (options.EX) expiry.set(key, Date.now() + options.EX * 1000);
+      return 'OK';
+    },
+    setEx: (key, seconds, value) => commands.set(key, value, { EX: seconds }),
+    incr: (key) => {
+      const value = Number(store.get(key) || 0) + 1;
+      store.set(key, String(value));
+      return value;
+    },
+    exists: (...keys) => keys.flat().filter((key) => {
+      purge(key);
+      return exists(key);
+    }).length,
+    del: keys => [].concat(keys).filter((key) => {
+      purge(key);
+      return remove(key);
+    }).length,
+
+    // ----- TTL -----
+    pExpire: (key, ms) => (exists(key) ? (expiry.set(key, Date.now() + ms), 1) : 0),
+    pExpireAt: (key, at) => (exists(key) ? (expiry.set(key, at), 1) : 0),
+    pTTL: key => (!exists(key) ? -2 : expiry.has(key) ? expiry.get(key) - Date.now() : -1),
+
+    // ----- hashes -----
+    hGet: (key, field) => (hashes.get(key) || {})[field] ?? null,
+    hGetAll: key => ({ ...hashes.get(key) }),
+    hSet: (key, field, value) => {
+      const hash = container(hashes, key, () => ({}));
+      const fields = typeof field === 'object' ? field : { [field]: value };
+      let added = 0;
+      for (const [name, fieldValue] of Object.entries(fields)) {
+        if (!(name in hash)) added++;
+        hash[name] = String(fieldValue);
+      }
+      return added;
+    },
+    hSetNX: (key, field, value) => {
+      const hash = container(hashes, key, () => ({}));
+      if (field in hash) return 0;
+      hash[field] = String(value);
+      return 1;
+    },
+    hIncrBy: (key, field, increment) => {
+      const hash = container(hashes, key, () => ({}));
+      hash[field] = String(Number(hash[field] || 0) + increment);
+      return Number(hash[field]);
+    },
+
+    // ----- sorted sets -----
+    zAdd: (key, members) => {
+      const zset = container(zsets, key, () => new Map());
+      let added = 0;
+      for (const { score, value } of [].concat(members)) {
+        if (!zset.has(value)) added++;
+        zset.set(value, Number(score));
+      }
+      return added;
+    },
+    zRem: (key, members) => {
+      const zset = zsets.get(key);
+      if (!zset) return 0;
+      const removed = [].concat(members).filter(member => zset.delete(member)).length;
+      if (zset.size === 0) remove(key);
+      return removed;
+    },
+    zScore: (key, member) => (zsets.get(key) || new Map()).get(member) ?? null,
+    zRange: (key, start, stop, options = {}) => {
+      const sorted = [...(zsets.get(key) || [])].sort((a, b) => a[1] - b[1]).map(([member]) => member);
+      if (options.REV) sorted.reverse();
+      return range(sorted, start, stop);
+    },
+    zRemRangeByScore: (key, min, max) => {
+      const zset = zsets.get(key);
+      if (!zset) return 0;
+      const low = min === '-inf' ? -Infinity : Number(min);
+      const high = max === '+inf' ? Infinity : Number(max);
+      let removed = 0;
+      for (const [member, score] of zset) {
+        if (score >= low && score <= high) {
+          zset.delete(member);
+          removed++;
+        }
+      }
+      return removed;
+    },
+
+    // ----- sets -----
+    sAdd: (key, members) => {
+      const set = container(sets, key, () => new Set());
+      [].concat(members).forEach(member => set.add(member));
+      return [].concat(members).length;
+    },
+    sRem: (key, members) => [].concat(members).filter(member => (sets.get(key) || new Set()).delete(member)).length,
+    sMembers: key => [...(sets.get(key) || [])],
+
+    // ----- lists -----
+    lPush: (key, values) => {
+      const list = container(lists, key, () => []);
+      [].concat(values).forEach(value => list.unshift(value));
+      return list.length;
+    },
+    lTrim: (key, start, stop) => {
+      lists.set(key, range(lists.get(key) || [], start, stop));
+      return 'OK';
+    },
+    lRange: (key, start, stop) => range(lists.get(key) || [], start, stop),
+
+    // ----- pub/sub -----
+    publish: (channel, message) => {
+      const listeners = subscribers.get(channel) || [];
+      listeners.forEach((listener) => {
+        if (latencyMs === null) listener(message, channel);
+        else later(() => listener(message, channel));
+      });
+      return listeners.length;
+    },
+    subscribe: (channel, listener) => {
+      container(subscribers, channel, () => []).push(listener);
+    },
+
+    // ----- scripts -----
+    eval: (source, options) => {
+      loadedScripts.add(crypto.createHash('sha1').update(source).digest('hex'));
+      return runScript(options);
+    },
+    evalSha: (sha, options) => {
+      if (!loadedScripts.has(sha)) throw new Error('NOSCRIPT No matching script');
+      return runScript(options);
+    },
+
+    ping: () => 'PONG',
+    quit: () => {
+      redis.isOpen = false;
+      redis.isReady = false;
+      return 'OK';
+    },
+  };
+
+  const run = (name, args) => {
+    redis.calls[name] = (redis.calls[name] || 0) + 1;
+    if (WRITE_COMMANDS.has(name)) redis.writes++;
+    if (typeof args[0] === 'string' && name !== 'publish' && name !== 'subscribe') purge(args[0]);
+    return commands[name](...args);
+  };
+
+  // One round trip: immediate by default, after latencyMs when simulating a network
+  const roundTrip = (fn) => {
+    if (latencyMs === null) return Promise.resolve().then(fn);
+    return new Promise((resolve, reject) => later(() => {
+      try {
+        resolve(fn());
+      } catch (error) {
+        reject(error);
+      }
+    }));
+  };
+
+  for (const name of Object.keys(commands)) {
+    redis[name] = (...args) => roundTrip(() => run(name, args));
+  }
+
+  redis.multi = () => {
+    const queued = [];
+    const pipeline = { exec: () => roundTrip(() => queued.map(op => op())) };
+    for (const name of Object.keys(commands)) {
+      pipeline[name] = (...args) => {
+        queued.push(() => run(name, args));
+        return pipeline;
+      };
+    }
+    return pipeline;
+  };
+
+  redis.duplicate = () => redis;
+  redis.connect = async () => redis;
+  redis.on = () => redis;
+
+  return redis;
+}
+
+module.exports = {
+  createFakeRedis,
+};
@@ -0,0 +1,95 @@
+/**
+ * Unit Tests - Route Label Normalization, Event Loop Delay & Request Tracing
+ */
+const { EventEmitter } = require('events');
+const {
+  register, normalizeRoute, timeAsync, redisCommandDuration, fileReadDuration
+} = require('../server/metrics');
+const { traceMiddleware, summarizeSpans } = require('../server/metrics/trace');
+
+describe('normalizeRoute', () => {
+  it('should use the matched route pattern', () => {
+    const req = { baseUrl: '/api/audit', route: { path: '/logs' }, originalUrl: '/api/audit/logs?limit=5' };
+    expect(normalizeRoute(req, { statusCode: 200 })).toBe('/api/audit/logs');
+  });
+
+  it('should collapse unmatched, static and id-like paths', () => {
+    expect(normalizeRoute({ originalUrl: '/wp-admin/x.php' }, { statusCode: 404 })).toBe('unmatched');
+    expect(normalizeRoute({ originalUrl: '/assets/index-4f3a.js' }, { statusCode: 200 })).toBe('static');
+    expect(normalizeRoute({ originalUrl: '/api/items/12345?x=1' }, { statusCode: 200 })).toBe('/api/items/:id');
+  });
+});
+
+describe('event loop delay', () => {
+  const maxDelay = async () => {
+    const { values } = await register.getSingleMetric('xiaoshazi_event_loop_delay_seconds').get();
+    return values.find(value => value.labels.quantile === 'max').value;
+  };
+
+  it('should report a blocked event loop and reset after each scrape', async () => {
+    await maxDelay();
+    const blockedUntil = Date.now() + 60;
+    while (Date.now() < blockedUntil) {
+      // 阻塞事件循环
+    }
+    await new Promise(resolve => setTimeout(resolve, 30));
+
+    expect(await maxDelay()).toBeGreaterThan(0.04);
+    expect(await maxDelay()).toBeLessThan(0.04);
+  });
+});
+
+describe('traceMiddleware', () => {
+  it('should attribute timings to the request that caused them', async () => {
+    const traces = [];
+    const middleware = traceMiddleware({ enabled: true, onTrace: trace => traces.push(trace) });
+
+    const handle = (url, work) => new Promise((resolve) => {
+      const req = { method: 'GET', originalUrl: url };
+      const res = new EventEmitter();
+      res.statusCode = 200;
+      middleware(req, res, async () => {
+        await work();
+        res.emit('finish');
+        resolve();
+      });
+    });
+
+    const wait = ms => new Promise(resolve => setTimeout(resolve, ms));
+    // 两个并发请求的计时不能混在一起
+    await Promise.all([
+      handle('/api/a', async () => {
+        await timeAsync(redisCommandDuration, { command: 'zRange' }, () => wait(5));
+        await timeAsync(redisCommandDuration, { command: 'zRange' }, () => wait(5));
+      }),
+      handle('/api/b', () => timeAsync(fileReadDuration, { file: 'rankings' }, () => wait(2)))
+    ]);
+
+    const a = traces.find(trace => trace.route === '/api/a');
+    const b = traces.find(trace => trace.route === '/api/b');
+    expect(a.spans).toHaveLength(1);
+    expect(a.spans[0]).toMatchObject({ name: 'redis_command:zRange', count: 2 });
+    expect(b.spans.map(span => span.name)).toEqual(['file_read:rankings']);
+    expect(a.totalMs).toBeGreaterThanOrEqual(a.spans[0].ms);
+  });
+
+  it('should pass through when disabled', () => {
+    const next = vi.fn();
+    traceMiddleware({ enabled: false })({}, {}, next);
+    expect(next).toHaveBeenCalled();
+  });
+});
+
+describe('summarizeSpans', () => {
+  it('should total spans by name, slowest first', () => {
+    const summary = summarizeSpans([
+      { name: 'serialize', ms: 1 },
+      { name: 'compress', ms: 3 },
+      { name: 'serialize', ms: 1.5 }
+    ]);
+    expect(summary).toEqual([
+      { name: 'compress', count: 1, ms: 3 },
+      { name: 'serialize', count: 2, ms: 2.5 }
+    ]);
+  });
+});
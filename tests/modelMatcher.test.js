@@ -0,0 +1,107 @@
+/**
+ * Unit Tests - Compiled Model Matcher (shared/modelMatcher.mjs)
+ */
+const {
+  compileRules,
+  compileScenarioRules,
+  compileAgentCoefficients,
+  literals,
+  memoize,
+  MODEL_MULTIPLIER_RULES
+} = require('../shared/modelMatcher.mjs');
+const { extractFamily, isCommunityVariant } = require('../server/scripts/sync_data');
+
+describe('compileRules', () => {
+  const match = compileRules([
+    { value: 'bonus', patterns: literals(['coder', 'opus']) },
+    { value: 'penalty', patterns: literals(['mini', 'turbo']) }
+  ], { fallback: 'none' });
+
+  it('should prefer earlier rules regardless of position in the name', () => {
+    expect(match('gpt-4o-mini-coder')).toBe('bonus');
+    expect(match('turbo-opus')).toBe('bonus');
+    expect(match('GPT-4-Turbo')).toBe('penalty');
+    expect(match('llama')).toBe('none');
+  });
+
+  it('should treat literal patterns literally', () => {
+    const dotted = compileRules([{ value: true, patterns: literals(['llama 3.1']) }], { fallback: false });
+    expect(dotted('Llama 3.1 8B')).toBe(true);
+    expect(dotted('llama 3x1')).toBe(false);
+  });
+
+  it('should prefer an earlier rule that matches after a later rule', () => {
+    // 'mini' is the leftmost hit, 'coder' comes later but ranks higher
+    expect(match('mini-model-coder')).toBe('bonus');
+  });
+
+  it('should match the same with and without the memo', () => {
+    const rules = [{ value: 1, patterns: ['a'] }];
+    for (const cacheSize of [undefined, 0, 1]) {
+      const memoMatch = compileRules(rules, { fallback: 0, cacheSize });
+      expect(['a', 'b', 'a', 'b'].map(memoMatch)).toEqual([1, 0, 1, 0]);
+    }
+  });
+
+  it('should return the fallback when no rule has patterns', () => {
+    expect(compileRules([{ value: 2, patterns: [] }], { fallback: 1 })('anything')).toBe(1);
+  });
+});
+
+describe('memoize', () => {
+  it('should compute each key once', () => {
+    const fn = vi.fn(name => name.length);
+    const memoized = memoize(fn);
+
+    expect(memoized('abc')).toBe(3);
+    expect(memoized('abc')).toBe(3);
+    expect(fn.mock.calls).toHaveLength(1);
+  });
+
+  it('should stay bounded and keep recently used keys', () => {
+    const fn = vi.fn(name => name.length);
+    const memoized = memoize(fn, 2);
+
+    ['a', 'b', 'c', 'a', 'd', 'e'].forEach(memoized);
+    // 'a' 在降代后又被用到，提升回当前代；'b' / 'c' 已被淘汰
+    memoized('a');
+    memoized('b');
+    expect(fn.mock.calls.map(([name]) => name)).toEqual(['a', 'b', 'c', 'd', 'e', 'b']);
+  });
+});
+
+describe('rule tables', () => {
+  it('should match the scoring.ts regex semantics', () => {
+    const multipliers = compileScenarioRules(MODEL_MULTIPLIER_RULES);
+    expect(multipliers.coding('claude 3 sonnet 3.5 7')).toBe(1.10);
+    expect(multipliers.coding('gemini flash 3')).toBe(0.85);
+    expect(multipliers.creative('gemini-1.5-pro 4')).toBe(1.08);
+    expect(multipliers.all('llama 3 1')).toBe(1.0);
+  });
+
+  it('should compile agent coefficient tiers', () => {
+    const getMultiplier = compileAgentCoefficients({
+      high: { multiplier: 1.2, patterns: ['Claude', 'gpt-4'] },
+      mid: { multiplier: 1.1, patterns: ['qwen2.5'] },
+      low: { multiplier: 1.0, patterns: [] }
+    });
+    expect(getMultiplier('claude-3-opus')).toBe(1.2);
+    expect(getMultiplier('Qwen2.5-72B')).toBe(1.1);
+    expect(getMultiplier('Llama 3')).toBe(1.0);
+  });
+});
+
+describe('sync_data matchers', () => {
+  it('should cluster model names into families', () => {
+    expect(extractFamily('meta-llama/Meta-Llama-3.1-70B-Instruct')).toBe('Llama 3.1 70B');
+    expect(extractFamily('mistralai/Mixtral-8x7B-Instruct-v0.1')).toBe('Mixtral 8X7B');
+    expect(extractFamily('Qwen/QwQ-32B-Preview')).toBe('Qwen');
+    expect(extractFamily('01-ai/Yi-34B-Chat')).toBe('Yi 34B');
+  });
+
+  it('should flag merges and quantizations as community variants', () => {
+    expect(isCommunityVariant('user/Llama-3-8B-GGUF', {})).toBe(true);
+    expect(isCommunityVariant('user/Llama-3-8B', { Merged: true })).toBe(true);
+    expect(isCommunityVariant('meta-llama/Meta-Llama-3-8B', {})).toBe(false);
+  });
+});
@@ -0,0 +1,127 @@
+/**
+ * Unit Tests - Ranking Change Feed & Coalesced Socket Updates
+ */
+const { diffRankings, scopeDiff } = require('../shared/rankingDiff.mjs');
+const { RankingFeed, HISTORY_KEY } = require('../server/utils/rankingFeed');
+const { UpdateThrottle } = require('../server/utils/updateThrottle');
+const { createFakeRedis } = require('./fixtures/fakeRedis');
+
+const agent = (model, avgPerf, scenarios = ['coding']) => ({ id: model, model, avgPerf, rank: 0, scenarios });
+
+describe('diffRankings', () => {
+  it('should send only changed fields and scenario moves as remove + insert', () => {
+    const before = [agent('A', 90), agent('B', 80), agent('C', 70)];
+    const after = [agent('A', 91), agent('B', 80, ['reasoning']), agent('D', 60)];
+    const diff = diffRankings(before, after, { version: '2', previousVersion: '1' });
+
+    expect(diff.changed).toEqual([{ key: 'A', scenarios: ['coding'], fields: { avgPerf: 91, rank: 0 } }]);
+    expect(diff.removed.map(entry => entry.key).sort()).toEqual(['B', 'C']);
+    expect(diff.inserted.map(a => a.model)).toEqual(['B', 'D']);
+
+    const reasoning = scopeDiff(diff, 'reasoning');
+    expect(reasoning.removed).toEqual([]);
+    expect(reasoning.inserted.map(a => a.model)).toEqual(['B']);
+    expect(reasoning.changed).toEqual([]);
+  });
+});
+
+describe('RankingFeed', () => {
+  let version;
+  let agents;
+  let feed;
+
+  beforeEach(() => {
+    version = '1';
+    agents = [agent('A', 90), agent('B', 80), agent('C', 70), agent('D', 60)];
+    feed = new RankingFeed({
+      loadData: async () => ({ agents, source: 'redis' }),
+      getVersion: async () => version
+    });
+  });
+
+  it('should emit one diff per version after the baseline load', async () => {
+    const diffs = [];
+    feed.onDiff(diff => diffs.push(diff));
+
+    await feed.refresh();
+    expect(diffs).toHaveLength(0);
+
+    version = '2';
+    agents = [agent('B', 95), agent('A', 90), agent('C', 70), agent('D', 60)];
+    await Promise.all([feed.refresh(), feed.refresh()]);
+    await feed.refresh();
+
+    expect(diffs).toHaveLength(1);
+    expect(diffs[0]).toMatchObject({ version: '2', previousVersion: '1', scenarios: ['coding'] });
+    expect(diffs[0].changed.map(entry => entry.key)).toEqual(['B']);
+  });
+
+  it('should replay missed versions from the shared history', async () => {
+    const redis = createFakeRedis();
+    feed.setRedisClient(redis, true);
+    await feed.refresh();
+    version = '2';
+    agents = [...agents, agent('E', 50)];
+    await feed.refresh();
+    version = '3';
+    agents = agents.filter(a => a.model !== 'C');
+    await feed.refresh();
+
+    expect(redis.lists.get(HISTORY_KEY)).toHaveLength(2);
+
+    // 另一个 worker: 只有 Redis 中的历史
+    const reader = new RankingFeed({ loadData: async () => ({ agents }), getVersion: async () => version });
+    reader.setRedisClient(redis, true);
+    expect((await reader.since('1')).map(diff => diff.version)).toEqual(['2', '3']);
+    expect(await reader.since('3')).toEqual([]);
+    expect(await reader.since('0')).toBeNull();
+  });
+
+  it('should send a reset instead of a diff when most of the list changed', async () => {
+    const diffs = [];
+    feed.onDiff(diff => diffs.push(diff));
+    await feed.refresh();
+
+    version = '2';
+    agents = agents.map(a => ({ ...a, avgPerf: a.avgPerf + 1 }));
+    await feed.refresh();
+
+    expect(diffs[0]).toMatchObject({ reset: true, changed: [] });
+  });
+});
+
+describe('UpdateThrottle', () => {
+  const createSocket = () => ({ data: {}, connected: true, emitted: [], emit(event, payload) { this.emitted.push(payload); } });
+
+  beforeEach(() => {
+    vi.useFakeTimers();
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it('should fold requests inside the window into one trailing reply', () => {
+    let computed = 0;
+    const throttle = new UpdateThrottle({ compute: () => ++computed, event: 'system:metrics', intervalMs: 2000 });
+    const socket = createSocket();
+
+    expect(throttle.request(socket)).toBe(true);
+    for (let i = 0; i < 50; i++) throttle.request(socket);
+    expect(socket.emitted).toHaveLength(1);
+
+    vi.advanceTimersByTime(2000);
+    expect(socket.emitted).toHaveLength(2);
+  });
+
+  it('should share one computed payload between sockets', () => {
+    let computed = 0;
+    const throttle = new UpdateThrottle({ compute: () => ++computed, event: 'system:metrics' });
+    const sockets = Array.from({ length: 10 }, createSocket);
+
+    sockets.forEach(socket => throttle.request(socket));
+
+    expect(computed).toBe(1);
+    expect(sockets.every(socket => socket.emitted[0] === 1)).toBe(true);
+  });
+});
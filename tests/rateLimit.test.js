@@ -0,0 +1,105 @@
+/**
+ * Unit Tests - Sliding-Window Rate Limit Store & Aggregated Rejection Audit
+ */
+const {
+  SlidingWindowStore,
+  LocalWindowCounter,
+  setRedisClient
+} = require('../server/utils/rateLimitStore');
+const { AuditAggregator } = require('../server/utils/audit');
+const { createFakeRedis } = require('./fixtures/fakeRedis');
+
+// Emulates the sliding-window Lua script on the fake Redis string keys
+function slidingWindow(redis, { keys, arguments: args }) {
+  const current = Number(redis.store.get(keys[0]) || 0) + 1;
+  redis.store.set(keys[0], String(current));
+  const weight = (Number(args[0]) - Number(args[1])) / Number(args[0]);
+  return current + Math.floor(Number(redis.store.get(keys[1]) || 0) * weight);
+}
+
+describe('LocalWindowCounter', () => {
+  it('should weight the previous window by the time left in it', () => {
+    const counter = new LocalWindowCounter(1000);
+    for (let i = 0; i < 10; i++) counter.increment('ip', 1000);
+
+    // 25% 进入下一个窗口: 10 * 0.75 + 1
+    expect(counter.increment('ip', 2250)).toBe(8);
+    // 两个窗口之后旧计数全部丢弃
+    expect(counter.increment('ip', 4100)).toBe(1);
+  });
+});
+
+describe('SlidingWindowStore', () => {
+  afterEach(() => {
+    setRedisClient(null, false);
+  });
+
+  it('should share counts between stores through Redis', async () => {
+    const redis = createFakeRedis({ script: slidingWindow });
+    setRedisClient(redis, true);
+
+    // 两个 worker 的同名限流器
+    const workerA = new SlidingWindowStore({ name: 'api' });
+    const workerB = new SlidingWindowStore({ name: 'api' });
+    workerA.init({ windowMs: 60000, max: 2 });
+    workerB.init({ windowMs: 60000, max: 2 });
+
+    await workerA.increment('1.2.3.4');
+    await workerB.increment('1.2.3.4');
+    const third = await workerA.increment('1.2.3.4');
+
+    expect(third.totalHits).toBe(3);
+    expect(third.resetTime).toBeInstanceOf(Date);
+    // 第一次 EVALSHA 缺脚本时回退到 EVAL，之后只用 EVALSHA
+    expect(redis.calls.eval).toBe(1);
+    expect([...redis.store.keys()][0]).toMatch(/^ratelimit:api:\{1\.2\.3\.4\}:\d+$/);
+  });
+
+  it('should fall back to local counting when Redis fails or is unavailable', async () => {
+    const redis = createFakeRedis({ script: slidingWindow });
+    redis.evalSha = async () => { throw new Error('Connection closed'); };
+    setRedisClient(redis, true);
+
+    const store = new SlidingWindowStore({ name: 'login' });
+    store.init({ windowMs: 60000, max: 5 });
+    await store.increment('ip:a@b.co');
+    setRedisClient(null, false);
+
+    expect((await store.increment('ip:a@b.co')).totalHits).toBe(2);
+  });
+});
+
+describe('AuditAggregator', () => {
+  it('should emit one summary per key and window', () => {
+    const emitted = [];
+    const aggregator = new AuditAggregator({ emit: (event, data) => emitted.push({ event, data }) });
+
+    for (let i = 0; i < 4213; i++) {
+      aggregator.record('RATE_LIMIT_EXCEEDED', '1.2.3.4', { ip: '1.2.3.4', path: '/api/agents' });
+    }
+    aggregator.record('RATE_LIMIT_EXCEEDED', '5.6.7.8', { ip: '5.6.7.8', path: '/api/agents' });
+    aggregator.flush();
+
+    expect(emitted).toHaveLength(2);
+    expect(emitted[0].event).toBe('RATE_LIMIT_EXCEEDED');
+    expect(emitted[0].data).toHaveProperty('count', 4213);
+    expect(emitted[0].data).toHaveProperty('ip', '1.2.3.4');
+
+    aggregator.flush();
+    expect(emitted).toHaveLength(2);
+  });
+
+  it('should only count keys beyond maxKeys', () => {
+    const emitted = [];
+    const aggregator = new AuditAggregator({ maxKeys: 1, emit: (event, data) => emitted.push({ event, data }) });
+
+    aggregator.record('RATE_LIMIT_EXCEEDED', 'a', { ip: 'a' });
+    aggregator.record('RATE_LIMIT_EXCEEDED', 'b', { ip: 'b' });
+    aggregator.record('RATE_LIMIT_EXCEEDED', 'c', { ip: 'c' });
+    aggregator.flush();
+
+    expect(emitted).toHaveLength(2);
+    expect(emitted[0].data).toHaveProperty('count', 1);
+    expect(emitted[1].data).toEqual({ overflow: true, count: 2 });
+  });
+});
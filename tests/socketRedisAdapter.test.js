@@ -0,0 +1,78 @@
+/**
+ * Unit Tests - Socket.IO Redis broadcast adapter
+ */
+const { createRedisAdapter } = require('../server/utils/socketRedisAdapter');
+const { createFakeRedis } = require('./fixtures/fakeRedis');
+
+// Minimal namespace: the adapter only needs the encoder and the socket map
+function createNamespace() {
+  return {
+    name: '/',
+    server: { encoder: { encode: packet => [JSON.stringify(packet)] } },
+    sockets: new Map()
+  };
+}
+
+function addSocket(nsp, adapter, id, rooms = []) {
+  const socket = { id, client: { packets: [], writeToEngine(packets) { this.packets.push(...packets); } } };
+  nsp.sockets.set(id, socket);
+  adapter.addAll(id, new Set([id, ...rooms]));
+  return socket;
+}
+
+const broadcastOpts = (flags = {}) => ({ rooms: new Set(), except: new Set(), flags });
+
+describe('RedisBroadcastAdapter', () => {
+  let redis;
+  let workerA;
+  let workerB;
+  let nspA;
+  let nspB;
+
+  beforeEach(() => {
+    redis = createFakeRedis();
+    nspA = createNamespace();
+    nspB = createNamespace();
+    // 每个 worker 一个工厂 (各自的 uid)，共用同一个 Redis
+    workerA = createRedisAdapter(redis, redis)(nspA);
+    workerB = createRedisAdapter(redis, redis)(nspB);
+  });
+
+  it('should relay room broadcasts to the sockets of other workers', async () => {
+    const local = addSocket(nspA, workerA, 'a1', ['rankings:all']);
+    const remote = addSocket(nspB, workerB, 'b1', ['rankings:all']);
+    const outside = addSocket(nspB, workerB, 'b2');
+
+    workerA.broadcast({ type: 2, data: ['rankings:diff', { version: '2' }] }, {
+      rooms: new Set(['rankings:all']),
+      except: new Set()
+    });
+    await new Promise(resolve => setImmediate(resolve));
+
+    expect(local.client.packets).toHaveLength(1);
+    expect(remote.client.packets).toHaveLength(1);
+    expect(outside.client.packets).toHaveLength(0);
+  });
+
+  it('should reject operations that need the other workers', async () => {
+    await expect(workerA.fetchSockets(broadcastOpts())).rejects.toThrow(/use \.local/);
+    expect(() => workerA.addSockets(broadcastOpts(), ['room'])).toThrow(/socketsJoin/);
+    expect(() => workerA.delSockets(broadcastOpts(), ['room'])).toThrow(/socketsLeave/);
+    expect(() => workerA.disconnectSockets(broadcastOpts(), false)).toThrow(/disconnectSockets/);
+    expect(() => workerA.broadcastWithAck({ type: 2, data: ['ping'] }, broadcastOpts(), () => {}, () => {}))
+      .toThrow(/acknowledgements/);
+    expect(() => workerA.serverSideEmit(['ping'])).toThrow(/serverSideEmit/);
+  });
+
+  it('should run those operations on this worker with the local flag', async () => {
+    addSocket(nspA, workerA, 'a1');
+    addSocket(nspB, workerB, 'b1');
+
+    const sockets = await workerA.fetchSockets(broadcastOpts({ local: true }));
+    expect([...sockets].map(socket => socket.id)).toEqual(['a1']);
+
+    workerA.addSockets(broadcastOpts({ local: true }), ['vip']);
+    expect(workerA.rooms.get('vip').has('a1')).toBe(true);
+    expect(workerB.rooms.has('vip')).toBe(false);
+  });
+});
@@ -0,0 +1,163 @@
+/**
+ * Unit Tests - Leaderboard Sources & Incremental ETL (sync_data.js)
+ */
+const fs = require('fs');
+const http = require('http');
+const os = require('os');
+const path = require('path');
+
+const { createHttpSource, createDirectorySource } = require('../server/utils/leaderboardSource');
+const { FamilyAggregator, writeLeaderboard, buildRankings } = require('../server/scripts/sync_data');
+const { createFakeRedis } = require('./fixtures/fakeRedis');
+
+const makeRows = (count) => Array.from({ length: count }, (_, i) => ({
+  row: { fullname: `org${i % 7}/Model-${i % 13}-${7 + (i % 3)}B`, 'Average ⬆️': 20 + (i % 30) }
+}));
+
+async function collect(source) {
+  const rows = [];
+  for await (const page of source.pages()) rows.push(...page);
+  return rows;
+}
+
+// Serves rows in HF datasets-server format; the first request for every
+// offset listed in `failOnce` returns 503
+function startFixtureServer(rows, { failOnce = [] } = {}) {
+  const failed = new Set();
+  const stats = { inFlight: 0, maxInFlight: 0, requests: 0 };
+
+  const server = http.createServer((req, res) => {
+    const url = new URL(req.url, 'http://localhost');
+    const offset = parseInt(url.searchParams.get('offset'), 10);
+    const limit = parseInt(url.searchParams.get('limit'), 10);
+
+    stats.requests++;
+    stats.inFlight++;
+    stats.maxInFlight = Math.max(stats.maxInFlight, stats.inFlight);
+
+    setTimeout(() => {
+      stats.inFlight--;
+      if (failOnce.includes(offset) && !failed.has(offset)) {
+        failed.add(offset);
+        res.writeHead(503);
+        return res.end();
+      }
+      res.writeHead(200, { 'Content-Type': 'application/json' });
+      res.end(JSON.stringify({ rows: rows.slice(offset, offset + limit), num_rows_total: rows.length }));
+    }, 10);
+  });
+
+  return new Promise(resolve => {
+    server.listen(0, () => resolve({ server, stats, url: `http://127.0.0.1:${server.address().port}/rows?dataset=x` }));
+  });
+}
+
+describe('Leaderboard sources', () => {
+  it('should fetch every page in order with bounded concurrency', async () => {
+    const rows = makeRows(1050);
+    const { server, stats, url } = await startFixtureServer(rows, { failOnce: [300, 700] });
+
+    try {
+      const source = createHttpSource({ baseUrl: url, concurrency: 3, backoffMs: 5 });
+      const fetched = await collect(source);
+
+      expect(fetched).toEqual(rows);
+      expect(stats.maxInFlight).toBeLessThanOrEqual(3);
+      // 11 pages + 2 retries
+      expect(stats.requests).toBe(13);
+    } finally {
+      server.close();
+    }
+  });
+
+  it('should stop at maxRows', async () => {
+    const rows = makeRows(500);
+    const { server, url } = await startFixtureServer(rows);
+
+    try {
+      const fetched = await collect(createHttpSource({ baseUrl: url, maxRows: 250 }));
+      expect(fetched).toEqual(rows.slice(0, 250));
+    } finally {
+      server.close();
+    }
+  });
+
+  it('should read fixture pages from a directory in name order', async () => {
+    const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'sync-source-'));
+    const rows = makeRows(30);
+    try {
+      fs.writeFileSync(path.join(dir, 'page-002.json'), JSON.stringify({ rows: rows.slice(10) }));
+      fs.writeFileSync(path.join(dir, 'page-001.json'), JSON.stringify({ rows: rows.slice(0, 10) }));
+
+      expect(await collect(createDirectorySource(dir))).toEqual(rows);
+    } finally {
+      fs.rmSync(dir, { recursive: true, force: true });
+    }
+  });
+});
+
+describe('FamilyAggregator', () => {
+  it('should blend the best official score with the top-3 community average', () => {
+    const aggregator = new FamilyAggregator();
+    aggregator.addRow({ fullname: 'acme/Falcon-7B', 'Average ⬆️': 30, 'Official Providers': true });
+    [10, 40, 20, 35, 5].forEach((score, i) => {
+      aggregator.addRow({ fullname: `user${i}/Falcon-7B-Instruct`, 'Average ⬆️': score });
+    });
+    // 合并/量化变体不计入
+    aggregator.addRow({ fullname: 'user/Falcon-7B-GGUF', 'Average ⬆️': 99 });
+
+    const [family] = aggregator.results();
+    expect(family.familyName).toBe('Falcon 7B');
+    expect(family.representative).toBe('acme/Falcon-7B');
+    expect(family.score).toBeCloseTo(0.6 * 30 + 0.4 * ((40 + 35 + 20) / 3), 6);
+  });
+
+  it('should use the best community model as representative without an official one', () => {
+    const aggregator = new FamilyAggregator();
+    aggregator.addRow({ fullname: 'a/Falcon-7B', 'Average ⬆️': 10 });
+    aggregator.addRow({ fullname: 'b/Falcon-7B', 'Average ⬆️': 30 });
+    aggregator.addRow({ fullname: 'c/Falcon-7B', 'Average ⬆️': 30 });
+
+    expect(aggregator.results()[0].representative).toBe('b/Falcon-7B');
+  });
+});
+
+describe('writeLeaderboard', () => {
+  const ranking = (model, avgPerf) => ({ id: 1, rank: 1, diff: 0, tier: 'A', provider: 'acme', model, fullName: model, avgPerf, scenarios: ['reasoning'] });
+
+  it('should write only changed families and remove dropped ones', async () => {
+    const client = createFakeRedis();
+    const first = await writeLeaderboard(client, [ranking('A', 90), ranking('B', 80), ranking('C', 70)]);
+    expect(first).toEqual({ written: 3, removed: 0, unchanged: 0 });
+
+    client.writes = 0;
+    const unchanged = await writeLeaderboard(client, [ranking('A', 90), ranking('B', 80), ranking('C', 70)]);
+    expect(unchanged).toEqual({ written: 0, removed: 0, unchanged: 3 });
+    expect(client.writes).toBe(0);
+
+    const next = await writeLeaderboard(client, [ranking('A', 91), ranking('B', 80)]);
+    expect(next).toEqual({ written: 1, removed: 1, unchanged: 1 });
+    expect(client.zsets.get('leaderboard:families').get('A')).toBe(91);
+    expect(client.zsets.get('leaderboard:families').has('C')).toBe(false);
+    expect(JSON.parse(client.hashes.get('agent:family:A').payload).scenarios).toEqual(['reasoning']);
+  });
+
+  it('should leave the sync_hf.js keys alone', async () => {
+    const client = createFakeRedis();
+    await client.zAdd('leaderboard:overall', { score: 50, value: 'hf/Model' });
+    await client.hSet('agent:metadata:hf/Model', { avgPerf: '50.00' });
+
+    await writeLeaderboard(client, [ranking('A', 90)]);
+    await writeLeaderboard(client, []);
+
+    expect([...client.zsets.get('leaderboard:overall').keys()]).toEqual(['hf/Model']);
+    expect(client.hashes.get('agent:metadata:hf/Model').avgPerf).toBe('50.00');
+  });
+
+  it('should produce identical rankings for identical input', async () => {
+    const rows = makeRows(400);
+    const source = { async *pages() { yield rows.slice(0, 200); yield rows.slice(200); } };
+
+    expect(await buildRankings(source)).toEqual(await buildRankings(source));
+  });
+});